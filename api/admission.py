@@ -0,0 +1,228 @@
+import asyncio
+import contextlib
+import itertools
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict
+
+INTERACTIVE = 0
+BULK = 1
+# Speculative background work that only runs while nothing else does.
+IDLE = 2
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk", IDLE: "idle"}
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; ``retry_after`` is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Grant:
+    """Tokens admitted for a block of work; ``hold`` keeps them past the block until the given futures finish"""
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.futures = []
+
+    def hold(self, futures):
+        self.futures.extend(futures)
+
+
+class AdmissionController:
+    """
+    Admits requests against a budget of model tokens in flight.
+
+    Bulk requests may only use ``bulk_share`` of the budget, so interactive
+    requests always find headroom, and waiting interactive requests are
+    woken before waiting bulk ones. Idle work is limited to ``idle_share``.
+    Each priority has a bounded queue.
+    Anything beyond it is rejected immediately instead of piling up.
+    """
+
+    def __init__(self, max_tokens_in_flight: int = 16384, max_queue_size: int = 32,
+                 bulk_share: float = 0.75, max_wait_seconds: float = 30.0, idle_share: float = 0.25):
+        self.max_tokens_in_flight = max_tokens_in_flight
+        self.max_queue_size = max_queue_size
+        self.limits = {
+            INTERACTIVE: max_tokens_in_flight,
+            BULK: max(1, int(max_tokens_in_flight * bulk_share)),
+            IDLE: max(1, int(max_tokens_in_flight * idle_share)),
+        }
+        self.max_wait_seconds = max_wait_seconds
+        self.tokens_in_flight = 0
+        self.waiters: Dict[int, deque] = {priority: deque() for priority in self.limits}
+        self.rejected = {priority: 0 for priority in self.limits}
+        self.admitted = {priority: 0 for priority in self.limits}
+        self.active = {priority: 0 for priority in self.limits}
+        self._avg_service_seconds = 1.0
+
+    def _fits(self, tokens: int, priority: int) -> bool:
+        return self.tokens_in_flight + tokens <= self.limits[priority]
+
+    def _higher_priority_waiting(self, priority: int) -> bool:
+        return any(self.waiters[p] for p in self.waiters if p < priority)
+
+    def busy(self, priority: int = IDLE) -> bool:
+        """Whether requests more urgent than ``priority`` are running or waiting"""
+        return any(self.active[p] or self.waiters[p] for p in self.limits if p < priority)
+
+    def retry_after(self, priority: int = BULK) -> int:
+        queued = sum(len(self.waiters[p]) for p in self.waiters if p <= priority)
+        return max(1, math.ceil(self._avg_service_seconds * (queued + 1)))
+
+    async def acquire(self, tokens: int, priority: int = BULK) -> int:
+        """Waits for budget and returns the number of tokens granted"""
+        tokens = max(1, min(tokens, self.limits[priority]))
+
+        if self._fits(tokens, priority) and not self.waiters[priority] and not self._higher_priority_waiting(priority):
+            self.tokens_in_flight += tokens
+            self.admitted[priority] += 1
+            return tokens
+
+        if len(self.waiters[priority]) >= self.max_queue_size:
+            self.rejected[priority] += 1
+            raise Overloaded(f"Too many queued {PRIORITY_NAMES[priority]} requests", self.retry_after(priority))
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (tokens, waiter)
+        self.waiters[priority].append(entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as the timeout fired; keep the grant.
+                self.admitted[priority] += 1
+                return tokens
+            waiter.cancel()
+            self.waiters[priority].remove(entry)
+            self.rejected[priority] += 1
+            raise Overloaded("Timed out waiting for model capacity", self.retry_after(priority))
+        except BaseException:
+            # Cancelled while queued, e.g. a prefetch job or a disconnected client.
+            if waiter.done() and not waiter.cancelled():
+                # The grant arrived first and nobody will use it; give the tokens back.
+                self.release(tokens)
+            else:
+                waiter.cancel()
+                self.waiters[priority].remove(entry)
+            raise
+
+        self.admitted[priority] += 1
+        return tokens
+
+    def release(self, tokens: int, service_seconds: float = None):
+        self.tokens_in_flight -= tokens
+        if service_seconds is not None:
+            self._avg_service_seconds = 0.8 * self._avg_service_seconds + 0.2 * service_seconds
+        self._wake()
+
+    def _wake(self):
+        for priority in sorted(self.waiters):
+            waiters = self.waiters[priority]
+            while waiters:
+                tokens, waiter = waiters[0]
+                if waiter.done():
+                    waiters.popleft()
+                    continue
+                if not self._fits(tokens, priority):
+                    # Keep FIFO order within a priority and do not let lower
+                    # priorities jump ahead of a blocked higher one.
+                    return
+                waiters.popleft()
+                self.tokens_in_flight += tokens
+                waiter.set_result(True)
+
+    @contextlib.asynccontextmanager
+    async def admit(self, tokens: int, priority: int = BULK):
+        granted = await self.acquire(tokens, priority)
+        self.active[priority] += 1
+        started = time.time()
+        grant = Grant(granted)
+
+        def finish(_=None):
+            self.active[priority] -= 1
+            self.release(granted, time.time() - started)
+
+        try:
+            yield grant
+        finally:
+            if grant.futures:
+                # Work abandoned by the block still runs on the model; its tokens stay in flight until it ends.
+                asyncio.gather(*grant.futures, return_exceptions=True).add_done_callback(finish)
+            else:
+                finish()
+
+    def stats(self) -> Dict:
+        return {
+            "tokens_in_flight": self.tokens_in_flight,
+            "max_tokens_in_flight": self.max_tokens_in_flight,
+            "queued": {PRIORITY_NAMES[p]: len(w) for p, w in self.waiters.items()},
+            "admitted": {PRIORITY_NAMES[p]: n for p, n in self.admitted.items()},
+            "rejected": {PRIORITY_NAMES[p]: n for p, n in self.rejected.items()},
+        }
+
+
+class PriorityExecutor:
+    """
+    Fixed pool of model threads shared by all requests.
+
+    Work items run in priority order, then submission order, so interactive
+    work is not stuck behind the batches of a large bulk request.
+    """
+
+    def __init__(self, max_workers: int = 3, name: str = "model-worker"):
+        self.max_workers = max_workers
+        self.name = name
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def _start_threads(self):
+        with self._lock:
+            while len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker, name=f"{self.name}-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            _, _, future, fn, args, kwargs = self._queue.get()
+            if future is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, fn, *args, priority: int = BULK, **kwargs) -> Future:
+        if self._shutdown:
+            raise RuntimeError("Executor has been shut down")
+        self._start_threads()
+        future = Future()
+        self._queue.put((priority, next(self._counter), future, fn, args, kwargs))
+        return future
+
+    async def run(self, fn, *args, priority: int = BULK, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, priority=priority, **kwargs))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def shutdown(self):
+        self._shutdown = True
+        for _ in self._threads:
+            self._queue.put((math.inf, next(self._counter), None, None, (), {}))
+        for thread in self._threads:
+            thread.join()
@@ -1,42 +1,188 @@
-from fastapi import FastAPI, UploadFile, HTTPException, Form, File
+from fastapi import FastAPI, UploadFile, HTTPException, Form, File, Header
 from fastapi.responses import JSONResponse
 
 import os
 import sys
+import threading
+import time
+
+STARTUP_STARTED = time.time()
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+if os.environ.get("MODEL_SNAPSHOT_DIR"):
+    # Models come from the local snapshot; never reach out to the hub.
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
 from src.models.summarizer import DocumentSummarizer
 from src.utils.document_parser import DocumentParser
-from src.models.qa_model import QuestionAnswerer
+from src.models.qa_model import QuestionAnswerer, context_id
+from src.models.qa_cascade import QACascade
+from src.models.snapshot import resolve_model_path
+from src.models.router import ModelRouter, UnsupportedLanguage, parse_model_map
+from src.utils.language_detection import detect_language
+from src.utils.process_stats import memory_usage
+from src.models.device import get_execution_device
+from src.models.batching import ChunkRequest, LengthBucketer, generation_key, padding_stats
+from src.models.generation_profiles import DEFAULT_PROFILE, GENERATION_PROFILES
+from src.models.extractive import ExtractiveFilter
+from src.models.scheduler import DeadlineScheduler, LatencyEstimator, chunk_priorities
+from src.utils.document_analyzer import DocumentAnalyzer
+from src.utils.corpus_analytics import CorpusAnalytics, analyze_segments
+from src.utils.dedup import NearDuplicateIndex
+from src.utils.text_stream import iter_text_progress
+from src.utils.vector_index import QuantizedVectorIndex
+from src.models.embedder import PassageEmbedder
+from api.admission import AdmissionController, BULK, IDLE, INTERACTIVE, Overloaded, PriorityExecutor
+from api.pipeline import StagedPipeline
+from api.prefetch import ParsedUpload, Prefetcher
 
 import tempfile
+import hashlib
+import shutil
+from itertools import chain, islice
+from dataclasses import replace
 import logging
-from typing import List
-from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+from typing import List, Tuple
 import asyncio
+import numpy as np
 from pydantic import BaseModel
 from typing import Optional
 
+# The log file rotates at LOG_MAX_BYTES so long-running workers do not fill the disk; LOG_FILE="" disables it.
+LOG_FILE = os.environ.get("LOG_FILE", "app.log")
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 1024 * 1024 * 10))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+log_handlers = [logging.StreamHandler()]
+if LOG_FILE:
+    log_handlers.append(RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT))
 logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler("app.log"),
-            logging.StreamHandler()
-        ]
+        handlers=log_handlers
     )
 
 logger = logging.getLogger(__name__)
 
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "eager")
+MODEL_SNAPSHOT_DIR = os.environ.get("MODEL_SNAPSHOT_DIR")
+SUMMARIZER_MODEL = resolve_model_path(os.environ.get("SUMMARIZER_MODEL", "facebook/bart-large-cnn"), MODEL_SNAPSHOT_DIR)
+QA_MODEL = resolve_model_path(os.environ.get("QA_MODEL", "deepset/roberta-base-squad2"), MODEL_SNAPSHOT_DIR)
+# Extra per-language models, e.g. SUMMARIZER_MODELS="de=some/german-model,fr=some/french-model".
+SUMMARIZER_MODELS = {"en": SUMMARIZER_MODEL, **{
+    language: resolve_model_path(name, MODEL_SNAPSHOT_DIR)
+    for language, name in parse_model_map(os.environ.get("SUMMARIZER_MODELS")).items()
+}}
+QA_MODELS = {"en": QA_MODEL, **{
+    language: resolve_model_path(name, MODEL_SNAPSHOT_DIR)
+    for language, name in parse_model_map(os.environ.get("QA_MODELS")).items()
+}}
+# Documents in languages without a configured model are rejected (422); FALLBACK_LANGUAGE=en sends them
+# to that language's models instead.
+FALLBACK_LANGUAGE = os.environ.get("FALLBACK_LANGUAGE") or None
+# Long contexts are answered over up to QA_MAX_WINDOWS overlapping 512-token windows.
+QA_MAX_WINDOWS = int(os.environ.get("QA_MAX_WINDOWS", 4))
+QA_CONTEXT_CACHE_SIZE = int(os.environ.get("QA_CONTEXT_CACHE_SIZE", 32))
+# English questions go to this smaller model first and escalate to QA_MODEL below the confidence threshold.
+QA_CASCADE_MODEL = os.environ.get("QA_CASCADE_MODEL")
+QA_CASCADE_MODEL = resolve_model_path(QA_CASCADE_MODEL, MODEL_SNAPSHOT_DIR) if QA_CASCADE_MODEL else None
+QA_CASCADE_THRESHOLD = float(os.environ.get("QA_CASCADE_THRESHOLD", 0.5))
+# Draft model for assisted decoding in the greedy profiles; it must share the summarizer's tokenizer.
+SUMMARIZER_ASSISTANT_MODEL = os.environ.get("SUMMARIZER_ASSISTANT_MODEL")
+SUMMARIZER_PROFILES = {
+    name: replace(profile, assistant_model_name=resolve_model_path(SUMMARIZER_ASSISTANT_MODEL, MODEL_SNAPSHOT_DIR))
+    for name, profile in GENERATION_PROFILES.items() if profile.generate_kwargs.get("num_beams", 1) == 1
+} if SUMMARIZER_ASSISTANT_MODEL else None
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 8))
+# Inputs are padded to a multiple of this many tokens so CPU workers cache kernels for few shapes; 1 disables it.
+PAD_TO_MULTIPLE_OF = int(os.environ.get("PAD_TO_MULTIPLE_OF", 64))
+# Measure how large a batch fits in memory at startup instead of trusting MAX_BATCH_SIZE alone.
+PROBE_BATCH_SIZE = os.environ.get("PROBE_BATCH_SIZE", "").lower() in ("1", "true", "yes")
+
 app = FastAPI()
-summarizer = DocumentSummarizer()
+execution = get_execution_device()
+summarizers = ModelRouter(lambda name: DocumentSummarizer(name, profiles=SUMMARIZER_PROFILES, backend=INFERENCE_BACKEND,
+                                                          pad_to_multiple_of=PAD_TO_MULTIPLE_OF),
+                          SUMMARIZER_MODELS, fallback_language=FALLBACK_LANGUAGE)
+qa_models = ModelRouter(lambda name: QuestionAnswerer(name, backend=INFERENCE_BACKEND, max_windows=QA_MAX_WINDOWS,
+                                                      max_cached_contexts=QA_CONTEXT_CACHE_SIZE,
+                                                      pad_to_multiple_of=PAD_TO_MULTIPLE_OF), QA_MODELS,
+                        fallback_language=FALLBACK_LANGUAGE)
+summarizer = summarizers.get("en")
 parser = DocumentParser()
-qa_model = QuestionAnswerer()
+qa_model = qa_models.get("en")
+qa_cascade = QACascade(QuestionAnswerer(QA_CASCADE_MODEL, backend=INFERENCE_BACKEND, max_windows=QA_MAX_WINDOWS,
+                                        max_cached_contexts=QA_CONTEXT_CACHE_SIZE,
+                                        pad_to_multiple_of=PAD_TO_MULTIPLE_OF),
+                       qa_model, threshold=QA_CASCADE_THRESHOLD) if QA_CASCADE_MODEL else None
+batch_limits = summarizer.probe_batch_limits(default=MAX_BATCH_SIZE, max_batch_size=MAX_BATCH_SIZE) \
+    if PROBE_BATCH_SIZE else None
+bucketer = LengthBucketer(max_batch_size=MAX_BATCH_SIZE, batch_limit=batch_limits,
+                          pad_to_multiple_of=PAD_TO_MULTIPLE_OF, max_length=summarizer.max_input_tokens)
+
+STARTUP_SECONDS = round(time.time() - STARTUP_STARTED, 2)
+logger.info(f"Worker {os.getpid()} loaded models in {STARTUP_SECONDS}s, memory: {memory_usage()}")
 
 MAX_FILE_SIZE = 1024 * 1024 * 10
+# Text files above MAX_FILE_SIZE are streamed from disk instead of being parsed whole.
+MAX_TEXT_FILE_SIZE = int(os.environ.get("MAX_TEXT_FILE_SIZE", 1024 * 1024 * 512))
+STREAM_WINDOW_CHUNKS = int(os.environ.get("STREAM_WINDOW_CHUNKS", 64))
 SUPPORTED_FORMATS = ['.pdf', '.txt', '.docx']
-MAX_WORKERS = 3
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", 3))
+TOKENIZER_WORKERS = int(os.environ.get("TOKENIZER_WORKERS", 2))
+MAX_TOKENS_IN_FLIGHT = int(os.environ.get("MAX_TOKENS_IN_FLIGHT", 16384))
+MAX_QUEUE_SIZE = int(os.environ.get("MAX_QUEUE_SIZE", 32))
+CHUNK_SIZE = 1000
+MAX_EXTRACTIVE_CHUNKS = 8
+
+model_executor = PriorityExecutor(max_workers=MAX_WORKERS)
+text_executor = PriorityExecutor(max_workers=TOKENIZER_WORKERS, name="text-worker")
+pipeline = StagedPipeline(text_executor, model_executor, max_encoded=2 * MAX_WORKERS)
+admission = AdmissionController(max_tokens_in_flight=MAX_TOKENS_IN_FLIGHT, max_queue_size=MAX_QUEUE_SIZE)
+latency_estimator = LatencyEstimator()
+scheduler = DeadlineScheduler(latency_estimator, max_in_flight=MAX_WORKERS)
+corpus = CorpusAnalytics()
+
+# Uploads to /documents prepare their QA context and default summary in the background when enabled.
+PREFETCH = os.environ.get("PREFETCH", "").lower() in ("1", "true", "yes")
+PREFETCH_CACHE_SIZE = int(os.environ.get("PREFETCH_CACHE_SIZE", 64))
+# Requests in progress on the work endpoints; prefetching waits while there are any.
+foreground_requests = 0
+prefetcher = Prefetcher(lambda: foreground_requests > 0 or admission.busy(IDLE), max_documents=PREFETCH_CACHE_SIZE)
+
+DEDUP_SNAPSHOT = os.environ.get("DEDUP_SNAPSHOT")
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", 0.9))
+DEDUP_SNAPSHOT_EVERY = int(os.environ.get("DEDUP_SNAPSHOT_EVERY", 100))
+if DEDUP_SNAPSHOT and os.path.exists(DEDUP_SNAPSHOT + ".json"):
+    dedup_index = NearDuplicateIndex.load(DEDUP_SNAPSHOT, threshold=DEDUP_THRESHOLD)
+    logger.info(f"Loaded {len(dedup_index)} documents into the duplicate index")
+else:
+    dedup_index = NearDuplicateIndex(threshold=DEDUP_THRESHOLD)
+dedup_unsaved = 0
+# Summaries are remembered from worker threads; one snapshot is written at a time.
+dedup_lock = threading.Lock()
+dedup_save_lock = threading.Lock()
+
+# Semantic search over a document collection, enabled by SEARCH_INDEX, the index directory.
+SEARCH_INDEX = os.environ.get("SEARCH_INDEX")
+SEARCH_MODEL = resolve_model_path(os.environ.get("SEARCH_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
+                                  MODEL_SNAPSHOT_DIR)
+# IVF lists of the index; 0 scans every passage, which is fast enough up to about a million of them.
+SEARCH_NLIST = int(os.environ.get("SEARCH_NLIST", 0))
+SEARCH_NPROBE = int(os.environ.get("SEARCH_NPROBE", 8))
+SEARCH_FLUSH_EVERY = int(os.environ.get("SEARCH_FLUSH_EVERY", 100))
+SEARCH_BATCH_SIZE = 32
+MAX_SEARCH_ANSWERS = 5
+embedder = PassageEmbedder(SEARCH_MODEL, backend=INFERENCE_BACKEND, pad_to_multiple_of=PAD_TO_MULTIPLE_OF) \
+    if SEARCH_INDEX else None
+search_index = QuantizedVectorIndex(embedder.dim, path=SEARCH_INDEX, nlist=SEARCH_NLIST, nprobe=SEARCH_NPROBE) \
+    if SEARCH_INDEX else None
+if search_index is not None:
+    logger.info(f"Loaded the search index: {search_index.stats()}")
+
+def overloaded_response(error: Overloaded) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(error), headers={"Retry-After": str(error.retry_after)})
 
 async def process_chunk(chunk: str) -> str:
     """Process a single chunk of text"""
@@ -46,18 +192,362 @@ async def process_chunk(chunk: str) -> str:
         logger.error(f"Error processing chunk: {str(e)}")
         return ""
 
-async def process_chunks(chunks: List[str]) -> List[str]:
-    """Process multiple chunks concurrently"""
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        loop = asyncio.get_event_loop()
-        tasks = [
-            loop.run_in_executor(executor, summarizer.summarize, chunk)
-            for chunk in chunks
-        ]
-        return await asyncio.gather(*tasks)
-
-def validate_file(file: UploadFile) -> None:
-    """Validate uploaded file format and size"""
+async def summarize_batch(batch, model: DocumentSummarizer = None, priority: int = BULK) -> List[str]:
+    """Summarize one bucketed batch through the text and model stages, falling back to empty summaries on failure"""
+    model = model or summarizer
+    try:
+        return await pipeline.run(
+            encode=lambda: model.collate(batch.input_ids),
+            infer=lambda inputs: model.generate_ids(inputs, **batch.generation_kwargs),
+            decode=model.decode,
+            priority=priority
+        )
+    except Exception as e:
+        logger.error(f"Error processing batch of {len(batch.requests)} chunks: {str(e)}")
+        return [""] * len(batch.requests)
+
+def plan_chunks(chunks: List[str], max_length: Optional[int] = None, min_length: Optional[int] = None,
+                profile: str = DEFAULT_PROFILE, model: DocumentSummarizer = None):
+    """Tokenize chunks once and group them into length-bucketed batches of one model"""
+    model = model or summarizer
+    key = generation_key(max_length=max_length, min_length=min_length, profile=profile)
+    input_ids = model.encode(chunks)
+    requests = [
+        ChunkRequest(index=i, text=chunk, num_tokens=len(ids), generation_key=key, input_ids=ids)
+        for i, (chunk, ids) in enumerate(zip(chunks, input_ids))
+    ]
+    return bucketer.plan(requests)
+
+async def process_chunks(chunks: List[str], max_length: Optional[int] = None, min_length: Optional[int] = None,
+                         profile: str = DEFAULT_PROFILE, deadline: Optional[float] = None,
+                         model: DocumentSummarizer = None):
+    """Process multiple chunks on the shared model executor, once admitted, until the deadline"""
+    batches = await pipeline.run_text("tokenize", plan_chunks, chunks, max_length, min_length, profile, model)
+    tokens = sum(batch.padded_tokens for batch in batches)
+
+    priorities = None
+    if deadline is not None:
+        priorities = chunk_priorities(len(chunks), ExtractiveFilter(method="tfidf").score(chunks))
+
+    async with admission.admit(tokens, BULK) as grant:
+        result = await scheduler.run(
+            batches,
+            lambda batch: summarize_batch(batch, model),
+            deadline=deadline,
+            priorities=priorities
+        )
+        grant.hold(result.abandoned)
+
+    summaries = [result.results.get(i, "") for i in range(len(chunks))]
+    return summaries, padding_stats(batches), result
+
+def request_deadline(started: float, deadline_ms: Optional[int]) -> Optional[float]:
+    """Absolute deadline of a request from its relative budget in milliseconds"""
+    if deadline_ms is None:
+        return None
+    if deadline_ms <= 0:
+        raise ValueError("deadline_ms must be positive")
+    return started + deadline_ms / 1000
+
+def summary_variant(profile: str, language: str, max_length: Optional[int], min_length: Optional[int],
+                    extractive: bool, max_chunks: int) -> str:
+    """Identifies the request options that change a summary, so only like results are reused"""
+    return f"{profile}|{language}|{max_length}|{min_length}|{max_chunks if extractive else None}"
+
+def find_duplicate(signature, variant: str) -> Optional[dict]:
+    """The stored summary of the most similar indexed document summarized with the same options"""
+    for key, similarity in dedup_index.query(signature):
+        summary = dedup_index.payloads.get(key, {}).get(variant)
+        if summary:
+            return {"summary": summary, "duplicate_of": key, "similarity": similarity}
+    return None
+
+async def remember_summary(key: str, signature, variant: str, summary: str):
+    """
+    Index a summarized document, snapshotting the index every DEDUP_SNAPSHOT_EVERY additions.
+    Merging and writing the index take long on large indexes, so both run off the event loop.
+    """
+    await asyncio.to_thread(_remember_summary, key, signature, variant, summary)
+
+def _remember_summary(key: str, signature, variant: str, summary: str):
+    global dedup_unsaved
+    with dedup_lock:
+        payload = dict(dedup_index.payloads.get(key, {}), **{variant: summary})
+        dedup_index.add(key, signature, payload)
+        dedup_unsaved += 1
+        due = DEDUP_SNAPSHOT and dedup_unsaved >= DEDUP_SNAPSHOT_EVERY
+    if due:
+        save_dedup_snapshot()
+
+def save_dedup_snapshot(wait: bool = False):
+    """Writes the duplicate index; without ``wait`` it leaves the additions to a snapshot already being written"""
+    global dedup_unsaved
+    unsaved = 0
+    if not DEDUP_SNAPSHOT or not dedup_save_lock.acquire(blocking=wait):
+        return
+    try:
+        with dedup_lock:
+            unsaved, dedup_unsaved = dedup_unsaved, 0
+        if unsaved:
+            dedup_index.save(DEDUP_SNAPSHOT)
+    except Exception:
+        with dedup_lock:
+            dedup_unsaved += unsaved
+        raise
+    finally:
+        dedup_save_lock.release()
+
+def parse_upload(content: bytes, filename: str) -> ParsedUpload:
+    """Parse, clean and fingerprint an uploaded document"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1].lower()) as temp_file:
+        temp_file.write(content)
+        temp_path = temp_file.name
+    try:
+        document = parser.read_document(temp_path, original_filename=filename)
+    finally:
+        os.unlink(temp_path)
+    text = document.text or ""
+    cleaned = parser.clean_text(text)
+    return ParsedUpload(
+        text=text,
+        cleaned=cleaned,
+        language=document.language,
+        signature=dedup_index.signature(cleaned),
+        document_key=hashlib.sha256(cleaned.encode("utf-8")).hexdigest()[:16]
+    )
+
+def is_large_text(file: UploadFile) -> bool:
+    """Whether an upload is a text file too large to parse in memory"""
+    return os.path.splitext(file.filename)[1].lower() == ".txt" and upload_size(file) > MAX_FILE_SIZE
+
+def upload_size(file: UploadFile) -> int:
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+def save_upload(file: UploadFile) -> str:
+    """Copy an upload to a temporary file a block at a time and return its path"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1].lower()) as temp_file:
+        shutil.copyfileobj(file.file, temp_file, 1024 * 1024)
+    file.file.seek(0)
+    return temp_file.name
+
+def cleaned_text_segments(path: str, progress: Optional[dict] = None):
+    """Cleaned segments of a text file, recording in ``progress`` the share of the file read and the text it gave"""
+    for segment, read in iter_text_progress(path):
+        cleaned = parser.clean_text(segment)
+        if progress is not None:
+            progress["read"] = read
+            progress["chars"] += len(cleaned)
+        yield cleaned
+
+def fingerprint_text_file(path: str):
+    """Language, duplicate signature and key of a text file, read in one streaming pass"""
+    digest = hashlib.sha256()
+    language = None
+
+    def segments():
+        nonlocal language
+        for cleaned in cleaned_text_segments(path):
+            if language is None and cleaned.strip():
+                language = detect_language(cleaned)
+            digest.update(cleaned.encode("utf-8"))
+            yield cleaned
+
+    signature = dedup_index.signature_segments(segments())
+    return language, signature, digest.hexdigest()[:16]
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def merge_padding_stats(stats: List[dict]) -> dict:
+    real_tokens = sum(s["real_tokens"] for s in stats)
+    padded_tokens = sum(s["padded_tokens"] for s in stats)
+    return {
+        "batches": sum(s["batches"] for s in stats),
+        "chunks": sum(s["chunks"] for s in stats),
+        "real_tokens": real_tokens,
+        "padded_tokens": padded_tokens,
+        "padding_efficiency": round(real_tokens / padded_tokens, 3) if padded_tokens else 1.0
+    }
+
+async def summarize_large_text(path: str, filename: str, max_length: Optional[int], min_length: Optional[int],
+                               profile: str, deadline: Optional[float], reuse_duplicates: bool) -> dict:
+    """
+    Summarize a text file too large to hold in memory. One pass fingerprints
+    it for duplicate reuse, a second one summarizes windows of
+    STREAM_WINDOW_CHUNKS chunks as they are read.
+    """
+    language, signature, document_key = await asyncio.to_thread(fingerprint_text_file, path)
+    if language is None:
+        raise ValueError("Empty document")
+    model = await asyncio.to_thread(summarizers.get, language.language)
+
+    variant = summary_variant(profile, language.language, max_length, min_length, False, MAX_EXTRACTIVE_CHUNKS)
+    duplicate = await asyncio.to_thread(find_duplicate, signature, variant) if reuse_duplicates else None
+    if duplicate:
+        logger.info(f"Reusing the summary of {duplicate['duplicate_of']} for {filename} "
+                    f"(similarity {duplicate['similarity']})")
+        return {
+            "summary": duplicate["summary"],
+            "profile": profile,
+            "language": language.language,
+            "complete": True,
+            "coverage": 1.0,
+            "reused": True,
+            "streamed": True,
+            "duplicate_of": duplicate["duplicate_of"],
+            "similarity": duplicate["similarity"]
+        }
+
+    progress = {"read": 0.0, "chars": 0}
+    chunks = model.iter_chunks(cleaned_text_segments(path, progress), chunk_size=CHUNK_SIZE)
+    windows = iter(lambda: list(islice(chunks, STREAM_WINDOW_CHUNKS)), [])
+    summaries, batching, processed_chunks, completed_chunks, completed_chars = [], [], 0, 0, 0
+    finished = False
+    while True:
+        if deadline is not None and summaries and time.time() >= deadline:
+            break
+        # Reading and chunking the next window is file work; keep it off the event loop.
+        window = await asyncio.to_thread(next, windows, None)
+        if window is None:
+            finished = True
+            break
+        chunk_summaries, batching_stats, schedule = await process_chunks(
+            window, max_length, min_length, profile, deadline=deadline, model=model
+        )
+        summaries.extend(s for s in chunk_summaries if s)
+        batching.append(batching_stats)
+        processed_chunks += len(window)
+        completed_chunks += len(schedule.results)
+        completed_chars += sum(len(window[i]) for i in schedule.results)
+
+    if not summaries:
+        raise ValueError("Failed to generate summary")
+    complete = finished and completed_chunks == processed_chunks
+    # Text summarized against the text of the whole file, extrapolated from the share read so far.
+    coverage = 1.0 if complete else round(min(1.0, completed_chars * progress["read"] / max(1, progress["chars"])), 3)
+    if not complete:
+        logger.warning(f"Deadline reached for {filename}: summarized about {coverage:.0%} of the document")
+
+    final_summary = " ".join(summaries)
+    if complete:
+        await remember_summary(document_key, signature, variant, final_summary)
+    return {
+        "summary": final_summary,
+        "profile": profile,
+        "language": language.language,
+        "batching": merge_padding_stats(batching),
+        "complete": complete,
+        "coverage": coverage,
+        "reused": False,
+        "streamed": True
+    }
+
+def analyze_text_file(doc_id: str, path: str, language: Optional[str]):
+    """Corpus statistics of a large text file, analyzed one segment at a time"""
+    segments = cleaned_text_segments(path)
+    if not language:
+        first = next(segments, "")
+        language = detect_language(first).language_name
+        segments = chain([first], segments)
+    return analyze_segments(doc_id, segments, language)
+
+async def prefetch_document(content_key: str, content: bytes, filename: str):
+    """Parse a document, then prepare its QA context and default summary, one idle-priority step at a time"""
+    await prefetcher.idle()
+    document = await pipeline.run_text("tokenize", parse_upload, content, filename, priority=IDLE)
+    if not document.cleaned:
+        return
+    prefetcher.remember(content_key, document)
+    language = document.language.language
+
+    try:
+        await prefetcher.idle()
+        qa = await asyncio.to_thread(qa_models.get, language)
+        qa_context = await pipeline.run_text("tokenize", qa.prepare_context, document.text, priority=IDLE)
+        prefetcher.produced("qa_context", qa_context.document_id)
+    except UnsupportedLanguage:
+        pass
+
+    variant = summary_variant(DEFAULT_PROFILE, language, None, None, False, MAX_EXTRACTIVE_CHUNKS)
+    if await asyncio.to_thread(find_duplicate, document.signature, variant):
+        return
+    await prefetcher.idle()
+    try:
+        model = await asyncio.to_thread(summarizers.get, language)
+    except UnsupportedLanguage:
+        return
+    chunks = model.chunk_text(document.cleaned, chunk_size=CHUNK_SIZE)
+    batches = await pipeline.run_text("tokenize", plan_chunks, chunks, None, None, DEFAULT_PROFILE, model,
+                                      priority=IDLE)
+    results = {}
+    for batch in batches:
+        await prefetcher.idle()
+        async with admission.admit(batch.padded_tokens, IDLE):
+            summaries = await summarize_batch(batch, model, priority=IDLE)
+        results.update(zip((request.index for request in batch.requests), summaries))
+
+    chunk_summaries = [results.get(i, "") for i in range(len(chunks))]
+    if chunk_summaries and all(chunk_summaries):
+        await remember_summary(document.document_key, document.signature, variant, " ".join(chunk_summaries))
+        prefetcher.produced("summary", document.document_key)
+
+async def embed_texts(texts: List[str], priority: int) -> np.ndarray:
+    """Embeds texts batch by batch through the text and model stages, once admitted"""
+    batches = []
+    for start in range(0, len(texts), SEARCH_BATCH_SIZE):
+        batch = texts[start:start + SEARCH_BATCH_SIZE]
+        async with admission.admit(len(batch) * embedder.max_length, priority):
+            batches.append(await pipeline.run(
+                encode=lambda: embedder.encode(batch),
+                infer=embedder.embed_batch,
+                decode=lambda embeddings: embeddings,
+                priority=priority
+            ))
+    return np.concatenate(batches) if batches else np.zeros((0, embedder.dim), dtype=np.float32)
+
+def flush_search_index(min_documents: int = 1):
+    """Writes the search index once at least ``min_documents`` added documents are unflushed"""
+    if search_index is not None and search_index.unflushed_documents >= min_documents:
+        search_index.flush()
+
+# Set once the server has started; cleared while it drains for shutdown.
+ready = False
+
+@app.on_event("startup")
+def startup():
+    global ready
+    ready = True
+
+@app.on_event("shutdown")
+def shutdown():
+    global ready
+    ready = False
+    save_dedup_snapshot(wait=True)
+    flush_search_index()
+
+# Work endpoints; while any of their requests are in progress, prefetching waits.
+FOREGROUND_PATHS = ("/summarize", "/qa/", "/corpus/", "/search")
+
+@app.middleware("http")
+async def track_foreground_requests(request, call_next):
+    global foreground_requests
+    if not request.url.path.startswith(FOREGROUND_PATHS):
+        return await call_next(request)
+    foreground_requests += 1
+    try:
+        return await call_next(request)
+    finally:
+        foreground_requests -= 1
+
+def validate_file(file: UploadFile, allow_large_text: bool = False) -> None:
+    """Validate uploaded file format and size; text files may be up to MAX_TEXT_FILE_SIZE where they are streamed"""
     file_ext = os.path.splitext(file.filename)[1].lower()
     if file_ext not in SUPPORTED_FORMATS and file_ext.lstrip('.') not in SUPPORTED_FORMATS:
         raise HTTPException(
@@ -66,18 +556,71 @@ def validate_file(file: UploadFile) -> None:
         )
 
     try:
-        content = file.file.read()
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size allowed is {MAX_FILE_SIZE/1024/1024:.1f}MB"
-            )
-        file.file.seek(0)
-
+        size = upload_size(file)
     except Exception as e:
         logger.error(f"Error reading file: {str(e)}")
         raise HTTPException(status_code=400, detail="Error reading file")
 
+    max_size = MAX_TEXT_FILE_SIZE if allow_large_text and file_ext == ".txt" else MAX_FILE_SIZE
+    if size > max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size allowed is {max_size/1024/1024:.1f}MB"
+        )
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: 200 once this worker's models are loaded and it serves requests, 503 otherwise"""
+    if not ready:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "pid": os.getpid()})
+    return {"status": "ready", "pid": os.getpid()}
+
+@app.get("/health")
+async def health():
+    """Worker startup time and memory, including how much of it is shared page cache"""
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "startup_seconds": STARTUP_SECONDS,
+        "summarizer_model": SUMMARIZER_MODEL,
+        "qa_model": QA_MODEL,
+        "languages": {"summarizer": summarizers.loaded(), "qa": qa_models.loaded()},
+        "execution": execution.to_dict(),
+        "batch_limits": batch_limits.to_dict() if batch_limits else None,
+        "qa_cascade": qa_cascade.stats.to_dict() if qa_cascade else None,
+        "memory": memory_usage(),
+        "admission": admission.stats(),
+        "executor_pending": model_executor.pending(),
+        "text_pending": text_executor.pending(),
+        "pipeline": pipeline.stats.to_dict(),
+        "prefetch": prefetcher.stats() if PREFETCH else None,
+        "search": search_index.stats() if search_index is not None else None
+    }
+
+@app.post("/documents")
+async def upload_document(file: UploadFile):
+    """Accept a document before it is asked about or summarized, and prepare it in the background"""
+    validate_file(file)
+    content = await file.read()
+    content_key = hashlib.sha256(content).hexdigest()
+    prefetching = PREFETCH and prefetcher.schedule(
+        content_key, lambda: prefetch_document(content_key, content, file.filename))
+    return {"upload_id": content_key, "filename": file.filename, "size": len(content), "prefetching": prefetching}
+
+async def ask_model(model: QuestionAnswerer, question: str, context: str):
+    """Answers on the text and model stages; returns the prepared context, the answer and the seconds taken"""
+    started = time.perf_counter()
+    # Normalized text, offsets and tokens are cached per document for follow-up questions.
+    qa_context = await pipeline.run_text("tokenize", model.prepare_context, context, priority=INTERACTIVE)
+    async with admission.admit(model.window_budget(qa_context), INTERACTIVE):
+        answer = await pipeline.run(
+            encode=lambda: model.encode(question, qa_context),
+            infer=model.predict,
+            decode=model.decode_answer,
+            priority=INTERACTIVE
+        )
+    return qa_context, answer, time.perf_counter() - started
+
 @app.post("/qa/ask")
 async def answer_question(
         question: str = Form(...),
@@ -114,37 +657,31 @@ async def answer_question(
         context = ""
 
         if context_file:
+            temp_path = None
             try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(context_file.filename)[1]) as temp_file:
-                    temp_path = temp_file.name
-                    content = await context_file.read()
-                    temp_file.write(content)
-
-                context = parser.read_file(temp_path)
-
-                if temp_path and os.path.exists(temp_path):
-                    os.unlink(temp_path)
-
-                # try:
-                #     context = parser.read_file(temp_path, original_filename=context_file.filename)
-                #     if not context or len(context.strip()) == 0:
-                #         raise ValueError("Empty document.")
-                #
-                #     context = parser.clean_text(context)
-
-                # finally:
-                #     try:
-                #         os.unlink(temp_path)
-                #     except Exception as e:
-                #         logger.error(f"Error deleting temp file: {str(e)}")
+                content = await context_file.read()
+                prefetched = prefetcher.lookup(hashlib.sha256(content).hexdigest())
+                if prefetched is not None:
+                    context = prefetched.text
+                else:
+                    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(context_file.filename)[1].lower()) as temp_file:
+                        temp_path = temp_file.name
+                        temp_file.write(content)
+
+                    context = await asyncio.to_thread(parser.read_file, temp_path, context_file.filename)
             except Exception as e:
-                if temp_path and os.path.exists(temp_path):
-                    os.unlink(temp_path)
                 logger.error(f"Error processing file: {str(e)}")
                 return JSONResponse(
                     status_code=400,
                     content={"error" : f"Error processing file: {str(e)}"}
                 )
+            finally:
+                # Removed on every path, including a failed write, so failing requests leave nothing behind.
+                if temp_path:
+                    try:
+                        os.unlink(temp_path)
+                    except OSError as e:
+                        logger.error(f"Error deleting temp file: {str(e)}")
         else:
             context = context_text
 
@@ -154,25 +691,48 @@ async def answer_question(
                 content={"error": "Empty context provided."}
             )
 
-        context = parser.clean_text(context)
-
-        answer = qa_model.answer_question(question, context)
+        language = detect_language(context).language
+        model = await asyncio.to_thread(qa_models.get, language)
+        if model.cached_context(context) is not None:
+            prefetcher.used("qa_context", context_id(context))
+        tier = None
+        if qa_cascade is not None and model is qa_cascade.large:
+            qa_context, answer, tier = await qa_cascade.answer_async(question, context, ask_model)
+        else:
+            qa_context, answer, _ = await ask_model(model, question, context)
 
-        if not answer or answer == "Unable to find answer.":
+        if answer is None:
             response_data["answer"] = "Could not find an answer or provided context."
             response_data["success"] = False
+            context_excerpt = qa_context.text[:200] + "..." if len(qa_context.text) > 200 else qa_context.text
+            response_data["context_used"] = context_excerpt
         else:
-            response_data["answer"] = answer
+            response_data["answer"] = answer.text
             response_data["success"] = True
+            # Offsets index the document as sent, before cleaning, so clients can highlight in place.
+            response_data["context_used"] = answer.passage
+            response_data.update(answer.to_dict())
 
-        context_excerpt = context[:200] + "..." if len(context) > 200 else context
-        response_data["context_used"] = context_excerpt
+        response_data["document_id"] = qa_context.document_id
+        response_data["language"] = language
+        response_data["tier"] = tier
 
         return JSONResponse(
             status_code=200,
             content=response_data
         )
 
+    except UnsupportedLanguage as e:
+        return JSONResponse(
+            status_code=422,
+            content={"error": str(e), "success": False}
+        )
+    except Overloaded as e:
+        return JSONResponse(
+            status_code=429,
+            content={"error": str(e), "success": False},
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         import traceback
         traceback_str = traceback.format_exc()
@@ -186,27 +746,104 @@ async def answer_question(
             }
         )
 @app.post("/summarize")
-async def summarize_document(file: UploadFile):
+async def summarize_document(
+        file: UploadFile,
+        max_length: Optional[int] = Form(None),
+        min_length: Optional[int] = Form(None),
+        profile: str = Form(DEFAULT_PROFILE),
+        extractive: bool = Form(False),
+        max_chunks: int = Form(MAX_EXTRACTIVE_CHUNKS),
+        reuse_duplicates: bool = Form(True),
+        deadline_ms: Optional[int] = Form(None),
+        x_deadline_ms: Optional[int] = Header(None)
+):
+    started = time.time()
     try:
 
-        validate_file(file)
+        validate_file(file, allow_large_text=True)
+        try:
+            summarizer.get_profile(profile)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
         logger.info(f"Processing file: {file.filename}")
 
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
         try:
-            text = parser.read_file(temp_path, original_filename=file.filename)
+            deadline = request_deadline(started, deadline_ms if deadline_ms is not None else x_deadline_ms)
+            if is_large_text(file):
+                if extractive:
+                    raise ValueError(f"Extractive summaries are limited to files of {MAX_FILE_SIZE/1024/1024:.1f}MB")
+                path = await asyncio.to_thread(save_upload, file)
+                try:
+                    return await summarize_large_text(path, file.filename, max_length, min_length, profile,
+                                                      deadline, reuse_duplicates)
+                finally:
+                    os.unlink(path)
+
+            content = await file.read()
+            content_key = hashlib.sha256(content).hexdigest()
+            document = prefetcher.lookup(content_key)
+            if document is None:
+                document = await asyncio.to_thread(parse_upload, content, file.filename)
+            text = document.text
             if not text or len(text.strip()) == 0:
                 raise ValueError("Empty document")
+            # Reject unsupported languages before any model work is spent on them.
+            model = await asyncio.to_thread(summarizers.get, document.language.language)
+
+            cleaned = document.cleaned
+            document_key = document.document_key
+            signature = document.signature
+            variant = summary_variant(profile, document.language.language, max_length, min_length,
+                                      extractive, max_chunks)
+            # Lookups wait while another thread merges new documents into the index.
+            duplicate = await asyncio.to_thread(find_duplicate, signature, variant) if reuse_duplicates else None
+            if duplicate is None:
+                # This request does the work now; a background job would only repeat it.
+                prefetcher.cancel(content_key)
+            else:
+                prefetcher.used("summary", duplicate["duplicate_of"])
+            if duplicate:
+                logger.info(f"Reusing the summary of {duplicate['duplicate_of']} for {file.filename} "
+                            f"(similarity {duplicate['similarity']})")
+                return {
+                    "summary": duplicate["summary"],
+                    "profile": profile,
+                    "language": document.language.language,
+                    "complete": True,
+                    "coverage": 1.0,
+                    "reused": True,
+                    "duplicate_of": duplicate["duplicate_of"],
+                    "similarity": duplicate["similarity"]
+                }
+
+            extractive_stats = None
+            if extractive:
+                if max_chunks < 1:
+                    raise ValueError("max_chunks must be at least 1")
+                analyzer = DocumentAnalyzer(text, language=document.language.language_name)
+                extractive_filter = ExtractiveFilter(stop_words=analyzer.stop_words)
+                selection = extractive_filter.select(
+                    analyzer.sentences,
+                    budget=int(max_chunks * CHUNK_SIZE * 0.9),
+                    length_fn=lambda sentence: len(sentence) + 1
+                )
+                extractive_stats = {
+                    "compression_ratio": selection.compression_ratio,
+                    "sentences_kept": len(selection.indices),
+                    "sentences_total": selection.total_sentences
+                }
+                logger.info(f"Extractive stage for {file.filename}: {extractive_stats}")
+                text = selection.text
 
-            clean_text = parser.clean_text(text)
-            chunks = summarizer.chunk_text(clean_text)
+            clean_text = parser.clean_text(text) if extractive else cleaned
+            chunks = model.chunk_text(clean_text, chunk_size=CHUNK_SIZE)
 
             if not chunks:
                 raise ValueError("No content to summarize")
 
+            if extractive and len(chunks) > max_chunks:
+                chunks = chunks[:max_chunks]
+
 
             # summaries: List[str] = []
             #
@@ -222,7 +859,12 @@ async def summarize_document(file: UploadFile):
             # if not summaries:
             #     raise ValueError("Failed to generate summary")
 
-            chunk_summaries = await process_chunks(chunks)
+            chunk_summaries, batching_stats, schedule = await process_chunks(
+                chunks, max_length, min_length, profile, deadline=deadline, model=model
+            )
+            logger.info(f"Batching stats for {file.filename}: {batching_stats}")
+            if not schedule.complete:
+                logger.warning(f"Deadline reached for {file.filename}: summarized {schedule.coverage:.0%} of the document")
 
             valid_summaries = [s for s in chunk_summaries if s]
             if not valid_summaries:
@@ -231,19 +873,37 @@ async def summarize_document(file: UploadFile):
             final_summary = " ".join(valid_summaries)
             logger.info(f"Successfully summarized document:  {file.filename}")
 
-            return {"summary": final_summary}
+            response = {
+                "summary": final_summary,
+                "profile": profile,
+                "language": document.language.language,
+                "batching": batching_stats,
+                "complete": schedule.complete,
+                "coverage": schedule.coverage,
+                "reused": False
+            }
+            if extractive_stats:
+                response["extractive"] = extractive_stats
+                response["compression_ratio"] = extractive_stats["compression_ratio"]
+
+            if schedule.complete:
+                # Partial summaries are never reused; a later request may have time to finish.
+                await remember_summary(document_key, signature, variant, final_summary)
 
+            return response
+
+        except UnsupportedLanguage as e:
+            logger.warning(f"Rejected {file.filename}: {str(e)}")
+            raise HTTPException(status_code=422, detail=str(e))
+        except Overloaded as e:
+            logger.warning(f"Rejected {file.filename}: {str(e)}")
+            raise overloaded_response(e)
         except ValueError as ve:
             logger.error(f"Validation error: {str(ve)}")
             raise HTTPException(status_code=400, detail=str(ve))
         except Exception as e:
             logger.error(f"Processing error: {str(e)}")
             raise HTTPException(status_code=500, detail="Error processing document")
-        finally:
-            try:
-                os.unlink(temp_path)
-            except Exception as e:
-                logger.error(f"Error error removing temporary file: {str(e)}")
     except Exception as e:
         raise
     except Exception as e:
@@ -252,3 +912,175 @@ async def summarize_document(file: UploadFile):
             status_code=500,
             content="An unexpected error occurred")
 
+def _parse_corpus_files(paths: List[str]) -> List[str]:
+    """Parse uploaded corpus files in worker processes and clean them for analytics"""
+    texts = parser.read_files(paths)
+    return [parser.clean_text(text or "") for text in texts]
+
+def _add_to_corpus(texts: dict, language: Optional[str]) -> List[str]:
+    """Add documents to the corpus, each with its detected language unless one is given"""
+    if language:
+        return corpus.add_documents(texts, language)
+
+    by_language = {}
+    for doc_id, text in texts.items():
+        by_language.setdefault(detect_language(text).language_name, {})[doc_id] = text
+
+    added = []
+    for language_name, documents in by_language.items():
+        added.extend(corpus.add_documents(documents, language_name))
+    return added
+
+@app.post("/corpus/documents")
+async def add_corpus_documents(
+        files: List[UploadFile] = File(...),
+        language: Optional[str] = Form(None)
+):
+    """Add documents to the corpus; only documents not seen before are analyzed"""
+    temp_paths = []
+    try:
+        documents = {}
+        large_texts = {}
+        small_paths = []
+        for file in files:
+            validate_file(file, allow_large_text=True)
+            if is_large_text(file):
+                path = await asyncio.to_thread(save_upload, file)
+                temp_paths.append(path)
+                doc_id = await asyncio.to_thread(file_digest, path)
+                if doc_id not in documents:
+                    large_texts[doc_id] = path
+                    documents[doc_id] = file.filename
+                continue
+            content = await file.read()
+            doc_id = hashlib.sha256(content).hexdigest()[:16]
+            if doc_id in documents:
+                continue
+            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1].lower()) as temp_file:
+                temp_file.write(content)
+                temp_paths.append(temp_file.name)
+                small_paths.append(temp_file.name)
+            documents[doc_id] = file.filename
+
+        small_documents = [doc_id for doc_id in documents if doc_id not in large_texts]
+        texts = await asyncio.to_thread(_parse_corpus_files, small_paths)
+        added = await asyncio.to_thread(_add_to_corpus, dict(zip(small_documents, texts)), language)
+        for doc_id, path in large_texts.items():
+            if doc_id in corpus.documents:
+                continue
+            corpus.add_stats([await asyncio.to_thread(analyze_text_file, doc_id, path, language)])
+            added.append(doc_id)
+        logger.info(f"Added {len(added)} of {len(documents)} documents to the corpus")
+
+        return {
+            "documents": [{"id": doc_id, "filename": filename, "added": doc_id in added}
+                          for doc_id, filename in documents.items()],
+            "corpus_size": corpus.aggregate.num_documents
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Corpus error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error analyzing documents")
+    finally:
+        for path in temp_paths:
+            try:
+                os.unlink(path)
+            except Exception as e:
+                logger.error(f"Error removing temporary file: {str(e)}")
+
+@app.get("/corpus/stats")
+async def corpus_stats(top_n: int = 20):
+    """Corpus-wide keywords, readability and lexical diversity distributions"""
+    return corpus.summary(top_n)
+
+@app.get("/corpus/documents/{doc_id}/terms")
+async def corpus_document_terms(doc_id: str, top_n: int = 10):
+    """Terms that distinguish one document from the rest of the corpus"""
+    try:
+        return {"id": doc_id, "terms": corpus.distinctive_terms(doc_id, top_n)}
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=str(ve))
+
+def require_search():
+    if search_index is None:
+        raise HTTPException(status_code=404, detail="Search is not enabled; set SEARCH_INDEX to an index directory")
+
+def parse_passages(content: bytes, filename: str) -> Tuple[ParsedUpload, List[str]]:
+    """Parse an upload and split it into the passages the search index embeds"""
+    document = parse_upload(content, filename)
+    return document, embedder.split_passages(document.cleaned)
+
+@app.post("/search/documents")
+async def add_search_documents(files: List[UploadFile] = File(...)):
+    """Split documents into passages and add their embeddings to the search index"""
+    require_search()
+    results = []
+    for file in files:
+        validate_file(file)
+        content = await file.read()
+        key = hashlib.sha256(content).hexdigest()[:16]
+        if key in search_index:
+            results.append({"id": key, "filename": file.filename, "added": False})
+            continue
+        try:
+            document, passages = await asyncio.to_thread(parse_passages, content, file.filename)
+            embeddings = await embed_texts(passages, BULK)
+        except Overloaded as e:
+            raise overloaded_response(e)
+        except Exception as e:
+            logger.error(f"Error indexing {file.filename}: {str(e)}")
+            raise HTTPException(status_code=400, detail=f"Error processing file {file.filename}: {str(e)}")
+        added = await asyncio.to_thread(search_index.add, key, passages, embeddings,
+                                        {"filename": file.filename, "language": document.language.language})
+        results.append({"id": key, "filename": file.filename, "added": added, "passages": len(passages)})
+
+    if search_index.unflushed_documents >= SEARCH_FLUSH_EVERY:
+        await asyncio.to_thread(flush_search_index, SEARCH_FLUSH_EVERY)
+    return {"documents": results, "index": search_index.stats()}
+
+@app.post("/search")
+async def search_documents(
+        query: str = Form(...),
+        top_k: int = Form(5),
+        passages: int = Form(3),
+        answer: bool = Form(False)
+):
+    """
+    Documents whose passages best match the query, with those passages.
+    With ``answer``, the top passages are also searched for an answer span.
+    """
+    require_search()
+    if not query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    if top_k < 1 or passages < 1:
+        raise HTTPException(status_code=400, detail="top_k and passages must be at least 1")
+    started = time.perf_counter()
+    try:
+        query_embedding = (await embed_texts([query], INTERACTIVE))[0]
+    except Overloaded as e:
+        raise overloaded_response(e)
+    results = await asyncio.to_thread(search_index.search_documents, query_embedding, top_k, passages)
+    response = {"query": query, "results": results, "search_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    if answer and results:
+        best = None
+        top_passages = sorted((passage for result in results for passage in result["passages"]),
+                              key=lambda passage: -passage["score"])[:MAX_SEARCH_ANSWERS]
+        documents = {passage["id"]: result for result in results for passage in result["passages"]}
+        for passage in top_passages:
+            try:
+                model = await asyncio.to_thread(qa_models.get, documents[passage["id"]].get("language", "en"))
+                _, span, _ = await ask_model(model, query, passage["text"])
+            except (UnsupportedLanguage, Overloaded) as e:
+                logger.warning(f"No answer from passage {passage['id']}: {str(e)}")
+                continue
+            if span is not None:
+                # Offsets index the passage text.
+                passage["answer"] = {"text": span.text, "answer_start": span.start, "answer_end": span.end,
+                                     "confidence": span.confidence}
+                if best is None or span.confidence > best["confidence"]:
+                    best = dict(passage["answer"], document=documents[passage["id"]]["key"], passage_id=passage["id"])
+        response["answer"] = best
+    return response
+
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict
+
+from api.admission import BULK, PriorityExecutor
+
+TEXT_STAGES = ("tokenize", "decode")
+
+
+class StageStats:
+    """
+    Busy time of the text and model stages, integrated over every change in
+    activity, so the time text work actually overlapped with inference is
+    measured rather than estimated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {"text": 0, "model": 0}
+        self._last = time.perf_counter()
+        self.items = {stage: 0 for stage in TEXT_STAGES + ("model",)}
+        self.stage_seconds = {stage: 0.0 for stage in self.items}
+        self.text_seconds = 0.0
+        self.model_seconds = 0.0
+        self.overlap_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    def _advance(self, now: float):
+        elapsed = now - self._last
+        text, model = self._active["text"], self._active["model"]
+        if text:
+            self.text_seconds += elapsed
+        if model:
+            self.model_seconds += elapsed
+        if text and model:
+            self.overlap_seconds += elapsed
+        if text or model:
+            self.busy_seconds += elapsed
+        self._last = now
+
+    def enter(self, stage: str) -> float:
+        now = time.perf_counter()
+        with self._lock:
+            self._advance(now)
+            self._active["model" if stage == "model" else "text"] += 1
+        return now
+
+    def exit(self, stage: str, started: float):
+        now = time.perf_counter()
+        with self._lock:
+            self._advance(now)
+            self._active["model" if stage == "model" else "text"] -= 1
+            self.items[stage] += 1
+            self.stage_seconds[stage] += now - started
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            self._advance(time.perf_counter())
+            return {
+                "items": dict(self.items),
+                "stage_seconds": {stage: round(seconds, 3) for stage, seconds in self.stage_seconds.items()},
+                "text_seconds": round(self.text_seconds, 3),
+                "model_seconds": round(self.model_seconds, 3),
+                "overlap_seconds": round(self.overlap_seconds, 3),
+                "busy_seconds": round(self.busy_seconds, 3),
+                # Share of text work hidden behind inference instead of adding to latency.
+                "text_overlap_ratio": round(self.overlap_seconds / self.text_seconds, 3) if self.text_seconds else 0.0,
+            }
+
+
+class StagedPipeline:
+    """
+    Runs tokenization, inference and detokenization as separate stages.
+
+    Text work runs on its own pool, so encoding the next batch and decoding
+    the previous one overlap with ``generate`` on the model threads. The
+    fast tokenizers release the GIL in their batch calls. At most
+    ``max_encoded`` batches may be encoded and not yet through the model;
+    this bounds how much padded input waits in memory.
+    """
+
+    def __init__(self, text_executor: PriorityExecutor, model_executor: PriorityExecutor, max_encoded: int = 6):
+        self.text_executor = text_executor
+        self.model_executor = model_executor
+        self.max_encoded = max_encoded
+        self._encoded_slots = None
+        self.stats = StageStats()
+
+    def _timed(self, stage: str, fn: Callable, *args, **kwargs):
+        started = self.stats.enter(stage)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.stats.exit(stage, started)
+
+    async def run_text(self, stage: str, fn: Callable, *args, priority: int = BULK, **kwargs):
+        """Runs CPU-side text work on the text pool"""
+        return await self.text_executor.run(self._timed, stage, fn, *args, priority=priority, **kwargs)
+
+    async def run_model(self, fn: Callable, *args, priority: int = BULK, **kwargs):
+        """
+        Runs model work on the model pool. Cancelling drops work that has not
+        started; work already running cannot be stopped, so the cancellation
+        only takes effect once it finishes, and callers keep its resources
+        until then.
+        """
+        future = self.model_executor.submit(self._timed, "model", fn, *args, priority=priority, **kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                await asyncio.wait([asyncio.wrap_future(future)])
+            raise
+
+    async def run(self, encode: Callable, infer: Callable, decode: Callable, priority: int = BULK):
+        """``decode(infer(encode()))`` with each call on the pool of its stage"""
+        if self._encoded_slots is None:
+            self._encoded_slots = asyncio.Semaphore(self.max_encoded)
+
+        async with self._encoded_slots:
+            inputs = await self.run_text("tokenize", encode, priority=priority)
+            outputs = await self.run_model(infer, inputs, priority=priority)
+        return await self.run_text("decode", decode, outputs, priority=priority)
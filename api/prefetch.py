@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("document", "qa_context", "summary")
+
+
+@dataclass
+class ParsedUpload:
+    """An uploaded document parsed and cleaned once, with what summary reuse needs"""
+    text: str
+    cleaned: str
+    language: Any
+    signature: Any
+    document_key: str
+
+
+class Prefetcher:
+    """
+    Precomputes work for uploaded documents before anyone asks for it.
+
+    Each document gets one background job. Jobs call ``idle()`` between
+    steps and wait there while more urgent requests run or queue, so
+    interactive work pre-empts prefetching at the granularity of one step
+    (a parse, a tokenization, one summary batch). Parsed documents are kept
+    in a small LRU keyed by upload content. Other results go to the
+    existing caches, and this class only records which keys it produced, so
+    it can report how much prefetched work was used.
+    """
+
+    def __init__(self, is_busy: Callable[[], bool], max_documents: int = 64, max_jobs: int = 16,
+                 poll_seconds: float = 0.05, max_tracked_keys: int = 10_000):
+        self.is_busy = is_busy
+        self.max_documents = max_documents
+        self.max_jobs = max_jobs
+        self.poll_seconds = poll_seconds
+        self.max_tracked_keys = max_tracked_keys
+        self.documents: "OrderedDict[str, Any]" = OrderedDict()
+        self.jobs: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        # Produced keys and whether they were used yet, oldest first.
+        self._produced: Dict[str, "OrderedDict[str, bool]"] = {kind: OrderedDict() for kind in KINDS}
+        self.produced_count = {kind: 0 for kind in KINDS}
+        self.used_count = {kind: 0 for kind in KINDS}
+        self.hits = {kind: 0 for kind in KINDS}
+        self.counts = {"scheduled": 0, "completed": 0, "cancelled": 0, "failed": 0, "dropped": 0, "preemptions": 0}
+
+    def schedule(self, key: str, job: Callable[[], Awaitable]) -> bool:
+        """Starts ``job`` for a document unless it already runs or too many jobs do"""
+        if key in self.jobs:
+            return True
+        if len(self.jobs) >= self.max_jobs:
+            self.counts["dropped"] += 1
+            return False
+        task = asyncio.get_running_loop().create_task(job())
+        self.jobs[key] = task
+        self.counts["scheduled"] += 1
+        task.add_done_callback(lambda finished: self._finished(key, finished))
+        return True
+
+    def _finished(self, key: str, task: asyncio.Task):
+        self.jobs.pop(key, None)
+        if task.cancelled():
+            self.counts["cancelled"] += 1
+        elif task.exception() is not None:
+            self.counts["failed"] += 1
+            logger.warning(f"Prefetch of {key} failed: {task.exception()}")
+        else:
+            self.counts["completed"] += 1
+
+    def cancel(self, key: str):
+        """Stops a document's job, e.g. when a request for the same work arrives first"""
+        task = self.jobs.get(key)
+        if task is not None:
+            task.cancel()
+
+    async def idle(self):
+        """Waits until no more urgent work is running or queued"""
+        if not self.is_busy():
+            return
+        self.counts["preemptions"] += 1
+        while self.is_busy():
+            await asyncio.sleep(self.poll_seconds)
+
+    def remember(self, key: str, document: Any):
+        with self._lock:
+            self.documents[key] = document
+            self.documents.move_to_end(key)
+            while len(self.documents) > self.max_documents:
+                self.documents.popitem(last=False)
+        self.produced("document", key)
+
+    def lookup(self, key: str) -> Optional[Any]:
+        """A prefetched document, counted as used when found"""
+        with self._lock:
+            document = self.documents.get(key)
+            if document is not None:
+                self.documents.move_to_end(key)
+        if document is not None:
+            self.used("document", key)
+        return document
+
+    def produced(self, kind: str, key: str):
+        with self._lock:
+            keys = self._produced[kind]
+            if key in keys:
+                return
+            keys[key] = False
+            self.produced_count[kind] += 1
+            while len(keys) > self.max_tracked_keys:
+                keys.popitem(last=False)
+
+    def used(self, kind: str, key: str) -> bool:
+        """Records a use of ``key`` and returns whether prefetching produced it"""
+        with self._lock:
+            keys = self._produced[kind]
+            if key not in keys:
+                return False
+            if not keys[key]:
+                keys[key] = True
+                self.used_count[kind] += 1
+            self.hits[kind] += 1
+            return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            produced = dict(self.produced_count)
+            used = dict(self.used_count)
+        return {
+            **self.counts,
+            "running": len(self.jobs),
+            "produced": produced,
+            "used": used,
+            "hits": dict(self.hits),
+            # Share of prefetched results that a request later used at least once.
+            "usage_rate": {kind: round(used[kind] / produced[kind], 3) if produced[kind] else None for kind in KINDS},
+        }
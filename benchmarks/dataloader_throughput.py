@@ -0,0 +1,77 @@
+"""
+Throughput of the memory-mapped token DataLoader and padding with and without
+length grouping.
+
+    python benchmarks/dataloader_throughput.py --examples 200000
+    python benchmarks/dataloader_throughput.py --dataset data/reports --workers 0 2 4
+
+Without ``--dataset`` a synthetic dataset with log-normally distributed
+document lengths is written to a temporary directory first.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.data.dataloader import build_dataloader
+from src.data.preprocessing import ShardWriter
+
+
+def write_synthetic(path, num_examples, shard_size, vocab_size=50265, max_length=1024):
+    rng = np.random.default_rng(0)
+    lengths = np.clip(rng.lognormal(mean=5.5, sigma=0.8, size=num_examples).astype(int), 8, max_length)
+    writer = ShardWriter(path, np.dtype(np.uint16), shard_size)
+    for length in lengths:
+        writer.write({"input_ids": rng.integers(4, vocab_size, size=length)})
+    writer.close({"tokenizer": "synthetic", "vocab_size": vocab_size})
+
+
+def measure(path, batch_size, workers, group_by_length, max_batches):
+    loader = build_dataloader(path, batch_size, pad_token_id=1, num_workers=workers, group_by_length=group_by_length)
+    examples = real_tokens = padded_tokens = batches = 0
+    start_time = time.perf_counter()
+    for batch in loader:
+        examples += len(batch["input_ids"])
+        real_tokens += int(batch["attention_mask"].sum())
+        padded_tokens += batch["input_ids"].numel()
+        batches += 1
+        if batches == max_batches:
+            break
+    seconds = time.perf_counter() - start_time
+    return examples / seconds, real_tokens / seconds, real_tokens / max(padded_tokens, 1)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--dataset", help="existing dataset directory; synthetic data by default")
+    arg_parser.add_argument("--examples", type=int, default=200_000)
+    arg_parser.add_argument("--shard-size", type=int, default=50_000)
+    arg_parser.add_argument("--batch-size", type=int, default=16)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    arg_parser.add_argument("--max-batches", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = args.dataset
+        if path is None:
+            path = os.path.join(temp_dir, "synthetic")
+            start_time = time.perf_counter()
+            write_synthetic(path, args.examples, args.shard_size)
+            print(f"Wrote {args.examples} synthetic examples in {time.perf_counter() - start_time:.1f}s")
+
+        for group_by_length in (True, False):
+            for workers in args.workers:
+                examples_per_second, tokens_per_second, efficiency = measure(
+                    path, args.batch_size, workers, group_by_length, args.max_batches)
+                print(f"{'grouped' if group_by_length else 'random ':8} workers={workers}: "
+                      f"{examples_per_second:9.0f} examples/s {tokens_per_second / 1e6:6.2f}M tokens/s, "
+                      f"padding efficiency {efficiency:.1%}")
+
+
+if __name__ == "__main__":
+    main()
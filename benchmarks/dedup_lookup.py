@@ -0,0 +1,59 @@
+"""
+Lookup latency of the near-duplicate index as it grows.
+
+    python benchmarks/dedup_lookup.py --documents 1000000
+
+Signatures are random, so every document is distinct; queries are copies
+of indexed signatures with some positions changed.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.utils.dedup import NearDuplicateIndex
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--documents", type=int, default=1_000_000)
+    arg_parser.add_argument("--queries", type=int, default=2000)
+    arg_parser.add_argument("--changed", type=int, default=12, help="signature positions changed in each query")
+    args = arg_parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    index = NearDuplicateIndex()
+    num_perm = index.hasher.num_perm
+
+    start_time = time.perf_counter()
+    batch_size = 100_000
+    for start in range(0, args.documents, batch_size):
+        signatures = rng.randint(0, 2 ** 32 - 1, size=(min(batch_size, args.documents - start), num_perm),
+                                 dtype=np.uint64).astype(np.uint32)
+        index.add_many([str(start + offset) for offset in range(len(signatures))], signatures)
+    print(f"Indexed {len(index)} documents in {time.perf_counter() - start_time:.1f}s")
+
+    targets = rng.randint(0, len(index), size=args.queries)
+    queries = index.signatures[targets].copy()
+    queries[:, :args.changed] = rng.randint(0, 2 ** 32 - 1, size=(args.queries, args.changed), dtype=np.uint64)
+
+    timings = []
+    found = 0
+    for target, query in zip(targets, queries):
+        start_time = time.perf_counter()
+        match = index.best_match(query)
+        timings.append(time.perf_counter() - start_time)
+        found += match is not None and match[0] == str(target)
+
+    timings = np.array(timings) * 1000
+    print(f"Lookup: median {np.median(timings):.3f}ms, p99 {np.percentile(timings, 99):.3f}ms")
+    print(f"Found the near-duplicate for {found}/{args.queries} queries "
+          f"(about {1 - args.changed / num_perm:.2f} similarity)")
+
+
+if __name__ == "__main__":
+    main()
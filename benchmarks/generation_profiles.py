@@ -0,0 +1,60 @@
+"""
+ROUGE against latency for each summarizer generation profile.
+
+    python benchmarks/generation_profiles.py samples.jsonl
+    python benchmarks/generation_profiles.py samples.jsonl --model sshleifer/distilbart-cnn-12-6 --runs 5
+
+Each line of the JSONL file is ``{"text", "summary"}``, a document and its
+reference summary. All documents are summarized as one batch per run; the
+table reports the average batch time and ROUGE F1 against the references,
+and the full results are saved to ``--output-dir``.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.summarizer import DocumentSummarizer
+from src.training.model_benchmark import ModelBenchmark
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("samples", help="JSONL file of texts and reference summaries")
+    arg_parser.add_argument("--model", default="facebook/bart-large-cnn")
+    arg_parser.add_argument("--profiles", default="fast,balanced,quality")
+    arg_parser.add_argument("--limit", type=int, default=8, help="Number of samples to summarize")
+    arg_parser.add_argument("--runs", type=int, default=3)
+    arg_parser.add_argument("--output-dir", default="benchmarks/results")
+    args = arg_parser.parse_args()
+
+    with open(args.samples) as f:
+        samples = [json.loads(line) for line in f if line.strip()][:args.limit]
+    if not samples:
+        raise SystemExit(f"No samples in {args.samples}")
+
+    benchmark = ModelBenchmark(save_dir=args.output_dir)
+    results = benchmark.benchmark_generation_profiles(
+        DocumentSummarizer(args.model),
+        [sample["text"] for sample in samples],
+        [sample["summary"] for sample in samples],
+        profiles=tuple(args.profiles.split(",")),
+        num_runs=args.runs
+    )
+    benchmark.save_results("generation_profiles.json")
+
+    print(f"{len(samples)} samples on {results['device']}:")
+    print(f"{'profile':>10} {'seconds':>8} {'docs/s':>7} {'rouge1':>7} {'rouge2':>7} {'rougeL':>7}")
+    for profile, result in results["profile_results"].items():
+        if "error" in result:
+            print(f"{profile:>10} error: {result['error']}")
+            continue
+        rouge = result["rouge"]
+        print(f"{profile:>10} {result['avg_time_seconds']:>8.2f} {result['throughput']:>7.2f} "
+              f"{rouge['rouge1']:>7.4f} {rouge['rouge2']:>7.4f} {rouge['rougeL']:>7.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Import time of the project's entry modules, measured with ``python -X importtime``
+in fresh interpreters.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py src.utils.document_analyzer --max-ms 150    # fail on regressions
+
+For each module the cumulative import time is reported with the slowest
+top-level dependencies it pulls in.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    "src.utils.document_analyzer",
+    "src.utils.corpus_analytics",
+    "src.utils.segmentation",
+    "src.utils.document_parser",
+    "src.models.summarizer",
+]
+
+
+def import_times(module: str):
+    """Cumulative import time of ``module`` and of each module it imports directly, in microseconds"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Indentation shows nesting. Entries are listed when their import
+        # finishes, so a module's dependencies come right before it.
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(cumulative), depth))
+
+    for position, (name, cumulative, depth) in enumerate(entries):
+        if name == module and depth == 0:
+            dependencies = []
+            for child_name, child_cumulative, child_depth in reversed(entries[:position]):
+                if child_depth == 0:
+                    break
+                if child_depth == 1:
+                    dependencies.append((child_name, child_cumulative))
+            return cumulative, dependencies
+    # Already imported by the interpreter at startup.
+    return 0, []
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    arg_parser.add_argument("--repeat", type=int, default=3, help="runs per module; the fastest one is kept")
+    arg_parser.add_argument("--top", type=int, default=5, help="slowest dependencies to show")
+    arg_parser.add_argument("--max-ms", type=float, help="exit with an error if any module takes longer")
+    args = arg_parser.parse_args()
+
+    too_slow = []
+    for module in args.modules:
+        total, dependencies = min((import_times(module) for _ in range(args.repeat)), key=lambda run: run[0])
+        total_ms = total / 1000
+        print(f"{module}: {total_ms:.1f}ms")
+        for name, cumulative in sorted(dependencies, key=lambda dependency: -dependency[1])[:args.top]:
+            print(f"    {name:<40} {cumulative / 1000:8.1f}ms")
+
+        if args.max_ms is not None and total_ms > args.max_ms:
+            too_slow.append(module)
+
+    if too_slow:
+        print(f"Slower than {args.max_ms}ms: {too_slow}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
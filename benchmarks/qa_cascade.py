@@ -0,0 +1,72 @@
+"""
+Calibrates the QA cascade threshold and compares the cascade with always
+running the large model.
+
+    python benchmarks/qa_cascade.py questions.jsonl --small deepset/tinyroberta-squad2
+    python benchmarks/qa_cascade.py questions.jsonl --target-accuracy 0.95 --calibration-share 0.3
+
+Each line of the JSONL file is ``{"question", "context", "answer"?}``. The
+first ``--calibration-share`` of the examples sets the threshold; the rest
+are answered by the cascade and by the large model alone. Without a
+reference answer, agreement with the large model counts as correct.
+Set the result as ``QA_CASCADE_THRESHOLD`` for the API.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.qa_cascade import LARGE, QACascade, normalize_answer
+from src.models.qa_model import QuestionAnswerer
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("examples", help="JSONL file of questions and contexts")
+    arg_parser.add_argument("--small", default="deepset/tinyroberta-squad2")
+    arg_parser.add_argument("--large", default="deepset/roberta-base-squad2")
+    arg_parser.add_argument("--target-accuracy", type=float, default=0.9)
+    arg_parser.add_argument("--calibration-share", type=float, default=0.5)
+    args = arg_parser.parse_args()
+
+    with open(args.examples) as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    split = max(1, int(len(examples) * args.calibration_share))
+    calibration, evaluation = examples[:split], examples[split:] or examples
+
+    cascade = QACascade(QuestionAnswerer(args.small), QuestionAnswerer(args.large))
+    print(f"Calibration on {len(calibration)} examples: {cascade.calibrate(calibration, args.target_accuracy)}")
+
+    # Warm both models up so the first timed question does not pay for it.
+    cascade.small.answer_question(evaluation[0]["question"], evaluation[0]["context"])
+    cascade.large.answer_question(evaluation[0]["question"], evaluation[0]["context"])
+
+    large_seconds, cascade_seconds, large_correct, cascade_correct = 0.0, 0.0, 0, 0
+    for example in evaluation:
+        started = time.perf_counter()
+        context = cascade.large.prepare_context(example["context"])
+        large_answer = cascade.large.decode_answer(cascade.large.predict(cascade.large.encode(example["question"], context)))
+        large_seconds += time.perf_counter() - started
+        large_text = large_answer.text if large_answer else ""
+
+        started = time.perf_counter()
+        answer, tier = cascade.answer(example["question"], example["context"])
+        cascade_seconds += time.perf_counter() - started
+        reference = normalize_answer(example.get("answer", large_text))
+        large_correct += normalize_answer(large_text) == reference
+        cascade_correct += normalize_answer(answer.text if answer else "") == reference
+
+    stats = cascade.stats.to_dict()
+    print(f"Evaluation on {len(evaluation)} examples at threshold {cascade.threshold:.4f}:")
+    print(f"  escalation rate {stats['escalation_rate']:.1%} ({stats['answered'][LARGE]} of {stats['questions']})")
+    print(f"  large only: {large_seconds / len(evaluation) * 1000:.1f} ms/question, "
+          f"accuracy {large_correct / len(evaluation):.1%}")
+    print(f"  cascade:    {cascade_seconds / len(evaluation) * 1000:.1f} ms/question, "
+          f"accuracy {cascade_correct / len(evaluation):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Soak test for the API: replays thousands of mixed /summarize and /qa/ask
+requests in-process and fails when memory, file descriptors, threads, log
+handlers or temporary files keep growing.
+
+    python benchmarks/soak.py --requests 2000
+    python benchmarks/soak.py --requests 5000 --max-rss-growth-mb 100 --report soak.json
+    python benchmarks/soak.py --summarizer-model facebook/bart-large-cnn --qa-model deepset/roberta-base-squad2
+
+Without model options, tiny random models from tests/tiny_models.py are
+used, so the run measures the serving code rather than model weights.
+About one request in ten fails on purpose (corrupt or unsupported files),
+because error paths are where cleanup is most often missed. Growth is
+measured after ``--warmup`` requests; the process exits with status 1
+when any measure grows past its limit.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.resource_monitor import ResourceLimits, ResourceMonitor
+from tests.tiny_models import WORDS, save_tiny_models
+
+QUESTIONS = ("what is the rate ?", "who is the client ?", "when is the payment ?", "how much is the invoice ?")
+
+
+def random_text(rng: random.Random, sentences: int) -> str:
+    return " ".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))) + " ." for _ in range(sentences))
+
+
+def next_request(rng: random.Random, repeated: str):
+    """One request as (endpoint, multipart files, form data), drawn from the soak mix"""
+    kind = rng.random()
+    if kind < 0.35:
+        text = random_text(rng, rng.randint(3, 30))
+        return "/summarize", {"file": ("report.txt", text.encode())}, {"profile": "fast"}
+    if kind < 0.5:
+        return "/summarize", {"file": ("repeated.txt", repeated.encode())}, {"profile": "fast"}
+    if kind < 0.75:
+        return "/qa/ask", None, {"question": rng.choice(QUESTIONS), "context_text": random_text(rng, 10)}
+    if kind < 0.9:
+        files = {"context_file": ("context.txt", random_text(rng, 10).encode())}
+        return "/qa/ask", files, {"question": rng.choice(QUESTIONS)}
+    if kind < 0.95:
+        files = {"context_file": ("broken.pdf", b"%PDF-1.4 not really a pdf")}
+        return "/qa/ask", files, {"question": rng.choice(QUESTIONS)}
+    return "/summarize", {"file": ("broken.docx", b"not a zip archive")}, {}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--requests", type=int, default=2000)
+    arg_parser.add_argument("--warmup", type=int, default=200, help="requests before the baseline sample")
+    arg_parser.add_argument("--sample-every", type=int, default=100)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--summarizer-model")
+    arg_parser.add_argument("--qa-model")
+    arg_parser.add_argument("--max-rss-growth-mb", type=float, default=50.0)
+    arg_parser.add_argument("--max-traced-growth-mb", type=float, default=10.0)
+    arg_parser.add_argument("--max-fd-growth", type=int, default=5)
+    arg_parser.add_argument("--max-thread-growth", type=int, default=2)
+    arg_parser.add_argument("--top", type=int, default=10, help="allocation sites to report")
+    arg_parser.add_argument("--report", help="write the samples and findings to this JSON file")
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="soak-")
+    models = save_tiny_models(os.path.join(work_dir, "models"))
+    os.environ["SUMMARIZER_MODEL"] = args.summarizer_model or models["seq2seq"]
+    os.environ["QA_MODEL"] = args.qa_model or models["qa"]
+    os.environ["LOG_FILE"] = os.path.join(work_dir, "app.log")
+    os.environ.pop("DEDUP_SNAPSHOT", None)
+    # Uploads go to a private temporary directory, so anything left in it was left by the API.
+    temp_dir = os.path.join(work_dir, "tmp")
+    os.makedirs(temp_dir)
+    tempfile.tempdir = temp_dir
+
+    from fastapi.testclient import TestClient
+    import api.main as api
+
+    # Request logging still goes through the handlers; only the console noise is dropped.
+    logging.getLogger().setLevel(logging.WARNING)
+    limits = ResourceLimits(rss_mb=args.max_rss_growth_mb, traced_mb=args.max_traced_growth_mb,
+                            open_files=args.max_fd_growth, threads=args.max_thread_growth)
+    monitor = ResourceMonitor(temp_dir=temp_dir, warmup_requests=args.warmup)
+    rng = random.Random(args.seed)
+    repeated = random_text(rng, 20)
+    statuses = {}
+
+    with TestClient(api.app) as client:
+        monitor.start()
+        monitor.sample(0)
+        started = time.perf_counter()
+        print(f"{'requests':>8} {'rss MB':>8} {'traced MB':>9} {'fds':>5} {'threads':>7} {'temp':>5} {'req/s':>7}")
+        for i in range(1, args.requests + 1):
+            endpoint, files, data = next_request(rng, repeated)
+            response = client.post(endpoint, files=files, data=data)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if i % args.sample_every == 0 or i == args.requests:
+                sample = monitor.sample(i)
+                print(f"{i:>8} {sample.rss_mb:>8.1f} {sample.traced_mb:>9.2f} {sample.open_files or 0:>5} "
+                      f"{sample.threads:>7} {sample.temp_files:>5} {i / (time.perf_counter() - started):>7.1f}")
+
+    report = monitor.report(limits, top=args.top)
+    monitor.stop()
+    report["statuses"] = statuses
+    report["samples"] = [vars(sample) for sample in monitor.samples]
+
+    print(f"Status codes: {statuses}")
+    print(f"Growth after {args.warmup} warm-up requests: {report['growth']}")
+    print("Top allocation growth:")
+    for line in report["top_allocators"]:
+        print(f"  {line}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if report["violations"]:
+        for violation in report["violations"]:
+            print(f"FAIL: {violation}")
+        if report["leftover_temp_files"]:
+            print(f"Leftover temporary files: {report['leftover_temp_files']}")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
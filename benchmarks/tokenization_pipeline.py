@@ -0,0 +1,104 @@
+"""
+Compare running tokenization and decoding on the model threads with the
+staged pipeline that gives text work its own pool.
+
+    python benchmarks/tokenization_pipeline.py --model facebook/bart-large-cnn --chunks 48
+    python benchmarks/tokenization_pipeline.py --tiny        # offline, randomly initialized model
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.admission import PriorityExecutor
+from api.pipeline import StagedPipeline
+from src.models.batching import ChunkRequest, LengthBucketer, generation_key
+from src.models.summarizer import DocumentSummarizer
+
+SENTENCE = ("The consultant shall provide the services described in Exhibit A and invoice the client monthly "
+            "at the agreed hourly rate, subject to the limits set out in section {n}. ")
+
+
+def build_batches(summarizer, num_chunks, profile, max_length):
+    chunks = [" ".join(SENTENCE.format(n=i * 10 + j) for j in range(4 + i % 5)) for i in range(num_chunks)]
+    key = generation_key(max_length=max_length, min_length=None, profile=profile)
+    requests = [ChunkRequest(index=i, text=chunk, num_tokens=len(ids), generation_key=key, input_ids=ids)
+                for i, (chunk, ids) in enumerate(zip(chunks, summarizer.encode(chunks)))]
+    return LengthBucketer(max_batch_size=4).plan(requests)
+
+
+async def run_inline(summarizer, batches, workers):
+    """Previous design: every step of a batch runs on one model thread"""
+    executor = PriorityExecutor(max_workers=workers)
+    try:
+        await asyncio.gather(*[
+            executor.run(summarizer.summarize_batch, batch.texts, **batch.generation_kwargs) for batch in batches
+        ])
+    finally:
+        executor.shutdown()
+
+
+async def run_staged(summarizer, batches, workers, text_workers):
+    model_executor = PriorityExecutor(max_workers=workers)
+    text_executor = PriorityExecutor(max_workers=text_workers, name="text-worker")
+    pipeline = StagedPipeline(text_executor, model_executor, max_encoded=2 * workers)
+    try:
+        await asyncio.gather(*[
+            pipeline.run(
+                # Re-tokenize here, like the inline path, so both do the same text work.
+                encode=lambda batch=batch: summarizer.collate(summarizer.encode(batch.texts)),
+                infer=lambda inputs, batch=batch: summarizer.generate_ids(inputs, **batch.generation_kwargs),
+                decode=summarizer.decode
+            )
+            for batch in batches
+        ])
+    finally:
+        model_executor.shutdown()
+        text_executor.shutdown()
+    return pipeline.stats.to_dict()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--model", default="facebook/bart-large-cnn")
+    arg_parser.add_argument("--tiny", action="store_true", help="use a tiny offline model instead of --model")
+    arg_parser.add_argument("--chunks", type=int, default=48)
+    arg_parser.add_argument("--workers", type=int, default=3)
+    arg_parser.add_argument("--text-workers", type=int, default=2)
+    arg_parser.add_argument("--profile", default="fast")
+    arg_parser.add_argument("--max-length", type=int, default=60)
+    args = arg_parser.parse_args()
+
+    model_name = args.model
+    if args.tiny:
+        from tests.tiny_models import save_tiny_seq2seq
+        model_name = save_tiny_seq2seq(os.path.join(tempfile.mkdtemp(), "tiny-seq2seq"))
+
+    summarizer = DocumentSummarizer(model_name)
+    batches = build_batches(summarizer, args.chunks, args.profile, args.max_length)
+    print(f"{args.chunks} chunks in {len(batches)} batches, {args.workers} model threads")
+
+    # Warm up so one-time initialization is not timed.
+    summarizer.summarize_batch(batches[0].texts, **batches[0].generation_kwargs)
+
+    start_time = time.perf_counter()
+    asyncio.run(run_inline(summarizer, batches, args.workers))
+    inline_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    stats = asyncio.run(run_staged(summarizer, batches, args.workers, args.text_workers))
+    staged_seconds = time.perf_counter() - start_time
+
+    print(f"inline  {inline_seconds:.3f}s")
+    print(f"staged  {staged_seconds:.3f}s  ({inline_seconds / staged_seconds:.2f}x)")
+    print(f"text work {stats['text_seconds']:.3f}s, model {stats['model_seconds']:.3f}s, "
+          f"overlapped {stats['overlap_seconds']:.3f}s ({stats['text_overlap_ratio']:.0%} of text work hidden)")
+    print(f"per stage: {stats['stage_seconds']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Search latency and recall of the int8 vector index, flat and with IVF lists.
+
+    python benchmarks/vector_search.py --passages 1000000 --nlist 1024 --nprobe 16
+
+Vectors are drawn around random topic centres, like passages of many
+documents; queries are perturbed copies of indexed vectors. Recall@k is
+measured against exact float32 search over the same vectors.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.utils.vector_index import QuantizedVectorIndex
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def measure(index: QuantizedVectorIndex, queries: np.ndarray, exact: np.ndarray, k: int):
+    timings = []
+    recall = 0
+    for query, expected in zip(queries, exact):
+        start_time = time.perf_counter()
+        found = index.search(query, top_k=k)
+        timings.append(time.perf_counter() - start_time)
+        recall += len(set(expected) & {passage_id for passage_id, _ in found}) / k
+    timings = np.array(timings) * 1000
+    return np.median(timings), np.percentile(timings, 99), recall / len(queries)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--passages", type=int, default=200_000)
+    arg_parser.add_argument("--dim", type=int, default=384)
+    arg_parser.add_argument("--topics", type=int, default=2000)
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--nlist", type=int, default=256)
+    arg_parser.add_argument("--nprobe", type=int, default=16)
+    arg_parser.add_argument("--k", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    topics = normalized(rng.randn(args.topics, args.dim))
+    vectors = normalized(topics[rng.randint(0, args.topics, size=args.passages)]
+                         + 0.6 * normalized(rng.randn(args.passages, args.dim)))
+    targets = rng.randint(0, args.passages, size=args.queries)
+    queries = normalized(vectors[targets] + 0.3 * normalized(rng.randn(args.queries, args.dim)))
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+    print(f"float32 vectors: {vectors.nbytes / 2 ** 20:.0f}MB")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, nlist in (("flat", 0), (f"ivf{args.nlist}", args.nlist)):
+            index = QuantizedVectorIndex(args.dim, path=os.path.join(work_dir, name), nlist=nlist, nprobe=args.nprobe)
+            batch_size = 10_000
+            start_time = time.perf_counter()
+            for start in range(0, args.passages, batch_size):
+                batch = vectors[start:start + batch_size]
+                index.add(str(start), [""] * len(batch), batch)
+            index.flush()
+            build_time = time.perf_counter() - start_time
+
+            index = QuantizedVectorIndex(args.dim, path=os.path.join(work_dir, name), nprobe=args.nprobe)
+            median, p99, recall = measure(index, queries, exact, args.k)
+            size = sum(os.path.getsize(os.path.join(work_dir, name, f)) for f in os.listdir(os.path.join(work_dir, name)))
+            print(f"{name:>8}: built in {build_time:.1f}s, {size / 2 ** 20:.0f}MB on disk, "
+                  f"search median {median:.2f}ms, p99 {p99:.2f}ms, recall@{args.k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ import json
 from pathlib import Path
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from src.utils.document_analyzer import document_analytics_tab
+from src.utils.analytics_dashboard import document_analytics_tab
 
 MAX_FILE_SIZE = 1024 * 1024 * 10
 SUPPORTED_FORMATS = ['.pdf', '.txt', '.docx']
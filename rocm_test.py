@@ -2,6 +2,8 @@ import torch
 import transformers
 from transformers import AutoTokenizer, AutoModel
 
+from src.models.device import get_execution_device
+
 print(f"PyTorch version: {torch.__version__}")
 print(f"CUDA available: {torch.cuda.is_available()}")
 if torch.cuda.is_available():
@@ -10,8 +12,10 @@ if torch.cuda.is_available():
 tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
 model = AutoModel.from_pretrained("bert-base-uncased")
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = model.to(device)
+execution = get_execution_device()
+print(f"Execution device: {execution.to_dict()}")
+device = execution.device
+model = model.to(device=device, dtype=execution.dtype)
 
 text = "Test transformers installation."
 inputs = tokenizer(text, return_tensors="pt").to(device)
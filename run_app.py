@@ -1,7 +1,27 @@
+"""
+Launches the API backend and the Streamlit frontend.
+
+    python run_app.py                          # one backend worker and the frontend
+    python run_app.py --workers 4              # four backend workers sharing port 8000
+    python run_app.py --workers 4 --preload    # load models once, then fork the workers
+
+Backend workers share one listening socket, so the kernel spreads incoming
+connections over them. With ``--preload`` the launcher imports the app,
+loading the models, and forks the workers afterwards; their weights stay
+shared copy-on-write pages. Preloading is only for CPU workers: CUDA
+cannot be used in a process forked after it was initialized, so the
+launcher refuses ``--preload`` when DEVICE selects an accelerator. Crashed
+workers are restarted with exponential backoff. Each process logs to its own file in ``--log-dir``.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
 import subprocess
+import sys
 import time
-import webbrowser
-import os
+import urllib.request
 import logging
 from pathlib import Path
 
@@ -36,35 +56,260 @@ def create_cache_dir():
     cache_dir.mkdir(exist_ok=True)
     logger.info("Cache dir verified/created")
 
-def run_backend():
-    """Run the FastAPI backend"""
-    try:
-        process = subprocess.Popen(
-            ["uvicorn", "api.main:app", "--host", "localhost", "--port", "8000"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
+def open_log(log_dir: Path, name: str):
+    """Append-mode log file for a child process, so its output is never left unread in a pipe"""
+    log_dir.mkdir(parents=True, exist_ok=True)
+    return open(log_dir / f"{name}.log", "ab", buffering=0)
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket shared by every backend worker"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class ForkedProcess:
+    """``Popen``-like handle of a worker forked from the launcher"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid:
+                self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def terminate(self):
+        self._signal(signal.SIGTERM)
+
+    def kill(self):
+        self._signal(signal.SIGKILL)
+
+    def _signal(self, signum):
+        if self.poll() is None:
+            os.kill(self.pid, signum)
+
+    def wait(self, timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() > deadline:
+                raise subprocess.TimeoutExpired(str(self.pid), timeout)
+            time.sleep(0.1)
+        return self.returncode
+
+
+class Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.restart_at = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"backend-{self.index}"
+
+
+class BackendSupervisor:
+    """
+    Runs ``workers`` backend processes on one shared socket and restarts
+    the ones that exit. The restart delay doubles with every crash in a row,
+    up to ``max_backoff`` seconds; a worker that stays up for
+    ``stable_seconds`` starts over at ``min_backoff``.
+    """
+
+    def __init__(self, workers: int, host: str, port: int, log_dir: Path, preload: bool = False,
+                 min_backoff: float = 1.0, max_backoff: float = 60.0, stable_seconds: float = 60.0):
+        if preload and not hasattr(os, "fork"):
+            raise RuntimeError("--preload needs os.fork, which this platform does not have")
+        self.host = host
+        self.port = port
+        self.log_dir = log_dir
+        self.preload = preload
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_seconds = stable_seconds
+        self.workers = [Worker(index) for index in range(workers)]
+        self.socket = bind_socket(host, port)
+        self.app = None
+        self.num_threads = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        if self.preload:
+            import torch
+            from src.models.device import select_device
+
+            # Only the device is resolved here: picking a dtype would already initialize CUDA.
+            device = select_device(os.environ.get("DEVICE"), "float32").device
+            if device.type != "cpu":
+                raise RuntimeError(f"--preload forks the workers after loading the models on {device}, "
+                                   f"which forked processes cannot use; set DEVICE=cpu or drop --preload")
+            started = time.time()
+            # Importing the app loads the models in this process; forked workers share the pages.
+            from api.main import app
+            self.app = app
+            self.num_threads = torch.get_num_threads()
+            logger.info(f"Preloaded the backend in {time.time() - started:.1f}s")
+        for worker in self.workers:
+            self._launch(worker)
+
+    def _launch(self, worker: Worker):
+        log_file = open_log(self.log_dir, worker.name)
+        try:
+            worker.process = self._fork(log_file) if self.preload else self._spawn(log_file)
+        finally:
+            log_file.close()
+        worker.started_at = time.monotonic()
+        logger.info(f"Started {worker.name} (pid {worker.process.pid})")
+
+    def _spawn(self, log_file) -> subprocess.Popen:
+        fd = self.socket.fileno()
+        return subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api.main:app", "--fd", str(fd)],
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            pass_fds=(fd,)
         )
-        logger.info("Backend server started")
-        return process
-    except Exception as e:
-        logger.error(f"Failed to start backend: {str(e)}")
-        raise e
 
-def run_frontend():
+    def _fork(self, log_file) -> ForkedProcess:
+        pid = os.fork()
+        if pid:
+            return ForkedProcess(pid)
+
+        # Worker process: never return into the launcher's code.
+        exit_code = 1
+        try:
+            os.setsid()
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.dup2(log_file.fileno(), sys.stdout.fileno())
+            os.dup2(log_file.fileno(), sys.stderr.fileno())
+            # Only the forking thread exists in the child; size the intra-op pool again before any model runs.
+            import torch
+            torch.set_num_threads(self.num_threads)
+            # The worker logs to its own file, not the launcher's.
+            for handler in list(logging.root.handlers):
+                if isinstance(handler, logging.FileHandler):
+                    logging.root.removeHandler(handler)
+            import uvicorn
+            uvicorn.Server(uvicorn.Config(self.app)).run(sockets=[self.socket])
+            exit_code = 0
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+        finally:
+            os._exit(exit_code)
+
+    def wait_ready(self, timeout: float) -> bool:
+        """
+        Polls ``/ready`` until every running worker has answered it; returns
+        False on timeout or when every worker keeps crashing. Workers share the
+        socket, so any one request reaches whichever worker accepts it first;
+        the pid in each answer tells them apart.
+        """
+        deadline = time.monotonic() + timeout
+        ready_pids = set()
+        while time.monotonic() < deadline:
+            for _ in range(2 * len(self.workers)):
+                try:
+                    with urllib.request.urlopen(self.url + "/ready", timeout=2) as response:
+                        if response.status == 200:
+                            ready_pids.add(json.loads(response.read())["pid"])
+                except OSError:
+                    break
+            self.check()
+            running = {worker.process.pid for worker in self.workers if worker.process is not None}
+            if len(running) == len(self.workers) and running <= ready_pids:
+                logger.info(f"Backend ready: {len(running)} worker(s), pids {sorted(running)}")
+                return True
+            if all(worker.failures >= 3 for worker in self.workers):
+                logger.error("Every backend worker crashed three times before becoming ready")
+                return False
+            time.sleep(0.5)
+        return False
+
+    def check(self):
+        """Schedules restarts for workers that exited and launches those that are due"""
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.process is not None:
+                code = worker.process.poll()
+                if code is None:
+                    if worker.failures and now - worker.started_at > self.stable_seconds:
+                        worker.failures = 0
+                    continue
+                worker.failures += 1
+                delay = min(self.max_backoff, self.min_backoff * 2 ** (worker.failures - 1))
+                worker.restart_at = now + delay
+                worker.process = None
+                logger.error(f"{worker.name} exited with code {code}; restarting in {delay:.0f}s "
+                             f"(see {self.log_dir / (worker.name + '.log')})")
+            elif now >= worker.restart_at:
+                self._launch(worker)
+
+    def stop(self, timeout: float = 30.0):
+        running = [worker.process for worker in self.workers if worker.process is not None]
+        for process in running:
+            process.terminate()
+        for process in running:
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.socket.close()
+
+
+def run_frontend(log_dir: Path, port: int = 8501):
     """Run the StreamLit frontend"""
     try:
+        log_file = open_log(log_dir, "frontend")
         process = subprocess.Popen(
-            ["streamlit", "run", "frontend/app.py", "--server.port", "8501"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
+            ["streamlit", "run", "frontend/app.py", "--server.port", str(port), "--server.headless", "true"],
+            stdout=log_file,
+            stderr=subprocess.STDOUT
         )
+        log_file.close()
         logger.info("Frontend server started")
         return process
     except Exception as e:
         logger.error(f"Failed to start frontend: {str(e)}")
         raise e
 
+def stop_on_signal(signum, frame):
+    raise KeyboardInterrupt
+
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 1)))
+    arg_parser.add_argument("--preload", action="store_true", help="load models once and fork the workers")
+    arg_parser.add_argument("--host", default="localhost")
+    arg_parser.add_argument("--port", type=int, default=8000)
+    arg_parser.add_argument("--frontend-port", type=int, default=8501)
+    arg_parser.add_argument("--no-frontend", action="store_true")
+    arg_parser.add_argument("--ready-timeout", type=float, default=900, help="seconds to wait for every backend worker")
+    arg_parser.add_argument("--log-dir", type=Path, default=Path("logs"))
+    return arg_parser.parse_args()
+
 def main():
+    args = parse_args()
+    backend = None
+    frontend_process = None
+
+    # Stop cleanly on SIGTERM, as on Ctrl+C.
+    signal.signal(signal.SIGTERM, stop_on_signal)
+
     try:
         print("Starting Document Analyzer...")
 
@@ -72,34 +317,28 @@ def main():
 
         create_cache_dir()
 
-        print("Starting backend server...")
-        backend_process = run_backend()
-        time.sleep(3)
-
-        if backend_process.poll() is not None:
-            raise Exception("Backend server failed to start.")
-
-        print("Starting Frontend server...")
-        frontend_process = run_frontend()
-        time.sleep(3)
+        print(f"Starting {args.workers} backend worker(s)...")
+        backend = BackendSupervisor(args.workers, args.host, args.port, args.log_dir, preload=args.preload)
+        backend.start()
 
-        if frontend_process.poll() is not None:
-            backend_process.terminate()
-            raise Exception("Frontend server failed to start.")
+        if not backend.wait_ready(args.ready_timeout):
+            raise Exception(f"Backend did not become ready; see the logs in {args.log_dir}")
 
-        # webbrowser.open("http://localhost:8501")
+        if not args.no_frontend:
+            print("Starting Frontend server...")
+            frontend_process = run_frontend(args.log_dir, args.frontend_port)
 
         print("Application is running!")
-        print("Backend URL: http://localhost:8000")
-        print("Frontend URL: http://localhost:8501")
+        print(f"Backend URL: {backend.url}")
+        if frontend_process:
+            print(f"Frontend URL: http://localhost:{args.frontend_port}")
         print("Press Ctrl+C to exit.")
 
         while True:
             time.sleep(1)
 
-            if backend_process.poll() is not None:
-                raise Exception("Backend server stopped unexpectedly.")
-            if frontend_process.poll() is not None:
+            backend.check()
+            if frontend_process and frontend_process.poll() is not None:
                 raise Exception("Frontend server stopped unexpectedly.")
     except KeyboardInterrupt:
         print("\nStopping application...")
@@ -110,11 +349,13 @@ def main():
 
     finally:
         try:
-            backend_process.terminate()
-            frontend_process.terminate()
+            if frontend_process:
+                frontend_process.terminate()
+            if backend:
+                backend.stop()
             print("Application stopped!")
         except Exception as e:
             logger.error(f"Error during cleanup: {str(e)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
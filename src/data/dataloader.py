@@ -0,0 +1,177 @@
+"""
+Random access to pre-tokenized datasets written by ``src.data.preprocessing``.
+
+Token arrays stay memory-mapped, so only the examples in a batch are read
+from disk and DataLoader workers share the page cache instead of holding
+copies of the corpus.
+"""
+import json
+import os
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset, Sampler
+
+from src.data.preprocessing import MANIFEST_FILE
+
+LABEL_PAD_ID = -100
+
+
+class TokenDataset(Dataset):
+    """
+    Examples of a sharded token dataset as ``{field: np.ndarray}``.
+
+    Memory maps are opened lazily in each process. Pickling the dataset for
+    a DataLoader worker sends only the manifest, never the arrays.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        self.fields: List[str] = self.manifest["fields"]
+        self.dtype = np.dtype(self.manifest["dtype"])
+        self.shard_names = [shard["name"] for shard in self.manifest["shards"]]
+        # Global index of the first example of each shard.
+        self.shard_starts = np.cumsum([0] + [shard["num_examples"] for shard in self.manifest["shards"]])
+        self._offsets: Optional[List[Dict[str, np.ndarray]]] = None
+        self._tokens: Optional[List[Dict[str, np.ndarray]]] = None
+        self._lengths: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return int(self.shard_starts[-1])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_offsets"] = None
+        state["_tokens"] = None
+        return state
+
+    def _open(self):
+        self._offsets, self._tokens = [], []
+        for name in self.shard_names:
+            directory = os.path.join(self.path, name)
+            self._offsets.append({field: np.load(os.path.join(directory, f"{field}.offsets.npy"), mmap_mode="r")
+                                  for field in self.fields})
+            self._tokens.append({field: self._memmap(os.path.join(directory, f"{field}.bin"))
+                                 for field in self.fields})
+
+    def _memmap(self, path: str) -> np.ndarray:
+        # np.memmap rejects empty files, e.g. labels of a dataset without summaries.
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=self.dtype)
+        return np.memmap(path, dtype=self.dtype, mode="r")
+
+    def locate(self, index: int):
+        """Shard number and position within the shard of a global example index"""
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index {index} out of range for a dataset of {len(self)} examples")
+        shard = int(np.searchsorted(self.shard_starts, index, side="right")) - 1
+        return shard, index - int(self.shard_starts[shard])
+
+    def __getitem__(self, index: int) -> Dict[str, np.ndarray]:
+        if self._tokens is None:
+            self._open()
+        shard, position = self.locate(index)
+        example = {}
+        for field in self.fields:
+            offsets = self._offsets[shard][field]
+            example[field] = np.asarray(self._tokens[shard][field][offsets[position]:offsets[position + 1]],
+                                        dtype=np.int64)
+        return example
+
+    def lengths(self, field: str = "input_ids") -> np.ndarray:
+        """Token count of every example, read from the offsets index alone"""
+        if field not in self._lengths:
+            lengths = []
+            for name in self.shard_names:
+                offsets = np.load(os.path.join(self.path, name, f"{field}.offsets.npy"), mmap_mode="r")
+                lengths.append(np.diff(offsets))
+            self._lengths[field] = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+        return self._lengths[field]
+
+
+class LengthGroupedSampler(Sampler):
+    """
+    Batches of examples with similar lengths, so little compute goes to padding.
+
+    Each epoch the indices are shuffled and cut into pools of
+    ``batch_size * pool_batches`` examples. Every pool is sorted by length
+    and split into batches, and the order of all batches is shuffled again.
+    Batches stay random across the dataset while lengths within a batch
+    are close.
+    """
+
+    def __init__(self, lengths: np.ndarray, batch_size: int, pool_batches: int = 50, shuffle: bool = True,
+                 drop_last: bool = False, seed: int = 0):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.pool_size = batch_size * pool_batches
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def __len__(self) -> int:
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        return -(-len(self.lengths) // self.batch_size)
+
+    def __iter__(self) -> Iterator[List[int]]:
+        rng = np.random.default_rng(self.seed + self.epoch)
+        indices = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+
+        batches = []
+        for start in range(0, len(indices), self.pool_size):
+            pool = indices[start:start + self.pool_size]
+            pool = pool[np.argsort(self.lengths[pool], kind="stable")]
+            batches.extend(pool[i:i + self.batch_size] for i in range(0, len(pool), self.batch_size))
+        if self.drop_last:
+            batches = [batch for batch in batches if len(batch) == self.batch_size]
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        for batch in batches:
+            yield batch.tolist()
+
+
+class TokenCollator:
+    """Pads examples into a batch of tensors with an attention mask; labels are padded with -100"""
+
+    def __init__(self, pad_token_id: int):
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, examples: List[Dict[str, np.ndarray]]) -> Dict[str, torch.Tensor]:
+        batch = {}
+        for field in examples[0]:
+            pad_id = LABEL_PAD_ID if field == "labels" else self.pad_token_id
+            length = max(len(example[field]) for example in examples)
+            padded = np.full((len(examples), length), pad_id, dtype=np.int64)
+            for row, example in enumerate(examples):
+                padded[row, :len(example[field])] = example[field]
+            batch[field] = torch.from_numpy(padded)
+            if field == "input_ids":
+                mask = np.zeros((len(examples), length), dtype=np.int64)
+                for row, example in enumerate(examples):
+                    mask[row, :len(example[field])] = 1
+                batch["attention_mask"] = torch.from_numpy(mask)
+        return batch
+
+
+def build_dataloader(path: str, batch_size: int, pad_token_id: int, num_workers: int = 0, shuffle: bool = True,
+                     group_by_length: bool = True, seed: int = 0, **kwargs) -> DataLoader:
+    """DataLoader over a pre-tokenized dataset, by default with length-grouped batches"""
+    dataset = TokenDataset(path)
+    if group_by_length:
+        batch_sampler = LengthGroupedSampler(dataset.lengths(), batch_size, shuffle=shuffle, seed=seed)
+    else:
+        generator = torch.Generator().manual_seed(seed)
+        sampler = torch.utils.data.RandomSampler(dataset, generator=generator) if shuffle else None
+        batch_sampler = torch.utils.data.BatchSampler(sampler or range(len(dataset)), batch_size, drop_last=False)
+    return DataLoader(dataset, batch_sampler=batch_sampler, collate_fn=TokenCollator(pad_token_id),
+                      num_workers=num_workers, persistent_workers=num_workers > 0, **kwargs)
@@ -0,0 +1,237 @@
+"""
+Parses and tokenizes documents into sharded, memory-mapped token arrays.
+
+    python -m src.data.preprocessing reports/ --output data/reports --tokenizer facebook/bart-large-cnn
+    python -m src.data.preprocessing pairs.jsonl --output data/pairs --workers 8
+
+Inputs are document files (pdf, docx, txt), directories of them, or JSONL
+manifests with one ``{"text": ...}`` or ``{"path": ...}`` record per line
+and an optional ``"summary"``. Documents are parsed, cleaned with the
+summarization profile and tokenized in worker processes.
+
+Each field is stored per shard as a flat ``<field>.bin`` token array plus an
+``<field>.offsets.npy`` index, where example ``i`` is
+``tokens[offsets[i]:offsets[i + 1]]``. ``dataset.json`` lists the shards and
+is written last, so an interrupted run never looks complete.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "dataset.json"
+DOCUMENT_EXTENSIONS = (".pdf", ".docx", ".txt")
+SOURCE_PREFIX = "summarize: "
+
+
+def token_dtype(vocab_size: int) -> np.dtype:
+    """Smallest unsigned dtype that holds every token id"""
+    return np.dtype(np.uint16) if vocab_size <= np.iinfo(np.uint16).max + 1 else np.dtype(np.uint32)
+
+
+def iter_records(inputs: List[str]) -> Iterator[Dict]:
+    """Yields ``{"path"|"text", "summary"?}`` records from files, directories and JSONL manifests"""
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            for directory, _, file_names in sorted(os.walk(input_path)):
+                for file_name in sorted(file_names):
+                    if file_name.lower().endswith(DOCUMENT_EXTENSIONS):
+                        yield {"path": os.path.join(directory, file_name)}
+        elif input_path.endswith(".jsonl"):
+            base = os.path.dirname(os.path.abspath(input_path))
+            with open(input_path, encoding="utf-8") as manifest:
+                for line in manifest:
+                    if line.strip():
+                        record = json.loads(line)
+                        if "path" in record:
+                            record["path"] = os.path.join(base, record["path"])
+                        yield record
+        else:
+            yield {"path": input_path}
+
+
+def _batches(records: Iterator[Dict], batch_size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_worker = {}
+
+
+def _init_worker(tokenizer_name: str, max_source_length: int, max_target_length: int, source_prefix: str,
+                 with_targets: bool):
+    from transformers import AutoTokenizer
+
+    from src.utils.document_parser import DocumentParser
+
+    _worker.update(
+        tokenizer=AutoTokenizer.from_pretrained(tokenizer_name),
+        parser=DocumentParser(),
+        max_source_length=max_source_length,
+        max_target_length=max_target_length,
+        source_prefix=source_prefix,
+        with_targets=with_targets,
+    )
+
+
+def _tokenize_batch(records: List[Dict]) -> List[Optional[Dict[str, List[int]]]]:
+    """Parses and tokenizes one batch of records in a worker; unreadable documents become ``None``"""
+    parser = _worker["parser"]
+    tokenizer = _worker["tokenizer"]
+
+    texts, summaries, keep = [], [], []
+    for position, record in enumerate(records):
+        try:
+            text = record["text"] if "text" in record else parser.read_file(record["path"])
+        except Exception as e:
+            logger.warning(f"Skipping {record.get('path')}: {e}")
+            continue
+        text = parser.clean_text(text or "")
+        if not text:
+            continue
+        texts.append(_worker["source_prefix"] + text)
+        summaries.append(parser.clean_text(record.get("summary") or ""))
+        keep.append(position)
+
+    results: List[Optional[Dict[str, List[int]]]] = [None] * len(records)
+    if not texts:
+        return results
+
+    sources = tokenizer(texts, truncation=True, max_length=_worker["max_source_length"])["input_ids"]
+    if _worker["with_targets"]:
+        targets = tokenizer(text_target=summaries, truncation=True, max_length=_worker["max_target_length"])["input_ids"]
+    for i, position in enumerate(keep):
+        example = {"input_ids": sources[i]}
+        if _worker["with_targets"]:
+            # Documents without a reference summary get empty labels, e.g. to be filled by a teacher model.
+            example["labels"] = targets[i] if summaries[i] else []
+        results[position] = example
+    return results
+
+
+class ShardWriter:
+    """Appends tokenized examples to the current shard and starts a new one every ``shard_size`` examples"""
+
+    def __init__(self, output_dir: str, dtype: np.dtype, shard_size: int = 100_000):
+        self.output_dir = output_dir
+        self.dtype = dtype
+        self.shard_size = shard_size
+        self.shards: List[Dict] = []
+        self.fields: List[str] = []
+        self._files = {}
+        self._offsets: Dict[str, List[int]] = {}
+        self._count = 0
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _open_shard(self, fields: List[str]):
+        name = f"shard-{len(self.shards):05d}"
+        os.makedirs(os.path.join(self.output_dir, name), exist_ok=True)
+        self.fields = fields
+        self._files = {field: open(os.path.join(self.output_dir, name, f"{field}.bin"), "wb") for field in fields}
+        self._offsets = {field: [0] for field in fields}
+        self._count = 0
+        self.shards.append({"name": name, "num_examples": 0})
+
+    def write(self, example: Dict[str, List[int]]):
+        if not self._files:
+            self._open_shard(sorted(example))
+        elif sorted(example) != self.fields:
+            raise ValueError(f"Every example needs the fields {self.fields}, got {sorted(example)}")
+
+        for field, tokens in example.items():
+            self._files[field].write(np.asarray(tokens, dtype=self.dtype).tobytes())
+            self._offsets[field].append(self._offsets[field][-1] + len(tokens))
+        self._count += 1
+        if self._count == self.shard_size:
+            self._close_shard()
+
+    def _close_shard(self):
+        if not self._files:
+            return
+        shard = self.shards[-1]
+        for field, file in self._files.items():
+            file.close()
+            np.save(os.path.join(self.output_dir, shard["name"], f"{field}.offsets.npy"),
+                    np.asarray(self._offsets[field], dtype=np.int64))
+        shard["num_examples"] = self._count
+        shard["num_tokens"] = {field: offsets[-1] for field, offsets in self._offsets.items()}
+        self._files = {}
+
+    def close(self, metadata: Dict) -> Dict:
+        """Finishes the last shard and writes the manifest"""
+        self._close_shard()
+        manifest = dict(metadata, dtype=self.dtype.name, fields=self.fields, shards=self.shards,
+                        num_examples=sum(shard["num_examples"] for shard in self.shards))
+        temp_path = os.path.join(self.output_dir, MANIFEST_FILE + ".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, os.path.join(self.output_dir, MANIFEST_FILE))
+        return manifest
+
+
+def preprocess(inputs: List[str], output_dir: str, tokenizer_name: str, max_source_length: int = 1024,
+               max_target_length: int = 256, shard_size: int = 100_000, workers: Optional[int] = None,
+               batch_size: int = 64, source_prefix: str = SOURCE_PREFIX, with_targets: Optional[bool] = None) -> Dict:
+    """
+    Tokenizes every input document into a sharded dataset in ``output_dir``
+    and returns its manifest. Reference summaries are stored as ``labels``
+    when ``with_targets`` is set, by default when the first record has one.
+    """
+    from transformers import AutoTokenizer
+
+    if with_targets is None:
+        first = next(iter_records(inputs), {})
+        with_targets = "summary" in first
+
+    vocab_size = len(AutoTokenizer.from_pretrained(tokenizer_name))
+    writer = ShardWriter(output_dir, token_dtype(vocab_size), shard_size)
+    init_args = (tokenizer_name, max_source_length, max_target_length, source_prefix, with_targets)
+    skipped = 0
+
+    # imap keeps only a few batches in flight, so the input can be far larger than memory.
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=init_args) as pool:
+        for results in pool.imap(_tokenize_batch, _batches(iter_records(inputs), batch_size), chunksize=1):
+            for example in results:
+                if example is None:
+                    skipped += 1
+                else:
+                    writer.write(example)
+
+    manifest = writer.close({"tokenizer": tokenizer_name, "vocab_size": vocab_size,
+                             "max_source_length": max_source_length, "max_target_length": max_target_length,
+                             "source_prefix": source_prefix})
+    logger.info(f"Wrote {manifest['num_examples']} examples in {len(manifest['shards'])} shards "
+                f"to {output_dir}; skipped {skipped} empty or unreadable documents")
+    return manifest
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("inputs", nargs="+", help="documents, directories or JSONL manifests")
+    arg_parser.add_argument("--output", required=True)
+    arg_parser.add_argument("--tokenizer", default="facebook/bart-large-cnn")
+    arg_parser.add_argument("--max-source-length", type=int, default=1024)
+    arg_parser.add_argument("--max-target-length", type=int, default=256)
+    arg_parser.add_argument("--shard-size", type=int, default=100_000, help="examples per shard")
+    arg_parser.add_argument("--workers", type=int, default=None, help="worker processes; all cores by default")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    preprocess(args.inputs, args.output, args.tokenizer, args.max_source_length, args.max_target_length,
+               args.shard_size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import logging
+import os
+from typing import Dict
+
+import torch
+from transformers import AutoConfig, AutoModel, AutoModelForQuestionAnswering, AutoModelForSeq2SeqLM
+from transformers.modeling_outputs import BaseModelOutput, QuestionAnsweringModelOutput
+
+from src.models.snapshot import has_safetensors, load_model_mmap
+
+logger = logging.getLogger(__name__)
+
+TASKS = ("qa", "seq2seq", "feature-extraction")
+TORCHSCRIPT_FILE = "model.torchscript.pt"
+
+_AUTO_CLASSES = {
+    "qa": AutoModelForQuestionAnswering,
+    "seq2seq": AutoModelForSeq2SeqLM,
+    "feature-extraction": AutoModel,
+}
+
+
+def _check_task(task: str):
+    if task not in TASKS:
+        raise ValueError(f"Unknown task: {task}. Supported tasks: {list(TASKS)}")
+
+
+def _warn_fixed_precision(backend: str, dtype: torch.dtype):
+    if dtype != torch.float32:
+        logger.warning(f"The {backend} backend runs in the precision it was exported in; ignoring {dtype}")
+
+
+def _example_inputs(sequence_length: int = 16):
+    input_ids = torch.full((1, sequence_length), 5, dtype=torch.long)
+    attention_mask = torch.ones_like(input_ids)
+    return input_ids, attention_mask
+
+
+class InferenceBackend:
+    """
+    Loads models for one inference runtime.
+
+    Every backend returns objects with the same calling convention as the
+    eager transformers models: QA models are called with ``input_ids`` and
+    ``attention_mask`` and return ``start_logits``/``end_logits``,
+    seq2seq models expose ``generate`` and feature extractors return
+    ``last_hidden_state``.
+
+    ``dtype`` is the precision to run in. Backends that cannot change it
+    keep the exported precision and log a warning.
+    """
+
+    name = "base"
+
+    def load_model(self, task: str, model_name: str, device: torch.device, dtype: torch.dtype = torch.float32):
+        raise NotImplementedError
+
+    def export(self, task: str, model_name: str, output_dir: str) -> str:
+        raise NotImplementedError
+
+
+class EagerBackend(InferenceBackend):
+    """
+    Plain PyTorch models. Local safetensors checkpoints, such as model
+    snapshots, are memory-mapped instead of read into private memory.
+    """
+
+    name = "eager"
+
+    def load_model(self, task: str, model_name: str, device: torch.device, dtype: torch.dtype = torch.float32):
+        _check_task(task)
+        if has_safetensors(model_name):
+            model = load_model_mmap(_AUTO_CLASSES[task], model_name, device)
+        else:
+            model = _AUTO_CLASSES[task].from_pretrained(model_name)
+            model.to(device)
+            model.eval()
+        if dtype != torch.float32:
+            # Casting copies the weights, so reduced precision gives up page-cache sharing of snapshots.
+            model.to(dtype=dtype)
+        return model
+
+    def export(self, task: str, model_name: str, output_dir: str) -> str:
+        raise ValueError("The eager backend runs checkpoints directly and has nothing to export")
+
+
+class TracedQAModel:
+    """Gives a traced QA graph the keyword-argument interface of the eager model"""
+
+    def __init__(self, module, config):
+        self.module = module
+        self.config = config
+
+    def __call__(self, input_ids, attention_mask, **kwargs):
+        start_logits, end_logits = self.module(input_ids, attention_mask)[:2]
+        return QuestionAnsweringModelOutput(start_logits=start_logits, end_logits=end_logits)
+
+    def to(self, device):
+        self.module.to(device)
+        return self
+
+
+class TracedFeatureModel(TracedQAModel):
+    def __call__(self, input_ids, attention_mask, **kwargs):
+        return BaseModelOutput(last_hidden_state=self.module(input_ids, attention_mask)[0])
+
+
+class TracedEncoder(torch.nn.Module):
+    """Traced seq2seq encoder that ``generate`` can call like the eager one"""
+
+    def __init__(self, module, config):
+        super().__init__()
+        self.module = module
+        self.main_input_name = "input_ids"
+        self.config = config
+
+    def forward(self, input_ids=None, attention_mask=None, return_dict=True, **kwargs):
+        return BaseModelOutput(last_hidden_state=self.module(input_ids, attention_mask)[0])
+
+
+class _EncoderOnly(torch.nn.Module):
+    def __init__(self, encoder):
+        super().__init__()
+        self.encoder = encoder
+
+    def forward(self, input_ids, attention_mask):
+        return self.encoder(input_ids=input_ids, attention_mask=attention_mask, return_dict=False)
+
+
+class TorchScriptBackend(InferenceBackend):
+    """
+    TorchScript graphs traced from the eager models.
+
+    QA and feature-extraction models are traced whole. For seq2seq models
+    only the encoder is traced: the KV-cache decoder changes shape every
+    step, which tracing cannot represent, so decoding stays eager.
+    """
+
+    name = "torchscript"
+
+    def _trace(self, task: str, model_name: str):
+        model = _AUTO_CLASSES[task].from_pretrained(model_name, torchscript=True, attn_implementation="eager")
+        model.eval()
+        module = model.get_encoder() if task == "seq2seq" else model
+        wrapped = _EncoderOnly(module) if task == "seq2seq" else module
+        with torch.no_grad():
+            traced = torch.jit.trace(wrapped, _example_inputs(), strict=False)
+        return model, traced
+
+    def load_model(self, task: str, model_name: str, device: torch.device, dtype: torch.dtype = torch.float32):
+        _check_task(task)
+        _warn_fixed_precision(self.name, dtype)
+        traced_path = os.path.join(model_name, TORCHSCRIPT_FILE)
+
+        if task == "seq2seq":
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+            model.eval()
+            if os.path.exists(traced_path):
+                traced = torch.jit.load(traced_path, map_location=device)
+            else:
+                _, traced = self._trace(task, model_name)
+            encoder = TracedEncoder(traced, model.config)
+            model.model.encoder = encoder
+            model.to(device)
+            return model
+
+        config = AutoConfig.from_pretrained(model_name)
+        if os.path.exists(traced_path):
+            traced = torch.jit.load(traced_path, map_location=device)
+        else:
+            _, traced = self._trace(task, model_name)
+
+        wrapper = TracedQAModel if task == "qa" else TracedFeatureModel
+        return wrapper(traced, config).to(device)
+
+    def export(self, task: str, model_name: str, output_dir: str) -> str:
+        _check_task(task)
+        os.makedirs(output_dir, exist_ok=True)
+        model, traced = self._trace(task, model_name)
+        torch.jit.save(traced, os.path.join(output_dir, TORCHSCRIPT_FILE))
+        model.config.torchscript = False
+        model.save_pretrained(output_dir)
+        return output_dir
+
+
+class OnnxBackend(InferenceBackend):
+    """
+    ONNX Runtime sessions through optimum.
+
+    Seq2seq models are exported as encoder, decoder and decoder-with-past
+    graphs, so generation reuses the KV cache.
+    """
+
+    name = "onnx"
+
+    _ORT_CLASSES = {
+        "qa": "ORTModelForQuestionAnswering",
+        "seq2seq": "ORTModelForSeq2SeqLM",
+        "feature-extraction": "ORTModelForFeatureExtraction",
+    }
+
+    def _ort_class(self, task: str):
+        _check_task(task)
+        try:
+            from optimum import onnxruntime
+        except ImportError:
+            raise ImportError("The onnx backend requires optimum[onnxruntime]. "
+                              "Install it with: pip install optimum[onnxruntime]")
+        return getattr(onnxruntime, self._ORT_CLASSES[task])
+
+    def load_model(self, task: str, model_name: str, device: torch.device, dtype: torch.dtype = torch.float32):
+        ort_class = self._ort_class(task)
+        _warn_fixed_precision(self.name, dtype)
+        exported = os.path.isdir(model_name) and any(f.endswith(".onnx") for f in os.listdir(model_name))
+        provider = "CUDAExecutionProvider" if device.type == "cuda" else "CPUExecutionProvider"
+        kwargs = {"use_cache": True} if task == "seq2seq" else {}
+        return ort_class.from_pretrained(model_name, export=not exported, provider=provider, **kwargs)
+
+    def export(self, task: str, model_name: str, output_dir: str) -> str:
+        ort_class = self._ort_class(task)
+        kwargs = {"use_cache": True} if task == "seq2seq" else {}
+        model = ort_class.from_pretrained(model_name, export=True, **kwargs)
+        model.save_pretrained(output_dir)
+        return output_dir
+
+
+BACKENDS: Dict[str, InferenceBackend] = {
+    backend.name: backend for backend in (EagerBackend(), TorchScriptBackend(), OnnxBackend())
+}
+
+
+def get_backend(name: str = "eager") -> InferenceBackend:
+    """Look up an inference backend by name"""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown inference backend: {name}. Available backends: {list(BACKENDS)}")
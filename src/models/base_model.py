@@ -1,9 +1,17 @@
-from transformers import AutoTokenizer, AutoModel
+from typing import Optional
+
+from transformers import AutoTokenizer
+
+from src.models.backends import get_backend
+from src.models.device import ExecutionDevice, get_execution_device
 
 class BaseTransformerModel:
-    def __init__(self, model_name:str):
+    def __init__(self, model_name:str, backend: str = "eager", execution: Optional[ExecutionDevice] = None):
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModel.from_pretrained(model_name)
+        self.execution = execution or get_execution_device()
+        self.device = self.execution.device
+        self.model = get_backend(backend).load_model("feature-extraction", model_name, self.device,
+                                                     self.execution.dtype)
 
     def preprocess(self, text:str):
         return self.tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
\ No newline at end of file
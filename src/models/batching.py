@@ -0,0 +1,147 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from src.models.device import padded_length
+
+
+def generation_key(**generation_kwargs) -> Tuple:
+    """Build a hashable key from generation parameters so only compatible chunks share a batch"""
+    return tuple(sorted(generation_kwargs.items()))
+
+
+@dataclass
+class ChunkRequest:
+    """A pending chunk waiting to be summarized"""
+    index: int
+    text: str
+    num_tokens: int
+    generation_key: Tuple = ()
+    input_ids: Optional[List[int]] = field(default=None, repr=False)
+
+
+@dataclass
+class ChunkBatch:
+    """Chunks that share generation parameters and are padded to the same length"""
+    generation_key: Tuple
+    requests: List[ChunkRequest] = field(default_factory=list)
+    pad_to_multiple_of: int = 1
+    max_length: Optional[int] = None
+
+    @property
+    def texts(self) -> List[str]:
+        return [request.text for request in self.requests]
+
+    @property
+    def input_ids(self) -> List[List[int]]:
+        return [request.input_ids for request in self.requests]
+
+    @property
+    def generation_kwargs(self) -> Dict:
+        return dict(self.generation_key)
+
+    @property
+    def padded_length(self) -> int:
+        """Length the model sees once the longest chunk is padded to the multiple"""
+        return padded_length(max((request.num_tokens for request in self.requests), default=0),
+                             self.pad_to_multiple_of, limit=self.max_length)
+
+    @property
+    def real_tokens(self) -> int:
+        return sum(request.num_tokens for request in self.requests)
+
+    @property
+    def padded_tokens(self) -> int:
+        return self.padded_length * len(self.requests)
+
+
+class LengthBucketer:
+    """
+    Groups chunks by generation parameters and splits each group into
+    length-sorted batches that minimize padded compute.
+
+    Within a group the chunks are sorted by token count and partitioned with a
+    small dynamic program: the cost of a batch is its padded token count plus
+    a fixed per-call overhead, so it only pays to merge chunks whose lengths
+    are close enough that the saved ``generate`` call outweighs the padding.
+
+    ``batch_limit`` maps a padded length to the largest batch that fits in
+    memory at that length, such as the limits probed at startup.
+
+    ``pad_to_multiple_of`` and ``max_length`` must match the model's collate
+    step, so batches are costed at the length the model actually runs.
+    Chunks that round up to the same length then batch together for free.
+    """
+
+    def __init__(self, max_batch_size: int = 8, max_batch_tokens: int = 8192, batch_overhead_tokens: int = 256,
+                 batch_limit: Optional[Callable[[int], int]] = None, pad_to_multiple_of: int = 1,
+                 max_length: Optional[int] = None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.batch_overhead_tokens = batch_overhead_tokens
+        self.batch_limit = batch_limit
+        self.pad_to_multiple_of = pad_to_multiple_of
+        self.max_length = max_length
+
+    def _max_size(self, padded_length: int) -> int:
+        if self.batch_limit is None:
+            return self.max_batch_size
+        return max(1, min(self.max_batch_size, self.batch_limit(padded_length)))
+
+    def plan(self, requests: Sequence[ChunkRequest]) -> List[ChunkBatch]:
+        """Split pending chunks into batches, grouped by generation parameters"""
+
+        groups: Dict[Hashable, List[ChunkRequest]] = {}
+        for request in requests:
+            groups.setdefault(request.generation_key, []).append(request)
+
+        batches = []
+        for key, group in groups.items():
+            group = sorted(group, key=lambda r: r.num_tokens)
+            for start, end in self._partition([r.num_tokens for r in group]):
+                batches.append(ChunkBatch(generation_key=key, requests=group[start:end],
+                                          pad_to_multiple_of=self.pad_to_multiple_of, max_length=self.max_length))
+
+        return batches
+
+    def _partition(self, lengths: List[int]) -> List[Tuple[int, int]]:
+        """Optimal split of ascending lengths into contiguous batches"""
+
+        n = len(lengths)
+        best = [0.0] + [float("inf")] * n
+        split = [0] * (n + 1)
+
+        for end in range(1, n + 1):
+            longest = max(padded_length(lengths[end - 1], self.pad_to_multiple_of, limit=self.max_length), 1)
+            for size in range(1, min(self._max_size(longest), end) + 1):
+                padded = size * longest
+                if size > 1 and padded > self.max_batch_tokens:
+                    break
+                cost = best[end - size] + padded + self.batch_overhead_tokens
+                if cost < best[end]:
+                    best[end] = cost
+                    split[end] = end - size
+
+        bounds = []
+        end = n
+        while end > 0:
+            bounds.append((split[end], end))
+            end = split[end]
+
+        return bounds[::-1]
+
+
+def padding_stats(batches: Sequence[ChunkBatch]) -> Dict:
+    """Summarize how much of the padded compute was spent on real tokens"""
+
+    real_tokens = sum(batch.real_tokens for batch in batches)
+    padded_tokens = sum(batch.padded_tokens for batch in batches)
+
+    return {
+        "batches": len(batches),
+        "chunks": sum(len(batch.requests) for batch in batches),
+        "real_tokens": real_tokens,
+        "padded_tokens": padded_tokens,
+        "padding_efficiency": round(real_tokens / padded_tokens, 3) if padded_tokens else 1.0
+    }
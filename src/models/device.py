@@ -0,0 +1,265 @@
+"""
+Shared choice of execution device and precision, plus batch size probing.
+
+    DEVICE=auto|cpu|cuda|cuda:1|mps    DTYPE=auto|float32|bfloat16|float16
+
+With ``auto`` the first CUDA/ROCm device is used when present, in bfloat16
+where the GPU supports it and float16 otherwise. Apple GPUs use float16.
+CPUs use bfloat16 only when they have native bf16 instructions
+(AVX512-BF16 or AMX); elsewhere it is emulated and slower than float32.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Sequence
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+DTYPES = {
+    "float32": torch.float32,
+    "bfloat16": torch.bfloat16,
+    "float16": torch.float16,
+}
+
+_CPU_BF16_FLAGS = {"avx512_bf16", "amx_bf16"}
+
+
+def cpu_flags() -> set:
+    """Instruction set flags of the host CPU, empty where ``/proc/cpuinfo`` is not available"""
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("flags"):
+                    return set(line.partition(":")[2].split())
+    except OSError:
+        pass
+    return set()
+
+
+def cpu_supports_bf16() -> bool:
+    return bool(cpu_flags() & _CPU_BF16_FLAGS)
+
+
+@dataclass(frozen=True)
+class ExecutionDevice:
+    """Where models run and in which precision"""
+    device: torch.device
+    dtype: torch.dtype = torch.float32
+
+    @property
+    def type(self) -> str:
+        return self.device.type
+
+    @property
+    def reduced_precision(self) -> bool:
+        return self.dtype != torch.float32
+
+    def to_dict(self) -> Dict:
+        info = {"device": str(self.device), "dtype": str(self.dtype).replace("torch.", "")}
+        if self.type == "cuda":
+            info["name"] = torch.cuda.get_device_name(self.device)
+            info["runtime"] = "rocm" if torch.version.hip else "cuda"
+        return info
+
+
+def _auto_device() -> torch.device:
+    if torch.cuda.is_available():
+        return torch.device("cuda:0")
+    if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+        return torch.device("mps")
+    return torch.device("cpu")
+
+
+def _auto_dtype(device: torch.device) -> torch.dtype:
+    if device.type == "cuda":
+        return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+    if device.type == "mps":
+        return torch.float16
+    return torch.bfloat16 if cpu_supports_bf16() else torch.float32
+
+
+def select_device(device: Optional[str] = None, dtype: Optional[str] = None) -> ExecutionDevice:
+    """Resolves a device and dtype preference; ``None`` or ``"auto"`` picks the best available"""
+    if not device or device == "auto":
+        resolved_device = _auto_device()
+    else:
+        resolved_device = torch.device(device)
+        if resolved_device.type == "cuda" and not torch.cuda.is_available():
+            raise ValueError(f"Device {device} requested, but CUDA is not available")
+
+    if not dtype or dtype == "auto":
+        resolved_dtype = _auto_dtype(resolved_device)
+    else:
+        try:
+            resolved_dtype = DTYPES[dtype]
+        except KeyError:
+            raise ValueError(f"Unknown dtype: {dtype}. Supported dtypes: {list(DTYPES)}")
+
+    return ExecutionDevice(resolved_device, resolved_dtype)
+
+
+@lru_cache(maxsize=None)
+def get_execution_device() -> ExecutionDevice:
+    """The process-wide execution device, configured by the DEVICE and DTYPE environment variables"""
+    execution = select_device(os.environ.get("DEVICE"), os.environ.get("DTYPE"))
+    logger.info(f"Execution device: {execution.to_dict()}")
+    return execution
+
+
+def padded_length(length: int, multiple: int = 1, limit: Optional[int] = None) -> int:
+    """
+    ``length`` rounded up to a multiple, but not past ``limit``. CPU kernels,
+    bfloat16 ones in particular, are compiled and cached per input shape and
+    the cache is never freed, so a worker that sees every sequence length
+    keeps growing. Padding to a multiple bounds the number of shapes.
+    """
+    if multiple <= 1:
+        return length
+    padded = -(-length // multiple) * multiple
+    return max(length, min(padded, limit)) if limit is not None else padded
+
+
+class MemoryProbe:
+    """Peak memory of a block of work and the memory still available on a device"""
+
+    def reset(self):
+        raise NotImplementedError
+
+    def peak_bytes(self) -> Optional[int]:
+        raise NotImplementedError
+
+    def available_bytes(self) -> Optional[int]:
+        raise NotImplementedError
+
+
+class CudaMemoryProbe(MemoryProbe):
+    def __init__(self, device: torch.device):
+        self.device = device
+
+    def reset(self):
+        torch.cuda.synchronize(self.device)
+        torch.cuda.empty_cache()
+        torch.cuda.reset_peak_memory_stats(self.device)
+        self._baseline = torch.cuda.memory_allocated(self.device)
+
+    def peak_bytes(self) -> int:
+        torch.cuda.synchronize(self.device)
+        return torch.cuda.max_memory_allocated(self.device) - self._baseline
+
+    def available_bytes(self) -> int:
+        free, _ = torch.cuda.mem_get_info(self.device)
+        return free
+
+
+class ProcessMemoryProbe(MemoryProbe):
+    """
+    CPU memory from the process high-water mark. On Linux the mark is reset by
+    writing to ``/proc/self/clear_refs``. Where that is not possible, no
+    measurement is returned.
+    """
+
+    def reset(self):
+        self._baseline = None
+        try:
+            with open("/proc/self/clear_refs", "w") as clear_refs:
+                clear_refs.write("5")
+            self._baseline = self._status_bytes("VmHWM")
+        except OSError:
+            pass
+
+    def peak_bytes(self) -> Optional[int]:
+        if self._baseline is None:
+            return None
+        peak = self._status_bytes("VmHWM")
+        return None if peak is None else max(0, peak - self._baseline)
+
+    def available_bytes(self) -> Optional[int]:
+        try:
+            with open("/proc/meminfo") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    @staticmethod
+    def _status_bytes(field: str) -> Optional[int]:
+        try:
+            with open("/proc/self/status") as status:
+                for line in status:
+                    if line.startswith(field + ":"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+
+def memory_probe(execution: ExecutionDevice) -> MemoryProbe:
+    return CudaMemoryProbe(execution.device) if execution.type == "cuda" else ProcessMemoryProbe()
+
+
+class BatchSizeLimits:
+    """Largest safe batch size for each probed sequence length; longer inputs use the next probed length up"""
+
+    def __init__(self, limits: Dict[int, int], default: int):
+        self.limits = dict(sorted(limits.items()))
+        self.default = default
+
+    def __call__(self, sequence_length: int) -> int:
+        for probed_length, batch_size in self.limits.items():
+            if sequence_length <= probed_length:
+                return batch_size
+        return min(self.limits.values(), default=self.default)
+
+    def to_dict(self) -> Dict[int, int]:
+        return dict(self.limits)
+
+
+def probe_max_batch_size(run: Callable[[int, int], None], sequence_length: int, probe: MemoryProbe,
+                         memory_fraction: float = 0.8, max_batch_size: int = 64) -> Optional[int]:
+    """
+    Estimates the largest batch that fits in memory at ``sequence_length``.
+
+    ``run(batch_size, sequence_length)`` executes one representative model
+    call. Peak memory is measured at batch sizes 1 and 2; memory grows
+    linearly with the batch, so the two points are enough to extrapolate.
+    The probe never tries to run out of memory, which on CPU would kill the
+    process. Returns ``None`` when memory cannot be measured.
+    """
+    peaks = []
+    for batch_size in (1, 2):
+        probe.reset()
+        run(batch_size, sequence_length)
+        peak = probe.peak_bytes()
+        if peak is None:
+            return None
+        peaks.append(peak)
+
+    available = probe.available_bytes()
+    if available is None:
+        return None
+
+    per_item = max(peaks[1] - peaks[0], 1)
+    fixed = max(peaks[0] - per_item, 0)
+    budget = available * memory_fraction - fixed
+    return max(1, min(max_batch_size, int(budget // per_item)))
+
+
+def probe_batch_limits(run: Callable[[int, int], None], sequence_lengths: Sequence[int], execution: ExecutionDevice,
+                       default: int = 8, probe: Optional[MemoryProbe] = None, **kwargs) -> BatchSizeLimits:
+    """Probes the maximum batch size at several sequence lengths"""
+    probe = probe or memory_probe(execution)
+    limits = {}
+    for sequence_length in sequence_lengths:
+        with torch.no_grad():
+            batch_size = probe_max_batch_size(run, sequence_length, probe, **kwargs)
+        if batch_size is None:
+            logger.warning("Memory cannot be measured on this platform; keeping the default batch size")
+            return BatchSizeLimits({}, default)
+        limits[sequence_length] = batch_size
+        logger.info(f"Max batch size at {sequence_length} tokens on {execution.device}: {batch_size}")
+    return BatchSizeLimits(limits, default)
@@ -0,0 +1,52 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+
+from src.models.base_model import BaseTransformerModel
+from src.models.device import ExecutionDevice
+
+
+class PassageEmbedder(BaseTransformerModel):
+    """
+    Embeds passages with a small encoder: mean-pooled last hidden states,
+    normalized so dot products are cosine similarities.
+    """
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", backend: str = "eager",
+                 execution: Optional[ExecutionDevice] = None, max_length: int = 256, pad_to_multiple_of: int = 1):
+        super().__init__(model_name, backend=backend, execution=execution)
+        self.max_length = max_length
+        self.pad_to_multiple_of = pad_to_multiple_of
+        self.dim = self.model.config.hidden_size
+
+    def split_passages(self, text: str, passage_words: int = 120, overlap_words: int = 20) -> List[str]:
+        """Overlapping word windows, so a sentence on a window edge is whole in one of them"""
+        words = text.split()
+        step = max(passage_words - overlap_words, 1)
+        return [" ".join(words[start:start + passage_words])
+                for start in range(0, max(len(words) - overlap_words, 1), step) if words[start:start + passage_words]]
+
+    def encode(self, texts: List[str]) -> Dict[str, torch.Tensor]:
+        return self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                              pad_to_multiple_of=self.pad_to_multiple_of if self.pad_to_multiple_of > 1 else None,
+                              return_tensors="pt")
+
+    def embed_batch(self, inputs: Dict[str, torch.Tensor]) -> np.ndarray:
+        """Runs the encoder on one tokenized batch; this is the only step that needs the model"""
+        attention_mask = inputs["attention_mask"].to(self.device)
+        with torch.no_grad():
+            outputs = self.model(input_ids=inputs["input_ids"].to(self.device), attention_mask=attention_mask)
+
+        mask = attention_mask.unsqueeze(-1).float()
+        pooled = (outputs.last_hidden_state.float() * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return torch.nn.functional.normalize(pooled, dim=-1).cpu().numpy()
+
+    def embed(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Embeds texts in batches of similar length, returned in input order"""
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            embeddings[batch] = self.embed_batch(self.encode([texts[i] for i in batch]))
+        return embeddings
@@ -0,0 +1,45 @@
+"""
+Export models for an optimized inference backend.
+
+    python -m src.models.export --task qa --backend onnx --model deepset/roberta-base-squad2 --output exported/qa-onnx
+    python -m src.models.export --task seq2seq --backend torchscript --model facebook/bart-large-cnn --output exported/bart-ts
+
+The output directory can then be passed as ``model_name`` together with the
+same ``backend`` to DocumentSummarizer, QuestionAnswerer or BaseTransformerModel.
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from transformers import AutoTokenizer
+
+from src.models.backends import BACKENDS, TASKS, get_backend
+
+logger = logging.getLogger(__name__)
+
+
+def export_model(task: str, model_name: str, backend: str, output_dir: str) -> str:
+    """Exports a model and its tokenizer into a self-contained directory"""
+    get_backend(backend).export(task, model_name, output_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+    logger.info(f"Exported {model_name} ({task}) for the {backend} backend to {output_dir}")
+    return output_dir
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Export a model for an optimized inference backend")
+    arg_parser.add_argument("--task", choices=TASKS, required=True)
+    arg_parser.add_argument("--backend", choices=[name for name in BACKENDS if name != "eager"], required=True)
+    arg_parser.add_argument("--model", required=True)
+    arg_parser.add_argument("--output", required=True)
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    export_model(args.task, args.model, args.backend, args.output)
+
+
+if __name__ == "__main__":
+    main()
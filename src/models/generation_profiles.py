@@ -0,0 +1,81 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class GenerationProfile:
+    """
+    Named set of generate() arguments for the summarizer.
+
+    ``model_name`` optionally points the profile at a smaller distilled
+    checkpoint (e.g. ``sshleifer/distilbart-cnn-12-6``) that shares the base
+    model's tokenizer. It is loaded lazily on first use.
+
+    ``assistant_model_name`` turns on assisted (speculative) decoding: a
+    small draft model with the same tokenizer proposes tokens and the
+    profile's model verifies them in one forward pass. Greedy output is
+    unchanged. ``num_assistant_tokens`` fixes how many tokens are drafted per
+    step; by default the count adapts to how many were accepted.
+    """
+    name: str
+    generate_kwargs: Dict = field(default_factory=dict)
+    model_name: Optional[str] = None
+    assistant_model_name: Optional[str] = None
+    num_assistant_tokens: Optional[int] = None
+
+    def __post_init__(self):
+        if self.assistant_model_name and self.generate_kwargs.get("num_beams", 1) > 1:
+            raise ValueError(f"Profile {self.name}: assisted decoding does not support beam search")
+
+    def build_kwargs(self, max_length: Optional[int] = None, min_length: Optional[int] = None) -> Dict:
+        kwargs = dict(self.generate_kwargs)
+        if max_length is not None:
+            kwargs["max_length"] = max_length
+        if min_length is not None:
+            kwargs["min_length"] = min_length
+        return kwargs
+
+
+GENERATION_PROFILES = {
+    "fast": GenerationProfile(
+        name="fast",
+        generate_kwargs={
+            "num_beams": 1,
+            "do_sample": False,
+            "use_cache": True,
+            "max_length": 100,
+            "min_length": 20
+        }
+    ),
+    "balanced": GenerationProfile(
+        name="balanced",
+        generate_kwargs={
+            "num_beams": 2,
+            "length_penalty": 1.0,
+            "use_cache": True,
+            "early_stopping": True,
+            "max_length": 130,
+            "min_length": 30
+        }
+    ),
+    "quality": GenerationProfile(
+        name="quality",
+        generate_kwargs={
+            "num_beams": 4,
+            "length_penalty": 2.0,
+            "early_stopping": True,
+            "max_length": 130,
+            "min_length": 30
+        }
+    )
+}
+
+DEFAULT_PROFILE = "quality"
+
+
+def get_profile(name: str) -> GenerationProfile:
+    """Look up a generation profile by name"""
+    try:
+        return GENERATION_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown generation profile: {name}. Available profiles: {list(GENERATION_PROFILES)}")
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.models.qa_model import QAAnswer, QAContext, QuestionAnswerer
+
+logger = logging.getLogger(__name__)
+
+# Runs one tier: (model, question, document) -> (prepared context, answer, seconds taken)
+AskFn = Callable[[QuestionAnswerer, str, str], Awaitable[Tuple[QAContext, Optional[QAAnswer], float]]]
+
+SMALL = "small"
+LARGE = "large"
+
+
+def normalize_answer(text: str) -> str:
+    """Lowercased answer without punctuation, articles or extra spaces, as in SQuAD exact match"""
+    text = re.sub(r"[^\w\s$%]", " ", text.lower())
+    return " ".join(word for word in text.split() if word not in ("a", "an", "the"))
+
+
+def calibrate_threshold(confidences: Sequence[float], correct: Sequence[bool], target_accuracy: float = 0.9) -> float:
+    """
+    Lowest confidence threshold at which the answers kept by the small model
+    are still correct at least ``target_accuracy`` of the time. Returns 1.0,
+    escalating everything, when no threshold reaches the target.
+    """
+    if len(confidences) != len(correct):
+        raise ValueError("confidences and correct must have the same length")
+    ranked = sorted(zip(confidences, correct), key=lambda pair: pair[0], reverse=True)
+    threshold, kept_correct = 1.0, 0
+    for kept, (confidence, is_correct) in enumerate(ranked, start=1):
+        kept_correct += is_correct
+        # Ties can only be kept or escalated together.
+        if kept < len(ranked) and ranked[kept][0] == confidence:
+            continue
+        if kept_correct / kept >= target_accuracy:
+            threshold = confidence
+    return threshold
+
+
+class CascadeStats:
+    """
+    Which tier answered each question and what it cost. The latency saved is
+    estimated from the large model's observed seconds per window token on
+    escalated questions, minus the time the small model spent on them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.answered = {SMALL: 0, LARGE: 0}
+        self.small_seconds = 0.0
+        self.large_seconds = 0.0
+        self.large_tokens = 0
+        self.small_only_seconds = 0.0
+        self.small_only_tokens = 0
+
+    def record(self, tier: str, small_seconds: float, large_seconds: Optional[float] = None, tokens: int = 0):
+        with self._lock:
+            self.answered[tier] += 1
+            self.small_seconds += small_seconds
+            if tier == LARGE:
+                self.large_seconds += large_seconds or 0.0
+                self.large_tokens += tokens
+            else:
+                self.small_only_seconds += small_seconds
+                self.small_only_tokens += tokens
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            questions = sum(self.answered.values())
+            escalated = self.answered[LARGE]
+            seconds_saved = None
+            if self.large_tokens:
+                large_seconds_per_token = self.large_seconds / self.large_tokens
+                wasted = self.small_seconds - self.small_only_seconds
+                seconds_saved = round(self.small_only_tokens * large_seconds_per_token
+                                      - self.small_only_seconds - wasted, 3)
+            return {
+                "questions": questions,
+                "answered": dict(self.answered),
+                "escalation_rate": round(escalated / questions, 3) if questions else 0.0,
+                "avg_small_seconds": round(self.small_seconds / questions, 4) if questions else None,
+                "avg_large_seconds": round(self.large_seconds / escalated, 4) if escalated else None,
+                "estimated_seconds_saved": seconds_saved,
+            }
+
+
+class QACascade:
+    """
+    Answers with a small QA model first and escalates to the large one only
+    when the small model's span confidence is below ``threshold`` or it
+    finds no answer.
+    """
+
+    def __init__(self, small: QuestionAnswerer, large: QuestionAnswerer, threshold: float = 0.5):
+        self.small = small
+        self.large = large
+        self.threshold = threshold
+        self.stats = CascadeStats()
+
+    def escalate(self, answer: Optional[QAAnswer]) -> bool:
+        return answer is None or answer.confidence < self.threshold
+
+    @staticmethod
+    def _ask(model: QuestionAnswerer, question: str, document: str) -> Tuple[QAContext, Optional[QAAnswer], float]:
+        started = time.perf_counter()
+        context = model.prepare_context(document)
+        answer = model.decode_answer(model.predict(model.encode(question, context)))
+        return context, answer, time.perf_counter() - started
+
+    def answer(self, question: str, document: str) -> Tuple[Optional[QAAnswer], str]:
+        """The answer and the tier that gave it, computed on the calling thread"""
+        async def ask(model: QuestionAnswerer, question: str, document: str):
+            return self._ask(model, question, document)
+
+        _, answer, tier = asyncio.run(self.answer_async(question, document, ask))
+        return answer, tier
+
+    async def answer_async(self, question: str, document: str,
+                           ask: Optional[AskFn] = None) -> Tuple[QAContext, Optional[QAAnswer], str]:
+        """
+        The prepared context, the answer and the tier that gave it. ``ask``
+        runs a single model, such as on the server's admission-controlled
+        pipeline; by default each model runs in a worker thread.
+        """
+        if ask is None:
+            async def ask(model: QuestionAnswerer, question: str, document: str):
+                return await asyncio.to_thread(self._ask, model, question, document)
+
+        context, answer, small_seconds = await ask(self.small, question, document)
+        if not self.escalate(answer):
+            self.stats.record(SMALL, small_seconds, tokens=self.small.window_budget(context))
+            return context, answer, SMALL
+
+        context, answer, large_seconds = await ask(self.large, question, document)
+        self.stats.record(LARGE, small_seconds, large_seconds, self.large.window_budget(context))
+        return context, answer, LARGE
+
+    def calibrate(self, examples: List[Dict], target_accuracy: float = 0.9) -> Dict:
+        """
+        Sets ``threshold`` from ``{"question", "context", "answer"?}`` examples.
+        A small-model answer counts as correct when it matches the reference
+        answer or, without one, the large model's answer.
+        """
+        if not examples:
+            raise ValueError("Calibration needs at least one example")
+        confidences, correct = [], []
+        for example in examples:
+            _, answer, _ = self._ask(self.small, example["question"], example["context"])
+            reference = example.get("answer")
+            if reference is None:
+                _, large_answer, _ = self._ask(self.large, example["question"], example["context"])
+                reference = large_answer.text if large_answer else ""
+            confidences.append(answer.confidence if answer else 0.0)
+            correct.append(normalize_answer(answer.text if answer else "") == normalize_answer(reference))
+
+        self.threshold = calibrate_threshold(confidences, correct, target_accuracy)
+        kept = [is_correct for confidence, is_correct in zip(confidences, correct) if confidence >= self.threshold]
+        report = {
+            "threshold": self.threshold,
+            "examples": len(examples),
+            "small_accuracy": round(sum(correct) / len(correct), 3),
+            "kept_accuracy": round(sum(kept) / len(kept), 3) if kept else None,
+            "escalation_rate": round(1 - len(kept) / len(examples), 3),
+        }
+        logger.info(f"Calibrated QA cascade: {report}")
+        return report
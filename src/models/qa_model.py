@@ -1,14 +1,106 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
 import torch
-from transformers import AutoTokenizer, AutoModelForQuestionAnswering
-import logging
+from transformers import AutoTokenizer
+
+from src.models.backends import get_backend
+from src.models.device import ExecutionDevice, get_execution_device, padded_length
+from src.utils.text_normalizer import OffsetMap, get_normalizer
+
+UNANSWERED = "Unable to find answer."
+
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s)|\n\s*\n")
+
+
+@dataclass
+class QAContext:
+    """
+    A document prepared for question answering: its normalized text, the map
+    back to the original text and the tokens with their character offsets.
+    Built once per document and reused for every question about it.
+    """
+    document_id: str
+    original: str
+    text: str
+    offset_map: OffsetMap
+    token_ids: List[int]
+    token_offsets: List[Tuple[int, int]]
+
+
+@dataclass
+class QAAnswer:
+    """
+    An answer with its ``[start, end)`` span and surrounding passage in the
+    original document. ``score`` is the raw span logit, ``confidence`` the
+    span probability under the model's start and end distributions.
+    """
+    text: str
+    start: int
+    end: int
+    passage: str
+    passage_start: int
+    passage_end: int
+    score: float
+    confidence: float = 1.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "answer_start": self.start,
+            "answer_end": self.end,
+            "passage": self.passage,
+            "passage_start": self.passage_start,
+            "passage_end": self.passage_end,
+            "score": self.score,
+            "confidence": self.confidence,
+        }
+
+
+def context_id(document: str) -> str:
+    """Content hash that identifies a prepared document"""
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+def passage_bounds(text: str, start: int, end: int, max_chars: int = 300) -> Tuple[int, int]:
+    """The sentence or sentences around ``text[start:end]``, at most ``max_chars`` on either side"""
+    window_start = max(0, start - max_chars)
+    boundaries = [match.end() for match in _SENTENCE_END_RE.finditer(text, window_start, start)]
+    passage_start = boundaries[-1] if boundaries else window_start
+
+    window_end = min(len(text), end + max_chars)
+    boundary = _SENTENCE_END_RE.search(text, end, window_end)
+    passage_end = boundary.end() if boundary else window_end
+
+    while passage_start < start and text[passage_start].isspace():
+        passage_start += 1
+    return passage_start, passage_end
 
 
 class QuestionAnswerer:
-    def __init__(self, model_name="deepset/roberta-base-squad2"):
+    def __init__(self, model_name="deepset/roberta-base-squad2", backend: str = "eager",
+                 execution: Optional[ExecutionDevice] = None, max_length: int = 512, stride: int = 128,
+                 max_windows: int = 4, max_answer_tokens: int = 30, max_cached_contexts: int = 32,
+                 pad_to_multiple_of: int = 1, null_score_threshold: float = 0.0):
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForQuestionAnswering.from_pretrained(model_name)
-        self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
+        self.execution = execution or get_execution_device()
+        self.device = self.execution.device
+        self.backend = backend
+        self.model = get_backend(backend).load_model("qa", model_name, self.device, self.execution.dtype)
+        self.max_length = max_length
+        self.stride = stride
+        self.max_windows = max_windows
+        self.max_answer_tokens = max_answer_tokens
+        self.max_question_tokens = max_length // 4
+        self.max_cached_contexts = max_cached_contexts
+        self.pad_to_multiple_of = pad_to_multiple_of
+        # The question is unanswerable when the no-answer score beats the best span by more than this.
+        self.null_score_threshold = null_score_threshold
+        self._contexts: "OrderedDict[str, QAContext]" = OrderedDict()
+        self._contexts_lock = threading.Lock()
 
 
 
@@ -27,47 +119,171 @@ class QuestionAnswerer:
             if not question or not context:
                 return "Unable to find answer: Missing question or context."
 
-            inputs = self.tokenizer(
-                question,
-                context,
-                return_tensors="pt",
-                truncation=True,
-                max_length=512,
-                padding=True,
-                stride=128,
-                # return_overflowing_tokens=True
-            )
+            inputs = self.encode(question, context)
+            answer = self.decode_answer(self.predict(inputs))
+            return answer.text if answer else UNANSWERED
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return f"Error processing question: {str(e)}"
+
+    def cached_context(self, document: str) -> Optional[QAContext]:
+        """The prepared context of a document if it is still cached"""
+        with self._contexts_lock:
+            return self._contexts.get(context_id(document))
 
-            input_ids = inputs["input_ids"].to(self.device)
-            attention_mask = inputs["attention_mask"].to(self.device)
+    def prepare_context(self, document: str) -> QAContext:
+        """
+        Normalizes and tokenizes a document with character offsets. Results
+        are cached by content, so follow-up questions skip this work.
+        """
+        document_id = context_id(document)
+        with self._contexts_lock:
+            context = self._contexts.get(document_id)
+            if context is not None:
+                self._contexts.move_to_end(document_id)
+                return context
 
-            with torch.no_grad():
+        text, offset_map = get_normalizer("qa").normalize_with_offsets(document)
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        context = QAContext(
+            document_id=document_id,
+            original=document,
+            text=text,
+            offset_map=offset_map,
+            token_ids=encoding["input_ids"],
+            token_offsets=[tuple(offset) for offset in encoding["offset_mapping"]]
+        )
 
-                outputs = self.model(
-                    input_ids=input_ids,
-                    attention_mask=attention_mask
-                )
+        with self._contexts_lock:
+            self._contexts[document_id] = context
+            while len(self._contexts) > self.max_cached_contexts:
+                self._contexts.popitem(last=False)
+        return context
 
-            start_logits = outputs.start_logits
-            end_logits = outputs.end_logits
+    def window_budget(self, context: QAContext) -> int:
+        """Upper bound on the tokens the model processes for a question about ``context``"""
+        return self.max_length * min(self.max_windows, 1 + len(context.token_ids) // max(self.max_length - self.stride, 1))
 
-            start_idx = torch.argmax(start_logits).item()
-            end_idx = torch.argmax(end_logits).item()
+    def encode(self, question: str, context: Union[str, QAContext]) -> Dict:
+        """
+        Builds question and context windows over the cached context tokens.
+        Windows overlap by ``stride`` tokens so an answer on a window edge is
+        whole in one of them.
+        """
+        if isinstance(context, str):
+            context = self.prepare_context(context)
 
-            if end_idx < start_idx:
-                end_idx = min(start_idx + 10, len(input_ids[0]) - 1)
+        question_ids = self.tokenizer.encode(question, add_special_tokens=False)[:self.max_question_tokens]
+        # The marker shows where this tokenizer puts the context between its special tokens.
+        context_start = self.tokenizer.build_inputs_with_special_tokens(question_ids, [-1]).index(-1)
+        window = max(self.max_length - len(question_ids) - self.tokenizer.num_special_tokens_to_add(pair=True), 1)
+        step = max(window - self.stride, 1)
 
+        window_starts = [0]
+        while window_starts[-1] + window < len(context.token_ids) and len(window_starts) < self.max_windows:
+            window_starts.append(window_starts[-1] + step)
 
-            answer_tokens = input_ids[0][start_idx:end_idx+1]
-            answer = self.tokenizer.decode(answer_tokens, skip_special_tokens=True)
+        sequences = [
+            self.tokenizer.build_inputs_with_special_tokens(question_ids, context.token_ids[start:start + window])
+            for start in window_starts
+        ]
+        longest = padded_length(max(len(sequence) for sequence in sequences), self.pad_to_multiple_of,
+                                limit=self.max_length)
+        pad_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else 0
+        input_ids = torch.full((len(sequences), longest), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(sequences), longest), dtype=torch.long)
+        for row, sequence in enumerate(sequences):
+            input_ids[row, :len(sequence)] = torch.tensor(sequence, dtype=torch.long)
+            attention_mask[row, :len(sequence)] = 1
 
-            answer = answer.strip()
+        return {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "context": context,
+            "context_start": context_start,
+            "windows": [(start, min(window, len(context.token_ids) - start)) for start in window_starts],
+        }
 
-            if not answer or len(answer) < 1 or len(answer) > 100:
-                return "Unable to find answer."
+    def predict(self, inputs: Dict) -> Tuple[QAContext, Optional[int], Optional[int], float, float]:
+        """
+        Runs the model and returns the best answer span over all windows, as
+        first and last token positions in the context, with its logit score
+        and confidence. The positions are ``None`` when the model's no-answer
+        score (the first token, as in SQuAD 2.0) beats the best span.
+        """
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=inputs["input_ids"].to(self.device),
+                attention_mask=inputs["attention_mask"].to(self.device)
+            )
 
-            return answer
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return f"Error processing question: {str(e)}"
\ No newline at end of file
+        start_logits = outputs.start_logits.float().cpu()
+        end_logits = outputs.end_logits.float().cpu()
+        offset = inputs["context_start"]
+        best = (0, 0, float("-inf"), 0.0)
+        # A window without the answer rightly predicts no answer, so the least
+        # confident window decides whether the document has one.
+        null_score = float("inf")
+
+        for row, (window_start, length) in enumerate(inputs["windows"]):
+            if length <= 0:
+                continue
+            null_score = min(null_score, (start_logits[row, 0] + end_logits[row, 0]).item())
+            starts = start_logits[row, offset:offset + length]
+            ends = end_logits[row, offset:offset + length]
+            scores = starts[:, None] + ends[None, :]
+            # Only spans that end after they start and are at most max_answer_tokens long.
+            valid = torch.ones_like(scores, dtype=torch.bool).triu().tril(self.max_answer_tokens - 1)
+            scores = scores.masked_fill(~valid, float("-inf"))
+            flat_index = torch.argmax(scores).item()
+            score = scores.view(-1)[flat_index].item()
+            if score > best[2]:
+                start, end = flat_index // length, flat_index % length
+                best = (window_start + start, window_start + end, score,
+                        self._span_confidence(start_logits[row], end_logits[row], offset, length, start, end))
+
+        if best[2] == float("-inf") or null_score - best[2] > self.null_score_threshold:
+            return inputs["context"], None, None, null_score, 0.0
+        return inputs["context"], best[0], best[1], best[2], best[3]
+
+    @staticmethod
+    def _span_confidence(start_logits: torch.Tensor, end_logits: torch.Tensor, offset: int, length: int,
+                         start: int, end: int) -> float:
+        """
+        Probability of a span, with the softmax over the context tokens and the
+        first token, which SQuAD 2.0 models use to say there is no answer
+        """
+        positions = torch.cat([torch.zeros(1, dtype=torch.long), torch.arange(offset, offset + length)])
+        start_log_probs = torch.log_softmax(start_logits[positions], dim=0)
+        end_log_probs = torch.log_softmax(end_logits[positions], dim=0)
+        return float(torch.exp(start_log_probs[start + 1] + end_log_probs[end + 1]))
+
+    def decode_answer(self, prediction: Tuple[QAContext, Optional[int], Optional[int], float, float]
+                      ) -> Optional[QAAnswer]:
+        """Turns a predicted span into answer text located in the original document"""
+        context, start_token, end_token, score, confidence = prediction
+        if not context.token_ids or start_token is None:
+            return None
+
+        start = context.token_offsets[start_token][0]
+        end = context.token_offsets[end_token][1]
+        answer = context.text[start:end].strip()
+
+        if not answer or len(answer) > 100:
+            return None
+
+        start = context.text.index(answer, start)
+        original_start, original_end = context.offset_map.span_to_original(start, start + len(answer))
+        passage_start, passage_end = passage_bounds(context.original, original_start, original_end)
+
+        return QAAnswer(
+            text=answer,
+            start=original_start,
+            end=original_end,
+            passage=context.original[passage_start:passage_end],
+            passage_start=passage_start,
+            passage_end=passage_end,
+            score=round(score, 4),
+            confidence=round(confidence, 4)
+        )
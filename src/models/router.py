@@ -0,0 +1,79 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from src.utils.language_detection import UNDETERMINED
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedLanguage(ValueError):
+    """Raised when no model is configured for a document's language"""
+
+    def __init__(self, language: str, supported: List[str]):
+        super().__init__(f"Unsupported language: {language}. Supported languages: {supported}")
+        self.language = language
+        self.supported = supported
+
+
+def parse_model_map(spec: Optional[str]) -> Dict[str, str]:
+    """Parses ``"de=model-a,fr=model-b"`` into a language to model mapping"""
+    models = {}
+    for entry in (spec or "").split(","):
+        if not entry.strip():
+            continue
+        language, separator, model_name = entry.partition("=")
+        if not separator or not language.strip() or not model_name.strip():
+            raise ValueError(f"Invalid model mapping: {entry!r}. Expected language=model_name")
+        models[language.strip()] = model_name.strip()
+    return models
+
+
+class ModelRouter:
+    """
+    Routes documents to the model configured for their language.
+
+    Models are loaded on first use and shared between languages that map to
+    the same checkpoint, such as a multilingual model. Undetermined text goes
+    to the default language. A language with no configured model is rejected,
+    so no inference is spent on it, unless ``fallback_language`` is set.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], models: Dict[str, str], default_language: str = "en",
+                 fallback_language: Optional[str] = None):
+        if default_language not in models:
+            raise ValueError(f"No model configured for the default language: {default_language}")
+        if fallback_language is not None and fallback_language not in models:
+            raise ValueError(f"No model configured for the fallback language: {fallback_language}")
+        self.loader = loader
+        self.models = dict(models)
+        self.default_language = default_language
+        self.fallback_language = fallback_language
+        self._loaded: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def languages(self) -> List[str]:
+        return sorted(self.models)
+
+    def resolve(self, language: Optional[str]) -> str:
+        """Language whose model serves ``language``; raises ``UnsupportedLanguage`` if there is none"""
+        if not language or language == UNDETERMINED:
+            return self.default_language
+        if language not in self.models:
+            if self.fallback_language is None:
+                raise UnsupportedLanguage(language, self.languages)
+            logger.info(f"No model for language {language}, using {self.fallback_language}")
+            return self.fallback_language
+        return language
+
+    def get(self, language: Optional[str] = None):
+        model_name = self.models[self.resolve(language)]
+        with self._lock:
+            if model_name not in self._loaded:
+                logger.info(f"Loading {model_name} for language {language or self.default_language}")
+                self._loaded[model_name] = self.loader(model_name)
+            return self._loaded[model_name]
+
+    def loaded(self) -> Dict[str, bool]:
+        return {language: model_name in self._loaded for language, model_name in self.models.items()}
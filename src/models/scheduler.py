@@ -0,0 +1,143 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from src.models.batching import ChunkBatch
+
+
+class LatencyEstimator:
+    """Running estimate of generate() cost per padded input token"""
+
+    def __init__(self, initial_seconds_per_token: float = 0.002, smoothing: float = 0.2):
+        self.seconds_per_token = initial_seconds_per_token
+        self.smoothing = smoothing
+
+    def estimate(self, batch: ChunkBatch) -> float:
+        return batch.padded_tokens * self.seconds_per_token
+
+    def update(self, batch: ChunkBatch, seconds: float):
+        if batch.padded_tokens:
+            observed = seconds / batch.padded_tokens
+            self.seconds_per_token += self.smoothing * (observed - self.seconds_per_token)
+
+
+def chunk_priorities(num_chunks: int, importance: Optional[Sequence[float]] = None,
+                     position_weight: float = 0.5) -> List[float]:
+    """
+    Scores chunks for scheduling. The opening chunks and the closing chunk
+    usually carry the document's framing and conclusions. ``importance``
+    (for example extractive scores) is normalized and blended in.
+    """
+    if num_chunks == 0:
+        return []
+
+    position = [1.0 / (1 + i) for i in range(num_chunks)]
+    position[-1] = max(position[-1], 0.5)
+
+    if importance is None or len(importance) != num_chunks:
+        return position
+
+    highest = max(importance) or 1.0
+    return [position_weight * p + (1 - position_weight) * (score / highest)
+            for p, score in zip(position, importance)]
+
+
+@dataclass
+class ScheduleResult:
+    """Outputs of the batches that finished before the deadline"""
+    results: Dict[int, str] = field(default_factory=dict)
+    completed_tokens: int = 0
+    total_tokens: int = 0
+    completed_batches: int = 0
+    skipped_batches: int = 0
+    total_chunks: int = 0
+    # Cancelled batches that may still be finishing model work they had started.
+    abandoned: List[asyncio.Future] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return len(self.results) == self.total_chunks
+
+    @property
+    def coverage(self) -> float:
+        if not self.total_tokens:
+            return 1.0
+        return round(self.completed_tokens / self.total_tokens, 3)
+
+
+class DeadlineScheduler:
+    """
+    Dispatches batches in priority order and stops scheduling new model work
+    once the estimated finish time of the next batch would pass the deadline.
+    Batches still running at the deadline are abandoned, and the caller gets
+    whatever finished in time; ``ScheduleResult.abandoned`` lets it keep the
+    model's resources until they wind down. The highest-priority batch is
+    always run, and waited for, so there is something to return.
+    """
+
+    def __init__(self, estimator: LatencyEstimator, max_in_flight: int = 3, safety_margin_seconds: float = 0.1):
+        self.estimator = estimator
+        self.max_in_flight = max_in_flight
+        self.safety_margin_seconds = safety_margin_seconds
+
+    async def run(self, batches: Sequence[ChunkBatch], execute: Callable[[ChunkBatch], Awaitable[List[str]]],
+                  deadline: Optional[float] = None, priorities: Optional[Sequence[float]] = None) -> ScheduleResult:
+        result = ScheduleResult(
+            total_tokens=sum(batch.real_tokens for batch in batches),
+            total_chunks=sum(len(batch.requests) for batch in batches)
+        )
+
+        if priorities is not None:
+            batches = sorted(batches, key=lambda b: -max(priorities[r.index] for r in b.requests))
+        pending = list(batches)
+        running = {}
+
+        async def timed(batch):
+            started = time.time()
+            outputs = await execute(batch)
+            self.estimator.update(batch, time.time() - started)
+            return outputs
+
+        def can_start(batch) -> bool:
+            if deadline is None or (not running and result.completed_batches == 0):
+                return True
+            # Running batches compete for the same model threads and CPU.
+            backlog = sum(self.estimator.estimate(b) for b in running.values()) / max(1, len(running))
+            finish = time.time() + backlog + self.estimator.estimate(batch)
+            return finish + self.safety_margin_seconds <= deadline
+
+        while pending or running:
+            while len(running) < self.max_in_flight:
+                # Take the most important batch that still fits; smaller ones may fit when bigger ones do not.
+                index = next((i for i, batch in enumerate(pending) if can_start(batch)), None)
+                if index is None:
+                    break
+                batch = pending.pop(index)
+                running[asyncio.ensure_future(timed(batch))] = batch
+
+            if not running:
+                break
+
+            if deadline is None or result.completed_batches == 0:
+                timeout = None
+            else:
+                timeout = max(0.0, deadline - time.time())
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+
+            for task in done:
+                batch = running.pop(task)
+                for request, output in zip(batch.requests, task.result()):
+                    if output:
+                        result.results[request.index] = output
+                        result.completed_tokens += request.num_tokens
+                result.completed_batches += 1
+
+        for task in running:
+            # Work still queued on the model executor is dropped; batches already generating finish unobserved.
+            task.cancel()
+        result.abandoned = list(running)
+        result.skipped_batches = len(pending) + len(running)
+        return result
@@ -0,0 +1,192 @@
+"""
+Local model snapshots with memory-mapped weights.
+
+    python -m src.models.snapshot --output models
+
+downloads the summarizer and QA models once and stores them as safetensors.
+Starting the API with ``MODEL_SNAPSHOT_DIR=models`` then loads everything
+offline. Weights are memory-mapped instead of copied, so uvicorn workers on
+the same host share one page-cache copy of each model.
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import warnings
+from typing import Dict, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import torch
+from transformers import AutoConfig, AutoTokenizer
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "snapshot.json"
+SAFETENSORS_FILE = "model.safetensors"
+SAFETENSORS_INDEX_FILE = "model.safetensors.index.json"
+
+_SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def snapshot_dir_name(model_name: str) -> str:
+    return model_name.replace("/", "--")
+
+
+def create_snapshot(models: Dict[str, str], output_dir: str) -> Dict[str, dict]:
+    """Saves each ``model_name -> task`` as safetensors with its tokenizer and writes a manifest"""
+    from src.models.backends import get_backend
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    for model_name, task in models.items():
+        path = os.path.join(output_dir, snapshot_dir_name(model_name))
+        model = get_backend("eager").load_model(task, model_name, torch.device("cpu"))
+        model.save_pretrained(path, safe_serialization=True)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(path)
+        manifest[model_name] = {"task": task, "path": snapshot_dir_name(model_name)}
+        logger.info(f"Saved snapshot of {model_name} to {path}")
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def resolve_model_path(model_name: str, snapshot_dir: Optional[str] = None) -> str:
+    """Returns the local snapshot path of a model, or the model name if it has no snapshot"""
+    if not snapshot_dir:
+        return model_name
+
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            entry = json.load(f).get(model_name)
+        if entry:
+            return os.path.join(snapshot_dir, entry["path"])
+
+    path = os.path.join(snapshot_dir, snapshot_dir_name(model_name))
+    return path if os.path.isdir(path) else model_name
+
+
+def has_safetensors(path: str) -> bool:
+    return os.path.isdir(path) and (os.path.exists(os.path.join(path, SAFETENSORS_FILE))
+                                    or os.path.exists(os.path.join(path, SAFETENSORS_INDEX_FILE)))
+
+
+def _mmap_safetensors_file(path: str) -> Dict[str, torch.Tensor]:
+    """Tensors that view a read-only mapping of a safetensors file, without copying"""
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header_size = struct.unpack("<Q", buffer[:8])[0]
+    header = json.loads(buffer[8:8 + header_size])
+    data_start = 8 + header_size
+
+    tensors = {}
+    with warnings.catch_warnings():
+        # The mapping is read-only on purpose; weights are never written at inference time.
+        warnings.filterwarnings("ignore", message="The given buffer is not writable")
+        for name, info in header.items():
+            if name == "__metadata__":
+                continue
+            dtype = _SAFETENSORS_DTYPES[info["dtype"]]
+            start, end = info["data_offsets"]
+            count = (end - start) // torch.empty((), dtype=dtype).element_size()
+            tensor = torch.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + start)
+            tensors[name] = tensor.reshape(info["shape"])
+
+    return tensors
+
+
+def load_mmap_state_dict(path: str) -> Dict[str, torch.Tensor]:
+    """Memory-maps every safetensors shard in a model directory"""
+    index_path = os.path.join(path, SAFETENSORS_INDEX_FILE)
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            shards = sorted(set(json.load(f)["weight_map"].values()))
+    else:
+        shards = [SAFETENSORS_FILE]
+
+    state_dict = {}
+    for shard in shards:
+        state_dict.update(_mmap_safetensors_file(os.path.join(path, shard)))
+    return state_dict
+
+
+def _materialize_buffers(model: torch.nn.Module, config):
+    """
+    Rebuilds buffers still on the meta device, which checkpoints do not store
+    (such as position ids), from a fresh copy of the module that owns them
+    """
+    for name, module in model.named_modules():
+        meta = [buffer for buffer, value in module.named_buffers(recurse=False) if value.is_meta]
+        if not meta:
+            continue
+        try:
+            fresh = type(module)(config)
+        except TypeError as e:
+            raise ValueError(f"Cannot rebuild buffers {meta} of {name or type(module).__name__}: {e}") from e
+        for buffer in meta:
+            module._buffers[buffer] = fresh._buffers[buffer]
+
+
+def load_model_mmap(auto_class, path: str, device: torch.device):
+    """
+    Loads a safetensors checkpoint whose weights view the memory-mapped file.
+
+    On CPU the weights are never copied: every process that loads the same
+    snapshot shares the kernel's page cache. Moving to an accelerator copies
+    them as usual.
+    """
+    config = AutoConfig.from_pretrained(path)
+    # The default device is thread-local, so models loading at the same time in other threads are unaffected.
+    with torch.device("meta"):
+        model = auto_class.from_config(config)
+
+    state_dict = load_mmap_state_dict(path)
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()
+    _materialize_buffers(model, config)
+
+    missing = [name for name, param in model.named_parameters() if param.is_meta]
+    if missing:
+        raise ValueError(f"Snapshot at {path} is missing weights: {missing[:5]}")
+
+    model.eval()
+    model.to(device)
+    return model
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Store models locally as safetensors for offline, shared loading")
+    arg_parser.add_argument("--output", default="models")
+    arg_parser.add_argument("--summarizer", default="facebook/bart-large-cnn")
+    arg_parser.add_argument("--qa", default="deepset/roberta-base-squad2")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    create_snapshot({args.summarizer: "seq2seq", args.qa: "qa"}, args.output)
+
+
+if __name__ == "__main__":
+    main()
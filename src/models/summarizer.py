@@ -1,53 +1,187 @@
-from typing import List
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
 
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from transformers import AutoTokenizer, LogitsProcessor, LogitsProcessorList
 import torch
 
+from src.models.backends import get_backend
 from src.models.base_model import BaseTransformerModel
+from src.models.device import BatchSizeLimits, ExecutionDevice, get_execution_device, padded_length, probe_batch_limits
+from src.models.generation_profiles import DEFAULT_PROFILE, GenerationProfile, get_profile
+
+
+class _MinLengthProcessor(LogitsProcessor):
+    """Blocks end of sequence before ``min_length`` tokens, like transformers' MinLengthLogitsProcessor"""
+
+    def __init__(self, min_length: int, eos_token_id):
+        self.min_length = min_length
+        self.eos_token_ids = eos_token_id if isinstance(eos_token_id, list) else [eos_token_id]
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        if input_ids.shape[-1] < self.min_length:
+            scores[:, self.eos_token_ids] = float("-inf")
+        return scores
 
 
 class DocumentSummarizer():
-    def __init__(self, model_name: str = "facebook/bart-large-cnn"):
+    def __init__(self, model_name: str = "facebook/bart-large-cnn", profiles: Optional[Dict[str, GenerationProfile]] = None,
+                 backend: str = "eager", execution: Optional[ExecutionDevice] = None, pad_to_multiple_of: int = 1):
+        self.model_name = model_name
+        self.pad_to_multiple_of = pad_to_multiple_of
+        self.max_input_tokens = 1024
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-        self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
-
-    def summarize(self, text: str, max_length: int = 130, min_length:int = 30):
-        inputs = self.tokenizer.encode("summarize: " + text,
-                                       return_tensors="pt",
-                                       truncation=True,
-                                       max_length=1024)
-        inputs = inputs.to(self.device)
-
-        summary_ids = self.model.generate(inputs,
-                                          max_length=max_length,
-                                          min_length=min_length,
-                                          num_beams=4,
-                                          length_penalty=2.0,
-                                          early_stopping=True)
-
-        summary = self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-        return summary
+        self.execution = execution or get_execution_device()
+        self.device = self.execution.device
+        self.backend = backend
+        self.model = get_backend(backend).load_model("seq2seq", model_name, self.device, self.execution.dtype)
+        self.profiles = profiles or {}
+        self._profile_models = {}
+        self._assistant_models = {}
+        self._profile_lock = threading.Lock()
+
+    def get_profile(self, name: str) -> GenerationProfile:
+        if name in self.profiles:
+            return self.profiles[name]
+        return get_profile(name)
+
+    def _model_for(self, profile: GenerationProfile):
+        """Returns the model for a profile, loading its distilled checkpoint on first use"""
+        if not profile.model_name or profile.model_name == self.model_name:
+            return self.model
+
+        with self._profile_lock:
+            if profile.model_name not in self._profile_models:
+                model = get_backend(self.backend).load_model("seq2seq", profile.model_name, self.device,
+                                                             self.execution.dtype)
+                self._profile_models[profile.model_name] = model
+            return self._profile_models[profile.model_name]
+
+    def _assistant_for(self, profile: GenerationProfile):
+        """Returns the draft model for a profile's assisted decoding, loading it on first use"""
+        if not profile.assistant_model_name:
+            return None
+
+        key = (profile.assistant_model_name, profile.num_assistant_tokens)
+        with self._profile_lock:
+            if key not in self._assistant_models:
+                # Draft models run eagerly: assisted decoding calls their full generate loop.
+                model = get_backend("eager").load_model("seq2seq", profile.assistant_model_name, self.device,
+                                                        self.execution.dtype)
+                if model.config.vocab_size != self.model.config.vocab_size:
+                    raise ValueError(f"Draft model {profile.assistant_model_name} does not share the vocabulary "
+                                     f"of {self.model_name}")
+                if profile.num_assistant_tokens is not None:
+                    model.generation_config.num_assistant_tokens = profile.num_assistant_tokens
+                    model.generation_config.num_assistant_tokens_schedule = "constant"
+                self._assistant_models[key] = model
+            return self._assistant_models[key]
+
+    def summarize(self, text: str, max_length: Optional[int] = None, min_length: Optional[int] = None,
+                  profile: str = DEFAULT_PROFILE):
+        return self.summarize_batch([text], max_length=max_length, min_length=min_length, profile=profile)[0]
+
+    def summarize_batch(self, texts: List[str], max_length: Optional[int] = None, min_length: Optional[int] = None,
+                        profile: str = DEFAULT_PROFILE) -> List[str]:
+        """Summarizes several chunks with a single padded generate call"""
+        inputs = self.collate(self.encode(texts))
+        summary_ids = self.generate_ids(inputs, max_length=max_length, min_length=min_length, profile=profile)
+        return self.decode(summary_ids)
+
+    def encode(self, texts: List[str]) -> List[List[int]]:
+        """Tokenizes chunks in one batch call, without padding"""
+        encoded = self.tokenizer(["summarize: " + text for text in texts],
+                                 truncation=True,
+                                 max_length=self.max_input_tokens)
+        return encoded["input_ids"]
+
+    def collate(self, input_ids: List[List[int]]) -> Dict[str, torch.Tensor]:
+        """Pads already tokenized chunks into one batch"""
+        length = padded_length(max((len(ids) for ids in input_ids), default=0), self.pad_to_multiple_of,
+                                limit=self.max_input_tokens)
+        batch = torch.full((len(input_ids), length), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(input_ids), length), dtype=torch.long)
+        for row, ids in enumerate(input_ids):
+            columns = slice(length - len(ids), length) if self.tokenizer.padding_side == "left" else slice(0, len(ids))
+            batch[row, columns] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, columns] = 1
+        return {"input_ids": batch, "attention_mask": attention_mask}
+
+    def generate_ids(self, inputs: Dict[str, torch.Tensor], max_length: Optional[int] = None,
+                     min_length: Optional[int] = None, profile: str = DEFAULT_PROFILE) -> torch.Tensor:
+        """Runs generate on a padded batch; this is the only step that needs the model"""
+        generation_profile = self.get_profile(profile)
+        model = self._model_for(generation_profile)
+        assistant = self._assistant_for(generation_profile)
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        generation_kwargs = generation_profile.build_kwargs(max_length, min_length)
+
+        if assistant is not None:
+            return self._generate_assisted(model, assistant, inputs, generation_kwargs).cpu()
+        summary_ids = model.generate(**inputs,
+                                     **generation_kwargs)
+        return summary_ids.cpu()
+
+    def _generate_assisted(self, model, assistant, inputs: Dict[str, torch.Tensor], generation_kwargs: Dict) -> torch.Tensor:
+        """Assisted decoding verifies one sequence at a time, so a batch is generated row by row"""
+        generation_kwargs = dict(generation_kwargs)
+        # transformers rejects its own min_length processor with an assistant, so the bound is enforced here.
+        min_length = generation_kwargs.pop("min_length", model.generation_config.min_length) or 0
+        generation_kwargs["min_length"] = 0
+        if min_length:
+            generation_kwargs["logits_processor"] = LogitsProcessorList(
+                [_MinLengthProcessor(min_length, model.generation_config.eos_token_id)])
+        rows = []
+        for input_ids, attention_mask in zip(inputs["input_ids"], inputs["attention_mask"]):
+            keep = attention_mask.bool()
+            rows.append(model.generate(input_ids=input_ids[keep][None], attention_mask=attention_mask[keep][None],
+                                       assistant_model=assistant, **generation_kwargs)[0])
+        return torch.nn.utils.rnn.pad_sequence(rows, batch_first=True, padding_value=self.tokenizer.pad_token_id)
+
+    def decode(self, summary_ids: torch.Tensor) -> List[str]:
+        return self.tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
+
+    def probe_batch_limits(self, sequence_lengths: Sequence[int] = (256, 512, 1024), profile: str = DEFAULT_PROFILE,
+                           generated_tokens: int = 8, **kwargs) -> BatchSizeLimits:
+        """
+        Measures the largest batch that fits in memory at each input length.
+        A few decoding steps are enough: encoder activations and the
+        cross-attention cache, which dominate memory, are sized by then.
+        """
+        generation_kwargs = dict(self.get_profile(profile).generate_kwargs,
+                                 max_length=generated_tokens, min_length=1)
+        token_id = self.tokenizer.unk_token_id if self.tokenizer.unk_token_id is not None else 0
+
+        def run(batch_size: int, sequence_length: int):
+            input_ids = torch.full((batch_size, sequence_length), token_id, dtype=torch.long, device=self.device)
+            self.model.generate(input_ids=input_ids, attention_mask=torch.ones_like(input_ids), **generation_kwargs)
+
+        return probe_batch_limits(run, sequence_lengths, self.execution, **kwargs)
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Returns the model input length of each chunk, used for length bucketing"""
+        return [len(ids) for ids in self.encode(texts)]
 
     def chunk_text(self, text: str, chunk_size: int = 1000) -> List[str]:
         """Divides text into smaller chunks"""
+        return list(self.iter_chunks([text], chunk_size=chunk_size))
 
-        words = text.split()
-        chunks = []
+    def iter_chunks(self, segments: Iterable[str], chunk_size: int = 1000) -> Iterator[str]:
+        """
+        Chunks a document that arrives in pieces, as ``chunk_text`` would chunk
+        the whole. Segments must end on whitespace, so no word is split.
+        """
         current_chunk = []
         current_length = 0
 
-        for word in words:
-            if current_length + len(word) > chunk_size:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_length = len(word)
-            else:
-                current_chunk.append(word)
-                current_length += len(word) +1
+        for segment in segments:
+            for word in segment.split():
+                if current_length + len(word) > chunk_size:
+                    yield ' '.join(current_chunk)
+                    current_chunk = [word]
+                    current_length = len(word)
+                else:
+                    current_chunk.append(word)
+                    current_length += len(word) +1
 
         if current_chunk:
-            chunks.append(' '.join(current_chunk))
-
-        return chunks
+            yield ' '.join(current_chunk)
@@ -0,0 +1,62 @@
+import re
+from collections import Counter
+from typing import Dict, List, Sequence
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _f1(overlap: int, prediction_total: int, reference_total: int) -> float:
+    if overlap == 0 or prediction_total == 0 or reference_total == 0:
+        return 0.0
+    precision = overlap / prediction_total
+    recall = overlap / reference_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(prediction: str, reference: str, n: int = 1) -> float:
+    """ROUGE-N F1 between a generated and a reference summary"""
+    pred_tokens = _tokens(prediction)
+    ref_tokens = _tokens(reference)
+
+    pred_ngrams = Counter(tuple(pred_tokens[i:i + n]) for i in range(len(pred_tokens) - n + 1))
+    ref_ngrams = Counter(tuple(ref_tokens[i:i + n]) for i in range(len(ref_tokens) - n + 1))
+    overlap = sum((pred_ngrams & ref_ngrams).values())
+
+    return _f1(overlap, sum(pred_ngrams.values()), sum(ref_ngrams.values()))
+
+
+def rouge_l(prediction: str, reference: str) -> float:
+    """ROUGE-L F1 based on the longest common subsequence"""
+    pred_tokens = _tokens(prediction)
+    ref_tokens = _tokens(reference)
+
+    previous = [0] * (len(ref_tokens) + 1)
+    for pred_token in pred_tokens:
+        current = [0]
+        for j, ref_token in enumerate(ref_tokens):
+            if pred_token == ref_token:
+                current.append(previous[j] + 1)
+            else:
+                current.append(max(previous[j + 1], current[j]))
+        previous = current
+
+    return _f1(previous[-1], len(pred_tokens), len(ref_tokens))
+
+
+def rouge_scores(predictions: Sequence[str], references: Sequence[str]) -> Dict[str, float]:
+    """Average ROUGE-1/2/L F1 over a set of summaries"""
+    if len(predictions) != len(references):
+        raise ValueError("predictions and references must have the same length")
+    if not predictions:
+        return {"rouge1": 0.0, "rouge2": 0.0, "rougeL": 0.0}
+
+    count = len(predictions)
+    return {
+        "rouge1": round(sum(rouge_n(p, r, 1) for p, r in zip(predictions, references)) / count, 4),
+        "rouge2": round(sum(rouge_n(p, r, 2) for p, r in zip(predictions, references)) / count, 4),
+        "rougeL": round(sum(rouge_l(p, r) for p, r in zip(predictions, references)) / count, 4)
+    }
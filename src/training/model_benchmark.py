@@ -2,16 +2,21 @@ import time
 import torch
 import pandas as pd
 import matplotlib.pyplot as plt
-from nltk.book import texts
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, AutoModelForQuestionAnswering
 from pathlib import Path
 import json
+from dataclasses import replace
+
+from src.models.backends import get_backend
+from src.models.device import get_execution_device
+from src.training.metrics import rouge_scores
 
 class ModelBenchmark:
     def __init__(self, save_dir="benchmarks"):
         self.save_dir = Path(save_dir)
         self.save_dir.mkdir(parents=True, exist_ok=True)
-        self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+        self.execution = get_execution_device()
+        self.device = self.execution.device
         self.results = {}
 
     def benchmark_summarization_model(self, model_name, sample_texts, batch_sizes=[1, 2, 4], num_runs=5, max_length=130):
@@ -152,6 +157,178 @@ class ModelBenchmark:
         except Exception as e:
             print(f"Error benchmarking {model_name}: {str(e)}")
 
+    def benchmark_generation_profiles(self, summarizer, sample_texts, reference_summaries, profiles=("fast", "balanced", "quality"), num_runs=3):
+        """Benchmark ROUGE against latency for each summarizer generation profile"""
+
+        print(f"Benchmarking generation profiles {list(profiles)} on {summarizer.model_name}")
+
+        results = {}
+
+        for profile in profiles:
+            try:
+                summaries = summarizer.summarize_batch(sample_texts, profile=profile)
+                times = []
+
+                for _ in range(num_runs):
+                    start_time = time.time()
+                    summaries = summarizer.summarize_batch(sample_texts, profile=profile)
+                    end_time = time.time()
+                    times.append(end_time - start_time)
+
+                avg_time = sum(times) / len(times)
+                generation_profile = summarizer.get_profile(profile)
+                results[profile] = {
+                    "model_name": generation_profile.model_name or summarizer.model_name,
+                    "avg_time_seconds": avg_time,
+                    "throughput": len(sample_texts) / avg_time,
+                    "rouge": rouge_scores(summaries, reference_summaries)
+                }
+            except Exception as e:
+                print(f"Error benchmarking profile {profile}: {str(e)}")
+                results[profile] = {"error": str(e)}
+
+        profile_results = {
+            "model_name": summarizer.model_name,
+            "device": str(summarizer.device),
+            "profile_results": results
+        }
+
+        self.results[f"profiles_{summarizer.model_name.replace('/','_')}"] = profile_results
+        return profile_results
+
+    def benchmark_assisted_generation(self, summarizer, sample_texts, profiles=("fast",), num_runs=3):
+        """
+        Tokens per second and draft acceptance rate of assisted decoding, against
+        the same profile without its draft model
+        """
+
+        print(f"Benchmarking assisted generation for {list(profiles)} on {summarizer.model_name}")
+
+        inputs = summarizer.collate(summarizer.encode(sample_texts))
+        pad_token_id = summarizer.tokenizer.pad_token_id
+        original_profiles = summarizer.profiles
+        results = {}
+
+        for profile in profiles:
+            try:
+                generation_profile = summarizer.get_profile(profile)
+                if not generation_profile.assistant_model_name:
+                    raise ValueError(f"Profile {profile} has no assistant model")
+                baseline = f"{profile}_unassisted"
+                summarizer.profiles = dict(original_profiles, **{
+                    baseline: replace(generation_profile, name=baseline, assistant_model_name=None)})
+                model = summarizer._model_for(generation_profile)
+                assistant = summarizer._assistant_for(generation_profile)
+
+                profile_results = {}
+                outputs = {}
+                for name in (baseline, profile):
+                    outputs[name] = summarizer.generate_ids(inputs, profile=name)
+                    calls = {"model": 0, "assistant": 0}
+                    hooks = [model.register_forward_hook(lambda *args: calls.__setitem__("model", calls["model"] + 1)),
+                             assistant.register_forward_hook(
+                                 lambda *args: calls.__setitem__("assistant", calls["assistant"] + 1))]
+                    times = []
+                    try:
+                        for _ in range(num_runs):
+                            start_time = time.time()
+                            summary_ids = summarizer.generate_ids(inputs, profile=name)
+                            times.append(time.time() - start_time)
+                    finally:
+                        for hook in hooks:
+                            hook.remove()
+
+                    # Every sequence starts with the decoder start token, which is not generated.
+                    new_tokens = int((summary_ids != pad_token_id).sum()) - len(summary_ids)
+                    avg_time = sum(times) / len(times)
+                    profile_results[name] = {
+                        "avg_time_seconds": avg_time,
+                        "tokens_per_second": new_tokens / avg_time,
+                        "model_forward_passes": calls["model"] / num_runs,
+                    }
+                    if name == profile:
+                        # Each verification pass keeps the accepted draft tokens plus one token of its own.
+                        accepted = max(new_tokens - calls["model"] / num_runs, 0)
+                        drafted = calls["assistant"] / num_runs
+                        profile_results[name]["draft_forward_passes"] = drafted
+                        profile_results[name]["acceptance_rate"] = accepted / drafted if drafted else 0.0
+
+                profile_results["speedup"] = profile_results[baseline]["avg_time_seconds"] / profile_results[profile]["avg_time_seconds"]
+                profile_results["identical_output"] = summarizer.decode(outputs[baseline]) == summarizer.decode(outputs[profile])
+                results[profile] = profile_results
+            except Exception as e:
+                print(f"Error benchmarking assisted profile {profile}: {str(e)}")
+                results[profile] = {"error": str(e)}
+            finally:
+                summarizer.profiles = original_profiles
+
+        assisted_results = {
+            "model_name": summarizer.model_name,
+            "device": str(summarizer.device),
+            "assisted_results": results
+        }
+
+        self.results[f"assisted_{summarizer.model_name.replace('/','_')}"] = assisted_results
+        return assisted_results
+
+    def benchmark_backends(self, model_name, task, backends=("eager", "torchscript", "onnx"), sample_texts=None,
+                           questions=None, contexts=None, num_runs=5, max_length=130):
+        """Compare latency of the same model across inference backends"""
+
+        print(f"Benchmarking backends {list(backends)} on {model_name}")
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if task == "qa":
+            inputs = tokenizer(questions, contexts, return_tensors="pt", padding=True, truncation=True, max_length=512)
+        else:
+            inputs = tokenizer(["summarize: " + text for text in sample_texts],
+                               return_tensors="pt", padding=True, truncation=True, max_length=1024)
+        inputs = {k: v.to(self.device) for k, v in inputs.items() if k in ("input_ids", "attention_mask")}
+
+        results = {}
+
+        for backend in backends:
+            try:
+                model = get_backend(backend).load_model(task, model_name, self.device, self.execution.dtype)
+
+                def run():
+                    with torch.no_grad():
+                        if task == "seq2seq":
+                            return model.generate(**inputs, max_length=max_length, num_beams=1, do_sample=False)
+                        return model(**inputs)
+
+                _ = run()
+                times = []
+                for _ in range(num_runs):
+                    start_time = time.time()
+                    _ = run()
+                    end_time = time.time()
+                    times.append(end_time - start_time)
+
+                avg_time = sum(times) / len(times)
+                results[backend] = {
+                    "avg_time_seconds": avg_time,
+                    "throughput": inputs["input_ids"].shape[0] / avg_time
+                }
+            except Exception as e:
+                print(f"Error benchmarking {backend} backend: {str(e)}")
+                results[backend] = {"error": str(e)}
+
+        if "avg_time_seconds" in results.get("eager", {}):
+            for backend, res in results.items():
+                if "avg_time_seconds" in res:
+                    res["speedup_vs_eager"] = results["eager"]["avg_time_seconds"] / res["avg_time_seconds"]
+
+        backend_results = {
+            "model_name": model_name,
+            "task": task,
+            "device": str(self.device),
+            "backend_results": results
+        }
+
+        self.results[f"backends_{task}_{model_name.replace('/','_')}"] = backend_results
+        return backend_results
+
     def save_results(self, filename="benchmark_results.json"):
         """Save benchmark results to a json file"""
 
@@ -0,0 +1,345 @@
+"""
+Distills the summarizer into a smaller student model.
+
+    python -m src.data.preprocessing reports/ --output data/reports
+    python -m src.training.trainer --teacher facebook/bart-large-cnn --data data/reports \\
+        --output runs/distilbart --decoder-layers 3
+
+The student copies the teacher with fewer decoder (and optionally encoder)
+layers, initialized from evenly spaced teacher layers. The teacher first
+summarizes every training document. These pseudo-summaries are stored as
+another token dataset and the student learns to reproduce them. Training
+saves a checkpoint every ``save_every`` steps and resumes from it when
+started again with the same output directory. Afterwards the student is
+benchmarked against the teacher for latency and ROUGE, with the teacher's
+summaries as references.
+
+The student can serve the ``fast`` profile by pointing the profile's
+``model_name`` at ``<output>/student``.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+from transformers import AutoModelForSeq2SeqLM, get_linear_schedule_with_warmup
+
+from src.data.dataloader import LengthGroupedSampler, TokenCollator, TokenDataset
+from src.data.preprocessing import ShardWriter, token_dtype
+from src.models.generation_profiles import GenerationProfile
+from src.models.summarizer import DocumentSummarizer
+
+logger = logging.getLogger(__name__)
+
+# Layer lists in the state dicts of BART/Pegasus/Marian ("layers") and T5 ("block").
+_LAYER_KEY_RE = re.compile(r"\b(encoder|decoder)\.(layers|block)\.(\d+)\.")
+_LAYER_CONFIG_KEYS = {
+    "encoder": ("encoder_layers", "num_layers"),
+    "decoder": ("decoder_layers", "num_decoder_layers"),
+}
+
+
+@dataclass
+class DistillationConfig:
+    teacher: str
+    data: str
+    output_dir: str
+    decoder_layers: int = 3
+    encoder_layers: Optional[int] = None
+    teacher_profile: str = "balanced"
+    max_target_length: int = 142
+    batch_size: int = 8
+    learning_rate: float = 3e-5
+    weight_decay: float = 0.01
+    warmup_steps: int = 500
+    epochs: int = 1
+    max_steps: Optional[int] = None
+    gradient_accumulation: int = 1
+    max_grad_norm: float = 1.0
+    save_every: int = 500
+    eval_examples: int = 32
+    label_batch_size: int = 8
+    num_workers: int = 0
+    seed: int = 0
+
+
+def select_layers(teacher_layers: int, student_layers: int) -> List[int]:
+    """Evenly spaced teacher layers to copy, always including the first and last"""
+    if not 1 <= student_layers <= teacher_layers:
+        raise ValueError(f"A student needs between 1 and {teacher_layers} layers, got {student_layers}")
+    if student_layers == 1:
+        return [0]
+    return np.linspace(0, teacher_layers - 1, student_layers).round().astype(int).tolist()
+
+
+def _num_layers(config, stack: str) -> Optional[int]:
+    for key in _LAYER_CONFIG_KEYS[stack]:
+        if getattr(config, key, None) is not None:
+            return getattr(config, key)
+    return None
+
+
+def create_student(teacher, decoder_layers: int, encoder_layers: Optional[int] = None):
+    """A copy of ``teacher`` with fewer layers, initialized from the selected teacher layers"""
+    config = teacher.config.__class__.from_dict(teacher.config.to_dict())
+    selected = {}
+    for stack, layers in (("encoder", encoder_layers), ("decoder", decoder_layers)):
+        teacher_layers = _num_layers(teacher.config, stack)
+        if teacher_layers is None:
+            raise ValueError(f"Cannot find the number of {stack} layers in {type(teacher.config).__name__}")
+        layers = teacher_layers if layers is None else layers
+        selected[stack] = {teacher_layer: student_layer
+                           for student_layer, teacher_layer in enumerate(select_layers(teacher_layers, layers))}
+        for key in _LAYER_CONFIG_KEYS[stack]:
+            if getattr(config, key, None) is not None:
+                setattr(config, key, layers)
+
+    student = AutoModelForSeq2SeqLM.from_config(config)
+    state = {}
+    for key, value in teacher.state_dict().items():
+        match = _LAYER_KEY_RE.search(key)
+        if match:
+            stack, _, layer = match.groups()
+            if int(layer) not in selected[stack]:
+                continue
+            key = key[:match.start(3)] + str(selected[stack][int(layer)]) + key[match.end(3):]
+        state[key] = value.clone()
+    missing, unexpected = student.load_state_dict(state, strict=False)
+    if unexpected or [key for key in missing if "embed" not in key and "lm_head" not in key]:
+        raise ValueError(f"Student weights do not match the teacher: missing {missing}, unexpected {unexpected}")
+    student.tie_weights()
+    logger.info(f"Student layers: encoder {sorted(selected['encoder'])}, decoder {sorted(selected['decoder'])} "
+                f"({student.num_parameters() / teacher.num_parameters():.0%} of the teacher's parameters)")
+    return student
+
+
+class DistillationTrainer:
+    """Pseudo-labels the training data with the teacher, trains the student, then compares both"""
+
+    def __init__(self, config: DistillationConfig):
+        self.config = config
+        self.teacher = DocumentSummarizer(config.teacher)
+        self.tokenizer = self.teacher.tokenizer
+        self.labels_dir = os.path.join(config.output_dir, "pseudo_labels")
+        self.checkpoint_dir = os.path.join(config.output_dir, "checkpoint")
+        self.student_dir = os.path.join(config.output_dir, "student")
+        os.makedirs(config.output_dir, exist_ok=True)
+
+    def run(self) -> Dict:
+        self.generate_pseudo_labels()
+        self.train()
+        return self.evaluate()
+
+    def _num_train(self, dataset: TokenDataset) -> int:
+        return max(len(dataset) - self.config.eval_examples, 0)
+
+    def generate_pseudo_labels(self):
+        """Stores the teacher's summary of every document as ``labels`` next to its ``input_ids``"""
+        if os.path.exists(os.path.join(self.labels_dir, "dataset.json")):
+            logger.info(f"Reusing pseudo-labels in {self.labels_dir}")
+            return
+
+        dataset = TokenDataset(self.config.data)
+        if dataset.manifest.get("vocab_size") != len(self.tokenizer):
+            raise ValueError(f"{self.config.data} was tokenized with {dataset.manifest.get('tokenizer')}, "
+                             f"which does not match the teacher's tokenizer")
+
+        writer = ShardWriter(self.labels_dir + ".tmp", token_dtype(len(self.tokenizer)))
+        pad_token_id = self.tokenizer.pad_token_id
+        batch_size = self.config.label_batch_size
+        for start in range(0, len(dataset), batch_size):
+            input_ids = [dataset[i]["input_ids"].tolist() for i in range(start, min(start + batch_size, len(dataset)))]
+            with torch.no_grad():
+                summary_ids = self.teacher.generate_ids(self.teacher.collate(input_ids),
+                                                        max_length=self.config.max_target_length,
+                                                        profile=self.config.teacher_profile)
+            for source, summary in zip(input_ids, summary_ids.tolist()):
+                # Generated ids start with the decoder start token, which labels leave out.
+                labels = [token for token in summary[1:] if token != pad_token_id]
+                writer.write({"input_ids": source, "labels": labels})
+            logger.info(f"Pseudo-labeled {min(start + batch_size, len(dataset))}/{len(dataset)} documents")
+
+        writer.close({"tokenizer": self.config.teacher, "vocab_size": len(self.tokenizer),
+                      "teacher_profile": self.config.teacher_profile})
+        shutil.rmtree(self.labels_dir, ignore_errors=True)
+        os.replace(self.labels_dir + ".tmp", self.labels_dir)
+
+    def _save_checkpoint(self, student, optimizer, scheduler, state: Dict):
+        temp_dir = self.checkpoint_dir + ".tmp"
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        student.save_pretrained(temp_dir)
+        torch.save({"optimizer": optimizer.state_dict(), "scheduler": scheduler.state_dict(), "state": state},
+                   os.path.join(temp_dir, "trainer_state.pt"))
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+        os.replace(temp_dir, self.checkpoint_dir)
+        logger.info(f"Saved checkpoint at step {state['step']}")
+
+    def train(self):
+        config = self.config
+        if os.path.exists(os.path.join(self.student_dir, "config.json")):
+            logger.info(f"Student already trained in {self.student_dir}")
+            return
+
+        torch.manual_seed(config.seed)
+        dataset = TokenDataset(self.labels_dir)
+        num_train = self._num_train(dataset)
+        if num_train == 0:
+            raise ValueError(f"No training examples left after holding out {config.eval_examples} for evaluation")
+
+        # Train on the first documents only; the rest are held out for evaluation.
+        sampler = LengthGroupedSampler(dataset.lengths()[:num_train], config.batch_size, seed=config.seed)
+        loader = DataLoader(dataset, batch_sampler=sampler, collate_fn=TokenCollator(self.tokenizer.pad_token_id),
+                            num_workers=config.num_workers)
+        batches_per_epoch = len(sampler)
+        total_steps = config.max_steps or config.epochs * -(-batches_per_epoch // config.gradient_accumulation)
+
+        resume = os.path.exists(os.path.join(self.checkpoint_dir, "trainer_state.pt"))
+        if resume:
+            student = AutoModelForSeq2SeqLM.from_pretrained(self.checkpoint_dir)
+        else:
+            student = create_student(self.teacher.model, config.decoder_layers, config.encoder_layers)
+        # Train in float32 even when the teacher runs in reduced precision.
+        student.to(device=self.teacher.device, dtype=torch.float32)
+        student.train()
+
+        no_decay = ("bias", "layer_norm.weight", "layernorm.weight")
+        parameters = [
+            {"params": [p for n, p in student.named_parameters() if not n.endswith(no_decay)],
+             "weight_decay": config.weight_decay},
+            {"params": [p for n, p in student.named_parameters() if n.endswith(no_decay)], "weight_decay": 0.0},
+        ]
+        optimizer = torch.optim.AdamW(parameters, lr=config.learning_rate)
+        scheduler = get_linear_schedule_with_warmup(optimizer, min(config.warmup_steps, total_steps // 10), total_steps)
+        state = {"step": 0, "epoch": 0, "batches_done": 0, "losses": []}
+
+        if resume:
+            saved = torch.load(os.path.join(self.checkpoint_dir, "trainer_state.pt"), weights_only=False)
+            optimizer.load_state_dict(saved["optimizer"])
+            scheduler.load_state_dict(saved["scheduler"])
+            state = saved["state"]
+            logger.info(f"Resuming from step {state['step']} (epoch {state['epoch']})")
+
+        while state["step"] < total_steps:
+            sampler.set_epoch(state["epoch"])
+            running_loss = 0.0
+            for batch_number, batch in enumerate(loader):
+                # The sampler order depends only on the seed and epoch, so resuming skips exactly the finished batches.
+                if batch_number < state["batches_done"]:
+                    continue
+                batch = {k: v.to(student.device) for k, v in batch.items()}
+                loss = student(**batch).loss / config.gradient_accumulation
+                loss.backward()
+                running_loss += loss.item()
+                state["batches_done"] = batch_number + 1
+
+                if state["batches_done"] % config.gradient_accumulation and state["batches_done"] != batches_per_epoch:
+                    continue
+                torch.nn.utils.clip_grad_norm_(student.parameters(), config.max_grad_norm)
+                optimizer.step()
+                scheduler.step()
+                optimizer.zero_grad()
+                state["step"] += 1
+                state["losses"] = state["losses"][-99:] + [round(running_loss, 4)]
+                running_loss = 0.0
+
+                if state["step"] % 10 == 0:
+                    logger.info(f"Step {state['step']}/{total_steps}: loss {state['losses'][-1]:.4f}")
+                if state["step"] % config.save_every == 0 or state["step"] >= total_steps:
+                    self._save_checkpoint(student, optimizer, scheduler, state)
+                if state["step"] >= total_steps:
+                    break
+            else:
+                state["epoch"] += 1
+                state["batches_done"] = 0
+
+        student.save_pretrained(self.student_dir)
+        self.tokenizer.save_pretrained(self.student_dir)
+        with open(os.path.join(self.student_dir, "distillation.json"), "w") as f:
+            json.dump({"config": asdict(config), "steps": state["step"], "final_loss": state["losses"][-1:]}, f, indent=2)
+        logger.info(f"Saved the student to {self.student_dir}")
+
+    def evaluate(self, num_runs: int = 3) -> Dict:
+        """Latency and ROUGE of the student against the teacher on the held-out documents"""
+        from src.training.model_benchmark import ModelBenchmark
+
+        dataset = TokenDataset(self.labels_dir)
+        held_out = range(self._num_train(dataset), len(dataset))
+        if not held_out:
+            held_out = range(min(len(dataset), self.config.eval_examples))
+        prefix = self.teacher.tokenizer.decode(self.teacher.encode([""])[0], skip_special_tokens=True)
+        texts, references = [], []
+        for i in held_out:
+            example = dataset[i]
+            text = self.tokenizer.decode(example["input_ids"], skip_special_tokens=True)
+            # The summarizer adds the prefix again when it encodes the text.
+            texts.append(text[len(prefix):].lstrip() if prefix and text.startswith(prefix) else text)
+            references.append(self.tokenizer.decode(example["labels"], skip_special_tokens=True))
+
+        teacher_profile = self.teacher.get_profile(self.config.teacher_profile)
+        generate_kwargs = dict(teacher_profile.generate_kwargs, max_length=self.config.max_target_length)
+        self.teacher.profiles = {
+            "teacher": GenerationProfile("teacher", generate_kwargs),
+            "student": GenerationProfile("student", generate_kwargs, model_name=self.student_dir),
+        }
+
+        benchmark = ModelBenchmark(save_dir=self.config.output_dir)
+        report = {
+            "profiles": benchmark.benchmark_generation_profiles(self.teacher, texts, references,
+                                                                profiles=("teacher", "student"), num_runs=num_runs),
+            "teacher": benchmark.benchmark_summarization_model(self.config.teacher, texts, num_runs=num_runs,
+                                                               max_length=self.config.max_target_length),
+            "student": benchmark.benchmark_summarization_model(self.student_dir, texts, num_runs=num_runs,
+                                                               max_length=self.config.max_target_length),
+        }
+        profile_results = report["profiles"]["profile_results"]
+        if "avg_time_seconds" in profile_results.get("teacher", {}) and "avg_time_seconds" in profile_results.get("student", {}):
+            report["speedup"] = round(profile_results["teacher"]["avg_time_seconds"]
+                                      / profile_results["student"]["avg_time_seconds"], 2)
+        benchmark.save_results("distillation_benchmark.json")
+
+        with open(os.path.join(self.config.output_dir, "distillation_report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Student vs teacher: speedup {report.get('speedup')}, "
+                    f"ROUGE {profile_results.get('student', {}).get('rouge')}")
+        return report
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--teacher", default="facebook/bart-large-cnn")
+    arg_parser.add_argument("--data", required=True, help="dataset written by src.data.preprocessing")
+    arg_parser.add_argument("--output", required=True)
+    arg_parser.add_argument("--decoder-layers", type=int, default=3)
+    arg_parser.add_argument("--encoder-layers", type=int, default=None, help="all teacher encoder layers by default")
+    arg_parser.add_argument("--teacher-profile", default="balanced")
+    arg_parser.add_argument("--batch-size", type=int, default=8)
+    arg_parser.add_argument("--learning-rate", type=float, default=3e-5)
+    arg_parser.add_argument("--epochs", type=int, default=1)
+    arg_parser.add_argument("--max-steps", type=int, default=None)
+    arg_parser.add_argument("--gradient-accumulation", type=int, default=1)
+    arg_parser.add_argument("--save-every", type=int, default=500)
+    arg_parser.add_argument("--eval-examples", type=int, default=32)
+    arg_parser.add_argument("--num-workers", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    config = DistillationConfig(
+        teacher=args.teacher, data=args.data, output_dir=args.output, decoder_layers=args.decoder_layers,
+        encoder_layers=args.encoder_layers, teacher_profile=args.teacher_profile, batch_size=args.batch_size,
+        learning_rate=args.learning_rate, epochs=args.epochs, max_steps=args.max_steps,
+        gradient_accumulation=args.gradient_accumulation, save_every=args.save_every,
+        eval_examples=args.eval_examples, num_workers=args.num_workers
+    )
+    report = DistillationTrainer(config).run()
+    print(json.dumps(report.get("profiles", {}).get("profile_results", {}), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import math
+import multiprocessing
+import os
+import threading
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+READABILITY_EDGES = (0, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20)
+DIVERSITY_EDGES = (0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+@dataclass
+class Histogram:
+    """Fixed-bin histogram that can be merged across workers and updates"""
+    edges: Sequence[float]
+    counts: List[int] = None
+    total: float = 0.0
+    total_squares: float = 0.0
+    n: int = 0
+
+    def __post_init__(self):
+        if self.counts is None:
+            # One bin below the first edge and one for each edge upwards.
+            self.counts = [0] * (len(self.edges) + 1)
+
+    def add(self, value: float):
+        self.counts[bisect_right(self.edges, value)] += 1
+        self.total += value
+        self.total_squares += value * value
+        self.n += 1
+
+    def merge(self, other: "Histogram"):
+        if tuple(self.edges) != tuple(other.edges):
+            raise ValueError("Cannot merge histograms with different bins")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.n += other.n
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile: the upper edge of the bin holding it"""
+        if not self.n:
+            return None
+        target = q * self.n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return self.edges[min(i, len(self.edges) - 1)]
+        return self.edges[-1]
+
+    def to_dict(self) -> Dict:
+        mean = self.total / self.n if self.n else 0.0
+        variance = max(0.0, self.total_squares / self.n - mean * mean) if self.n else 0.0
+        labels = [f"<{self.edges[0]}"]
+        labels += [f"{low}-{high}" for low, high in zip(self.edges, self.edges[1:])]
+        labels.append(f">={self.edges[-1]}")
+        return {
+            "count": self.n,
+            "mean": round(mean, 3),
+            "std": round(math.sqrt(variance), 3),
+            "median": self.quantile(0.5),
+            "bins": dict(zip(labels, self.counts)),
+        }
+
+
+@dataclass
+class DocumentStats:
+    """Per-document counts produced by a worker process"""
+    doc_id: str
+    language: str
+    term_counts: Counter
+    word_count: int
+    sentence_count: int
+    readability: float
+
+    @property
+    def lexical_diversity(self) -> float:
+        return len(self.term_counts) / max(1, self.word_count)
+
+
+def analyze_document(doc_id: str, text: str, language: str = "english") -> DocumentStats:
+    """Analyzes one document with ``DocumentAnalyzer``; runs inside worker processes"""
+    from src.utils.document_analyzer import DocumentAnalyzer
+
+    analyzer = DocumentAnalyzer(text, language=language)
+    return DocumentStats(
+        doc_id=doc_id,
+        language=language,
+        term_counts=Counter(analyzer.filtered_words),
+        word_count=len(analyzer.words),
+        sentence_count=len(analyzer.sentences),
+        readability=analyzer.get_readability_score()
+    )
+
+
+def analyze_segments(doc_id: str, segments: Iterable[str], language: str = "english") -> DocumentStats:
+    """Analyzes a document that arrives in segments, holding one segment's words at a time"""
+    from src.utils.document_analyzer import DocumentAnalyzer, readability
+
+    term_counts = Counter()
+    word_count, sentence_count, syllable_count = 0, 0, 0
+    for segment in segments:
+        analyzer = DocumentAnalyzer(segment, language=language)
+        term_counts.update(analyzer.filtered_words)
+        word_count += len(analyzer.words)
+        sentence_count += len(analyzer.sentences)
+        syllable_count += analyzer.get_syllable_count()
+    return DocumentStats(
+        doc_id=doc_id,
+        language=language,
+        term_counts=term_counts,
+        word_count=word_count,
+        sentence_count=sentence_count,
+        readability=readability(word_count, sentence_count, syllable_count)
+    )
+
+
+def _analyze(item: Tuple[str, str, str]) -> DocumentStats:
+    return analyze_document(*item)
+
+
+@dataclass
+class CorpusAggregate:
+    """Corpus-wide counters. Aggregates from separate workers or batches merge exactly."""
+    term_counts: Counter = field(default_factory=Counter)
+    document_frequency: Counter = field(default_factory=Counter)
+    languages: Counter = field(default_factory=Counter)
+    num_documents: int = 0
+    word_count: int = 0
+    sentence_count: int = 0
+    readability: Histogram = field(default_factory=lambda: Histogram(READABILITY_EDGES))
+    diversity: Histogram = field(default_factory=lambda: Histogram(DIVERSITY_EDGES))
+
+    def add(self, stats: DocumentStats):
+        self.term_counts.update(stats.term_counts)
+        self.document_frequency.update(stats.term_counts.keys())
+        self.languages[stats.language] += 1
+        self.num_documents += 1
+        self.word_count += stats.word_count
+        self.sentence_count += stats.sentence_count
+        self.readability.add(stats.readability)
+        self.diversity.add(stats.lexical_diversity)
+
+    def merge(self, other: "CorpusAggregate"):
+        self.term_counts.update(other.term_counts)
+        self.document_frequency.update(other.document_frequency)
+        self.languages.update(other.languages)
+        self.num_documents += other.num_documents
+        self.word_count += other.word_count
+        self.sentence_count += other.sentence_count
+        self.readability.merge(other.readability)
+        self.diversity.merge(other.diversity)
+
+
+class CorpusAnalytics:
+    """
+    Keyword, readability and diversity statistics over many documents.
+
+    Documents are analyzed in a process pool and folded into a
+    ``CorpusAggregate``. Adding documents only analyzes the new ones; the
+    corpus-wide numbers are updated by merging, never recomputed. TF-IDF
+    terms are computed on request against the current document frequencies.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, min_parallel_documents: int = 8):
+        self.max_workers = max_workers
+        self.min_parallel_documents = min_parallel_documents
+        self.aggregate = CorpusAggregate()
+        self.documents: Dict[str, DocumentStats] = {}
+        self._lock = threading.Lock()
+
+    def analyze(self, documents: Dict[str, str], language: str = "english") -> List[DocumentStats]:
+        """Analyzes documents without adding them to the corpus"""
+        items = [(doc_id, text, language) for doc_id, text in documents.items()]
+        if len(items) < self.min_parallel_documents:
+            return [_analyze(item) for item in items]
+
+        workers = self.max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(items) // (workers * 4))
+        # Spawned, not forked: a fork of the server copies its loaded models and
+        # any lock another thread holds at that moment, which can deadlock the child.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            return list(executor.map(_analyze, items, chunksize=chunksize))
+
+    def add_documents(self, documents: Dict[str, str], language: str = "english") -> List[str]:
+        """Analyzes new documents and merges them into the corpus; returns the ids that were added"""
+        with self._lock:
+            new_documents = {doc_id: text for doc_id, text in documents.items() if doc_id not in self.documents}
+
+        results = self.analyze(new_documents, language)
+
+        with self._lock:
+            # Skip documents another caller added while these were being analyzed.
+            added = [stats for stats in results if stats.doc_id not in self.documents]
+            batch = CorpusAggregate()
+            for stats in added:
+                batch.add(stats)
+                self.documents[stats.doc_id] = stats
+            self.aggregate.merge(batch)
+
+        return [stats.doc_id for stats in added]
+
+    def add_stats(self, stats: Iterable[DocumentStats]):
+        """Adds documents that were already analyzed elsewhere"""
+        with self._lock:
+            for document in stats:
+                if document.doc_id in self.documents:
+                    continue
+                self.aggregate.add(document)
+                self.documents[document.doc_id] = document
+
+    def top_keywords(self, top_n: int = 20) -> List[Tuple[str, int]]:
+        return self.aggregate.term_counts.most_common(top_n)
+
+    def distinctive_terms(self, doc_id: str, top_n: int = 10) -> List[Tuple[str, float]]:
+        """Terms that are frequent in one document but rare in the rest of the corpus (TF-IDF)"""
+        try:
+            stats = self.documents[doc_id]
+        except KeyError:
+            raise ValueError(f"Unknown document: {doc_id}")
+
+        total = sum(stats.term_counts.values()) or 1
+        num_documents = self.aggregate.num_documents
+        frequency = self.aggregate.document_frequency
+        scores = [
+            (term, count / total * (math.log((1 + num_documents) / (1 + frequency[term])) + 1))
+            for term, count in stats.term_counts.items()
+        ]
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return [(term, round(score, 4)) for term, score in scores[:top_n]]
+
+    def readability_distribution(self) -> Dict:
+        return self.aggregate.readability.to_dict()
+
+    def summary(self, top_n: int = 20) -> Dict:
+        aggregate = self.aggregate
+        return {
+            "documents": aggregate.num_documents,
+            "languages": dict(aggregate.languages),
+            "words": aggregate.word_count,
+            "sentences": aggregate.sentence_count,
+            "vocabulary": len(aggregate.term_counts),
+            "average_sentence_length": round(aggregate.word_count / max(1, aggregate.sentence_count), 2),
+            "top_keywords": self.top_keywords(top_n),
+            "readability": aggregate.readability.to_dict(),
+            "lexical_diversity": aggregate.diversity.to_dict(),
+        }
@@ -0,0 +1,327 @@
+"""
+Near-duplicate detection with MinHash signatures and an LSH band index.
+
+Documents are compared on word shingles of their cleaned text. Similar
+documents, such as one contract with two different cover pages, agree on
+most signature positions. The LSH index only compares a query with
+documents that share at least one band with it.
+
+Band lookups are binary searches in sorted per-band arrays. New documents
+go to a small in-memory table first and are merged into the sorted arrays
+in bulk: the new hashes are sorted and spliced in, one linear pass over
+each band rather than a full re-sort. A lookup is a few dozen
+``searchsorted`` calls, well under a millisecond even with millions of
+documents. The index can be shared between threads.
+"""
+import json
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SHINGLE_BASE = np.uint64(1000003)
+_FNV_PRIME = np.uint64(1099511628211)
+_FNV_OFFSET = np.uint64(14695981039346656037)
+
+
+class MinHasher:
+    """MinHash signatures of word shingles. Hashes are stable across processes, so signatures can be stored."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1, block_size: int = 4096):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.block_size = block_size
+        rng = np.random.RandomState(seed)
+        # Multipliers below 2**31 keep a * hash + b inside uint64 for 32-bit shingle hashes.
+        self.a = rng.randint(1, (1 << 31) - 1, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, (1 << 31) - 1, size=num_perm).astype(np.uint64)
+
+    def _word_hashes(self, text: str) -> np.ndarray:
+        words = text.lower().split()
+        return np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words),
+                           dtype=np.uint64, count=len(words))
+
+    @staticmethod
+    def _shingle_hashes(word_hashes: np.ndarray, size: int) -> np.ndarray:
+        count = len(word_hashes) - size + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset in range(size):
+            hashes = (hashes * _SHINGLE_BASE + word_hashes[offset:offset + count]) & _MAX_HASH
+        return hashes
+
+    def _update(self, signature: np.ndarray, shingles: np.ndarray):
+        for start in range(0, len(shingles), self.block_size):
+            block = shingles[start:start + self.block_size, None]
+            hashed = ((block * self.a + self.b) % _MERSENNE_PRIME) & _MAX_HASH
+            np.minimum(signature, hashed.min(axis=0), out=signature)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Unique 32-bit hashes of the word shingles of ``text``"""
+        word_hashes = self._word_hashes(text)
+        if not len(word_hashes):
+            return np.zeros(0, dtype=np.uint64)
+        return np.unique(self._shingle_hashes(word_hashes, min(self.shingle_size, len(word_hashes))))
+
+    def signature(self, text: str) -> np.ndarray:
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        self._update(signature, self.shingles(text))
+        return signature.astype(np.uint32)
+
+    def signature_segments(self, segments: Iterable[str]) -> np.ndarray:
+        """
+        Signature of a document that arrives in segments, equal to the
+        signature of their concatenation. Segments must end on whitespace.
+        """
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        # The last words of the previous segment start shingles that end in the next one.
+        carry = np.zeros(0, dtype=np.uint64)
+        total = 0
+        for segment in segments:
+            word_hashes = self._word_hashes(segment)
+            if not len(word_hashes):
+                continue
+            total += len(word_hashes)
+            word_hashes = np.concatenate([carry, word_hashes])
+            if len(word_hashes) < self.shingle_size:
+                carry = word_hashes
+                continue
+            self._update(signature, self._shingle_hashes(word_hashes, self.shingle_size))
+            carry = word_hashes[len(word_hashes) - self.shingle_size + 1:]
+        if 0 < total < self.shingle_size:
+            # Short documents are one shingle of all their words, as in ``shingles``.
+            self._update(signature, self._shingle_hashes(carry, total))
+        return signature.astype(np.uint32)
+
+
+def signature_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the two documents' shingle sets"""
+    return float(np.mean(first == second))
+
+
+def band_hashes(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """One 64-bit hash per band of each signature, shape ``(n, bands)``"""
+    signatures = np.atleast_2d(signatures)
+    rows = signatures.shape[1] // bands
+    banded = signatures[:, :bands * rows].reshape(len(signatures), bands, rows).astype(np.uint64)
+    hashes = np.full(banded.shape[:2], _FNV_OFFSET, dtype=np.uint64)
+    for row in range(rows):
+        hashes = (hashes ^ banded[:, :, row]) * _FNV_PRIME
+    # Mix in the band number so equal rows in different bands hash apart.
+    return hashes ^ np.arange(bands, dtype=np.uint64)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index of MinHash signatures with a JSON payload per document.
+
+    ``bands`` of ``num_perm // bands`` rows set the candidate threshold:
+    with 128 permutations in 16 bands, pairs above about 0.7 Jaccard
+    similarity become candidates. Candidates are then checked against
+    ``threshold`` with their full signatures.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.8,
+                 shingle_size: int = 5, seed: int = 1, merge_threshold: int = 4096):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, seed=seed)
+        self.bands = bands
+        self.threshold = threshold
+        self.merge_threshold = merge_threshold
+
+        self.keys: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.payloads: Dict[str, dict] = {}
+        self._signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+
+        self._sorted_hashes = np.zeros((bands, 0), dtype=np.uint64)
+        self._sorted_ids = np.zeros((bands, 0), dtype=np.int64)
+        self._recent: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._recent_count = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.positions
+
+    @property
+    def signatures(self) -> np.ndarray:
+        return self._signatures[:len(self.keys)]
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.hasher.signature(text)
+
+    def signature_segments(self, segments: Iterable[str]) -> np.ndarray:
+        return self.hasher.signature_segments(segments)
+
+    def add(self, key: str, signature: np.ndarray, payload: Optional[dict] = None):
+        """Indexes a document, or updates the payload of one that is already indexed"""
+        with self._lock:
+            self._add(key, signature, payload)
+
+    def _add(self, key: str, signature: np.ndarray, payload: Optional[dict]):
+        if key in self.positions:
+            if payload is not None:
+                self.payloads[key] = payload
+            return
+
+        position = len(self.keys)
+        if position == len(self._signatures):
+            grown = np.zeros((2 * len(self._signatures), self._signatures.shape[1]), dtype=np.uint32)
+            grown[:position] = self._signatures
+            self._signatures = grown
+        self._signatures[position] = signature
+        self.keys.append(key)
+        self.positions[key] = position
+        if payload is not None:
+            self.payloads[key] = payload
+
+        for band, band_hash in enumerate(band_hashes(signature, self.bands)[0].tolist()):
+            self._recent[band].setdefault(band_hash, []).append(position)
+        self._recent_count += 1
+        if self._recent_count >= self.merge_threshold:
+            self._merge()
+
+    def add_many(self, keys: List[str], signatures: np.ndarray):
+        """Bulk-indexes new documents straight into the sorted band arrays"""
+        with self._lock:
+            self._add_many(keys, signatures)
+
+    def _add_many(self, keys: List[str], signatures: np.ndarray):
+        first = {}
+        for i, key in enumerate(keys):
+            if key not in self.positions:
+                first.setdefault(key, i)
+        if not first:
+            return
+        keys = list(first)
+        signatures = np.asarray(signatures, dtype=np.uint32)[list(first.values())]
+
+        self._merge()
+        start = len(self.keys)
+        needed = start + len(keys)
+        if needed > len(self._signatures):
+            grown = np.zeros((max(needed, 2 * len(self._signatures)), self._signatures.shape[1]), dtype=np.uint32)
+            grown[:start] = self._signatures[:start]
+            self._signatures = grown
+        self._signatures[start:needed] = signatures
+        for position, key in enumerate(keys, start):
+            self.keys.append(key)
+            self.positions[key] = position
+        self._merge()
+
+    def _merge(self):
+        """Moves recently added documents into the sorted band arrays"""
+        start = self._sorted_ids.shape[1]
+        if start == len(self.keys):
+            return
+        new_hashes = band_hashes(self._signatures[start:len(self.keys)], self.bands).T
+        order = np.argsort(new_hashes, axis=1, kind="stable")
+        new_hashes = np.take_along_axis(new_hashes, order, axis=1)
+        new_ids = order + start
+
+        count = start + new_hashes.shape[1]
+        hashes = np.empty((self.bands, count), dtype=np.uint64)
+        ids = np.empty((self.bands, count), dtype=np.int64)
+        for band in range(self.bands):
+            # Where each new hash goes in the merged band; after equal old ones, as a stable sort would put it.
+            slots = np.searchsorted(self._sorted_hashes[band], new_hashes[band], side="right")
+            slots += np.arange(len(slots))
+            old = np.ones(count, dtype=bool)
+            old[slots] = False
+            hashes[band, slots], ids[band, slots] = new_hashes[band], new_ids[band]
+            hashes[band, old], ids[band, old] = self._sorted_hashes[band], self._sorted_ids[band]
+        self._sorted_hashes, self._sorted_ids = hashes, ids
+
+        self._recent = [{} for _ in range(self.bands)]
+        self._recent_count = 0
+
+    def candidates(self, signature: np.ndarray) -> np.ndarray:
+        """Positions of documents that share at least one band with ``signature``"""
+        with self._lock:
+            return self._candidates(signature)
+
+    def _candidates(self, signature: np.ndarray) -> np.ndarray:
+        found = []
+        for band, band_hash in enumerate(band_hashes(signature, self.bands)[0]):
+            sorted_hashes = self._sorted_hashes[band]
+            left = np.searchsorted(sorted_hashes, band_hash, side="left")
+            right = np.searchsorted(sorted_hashes, band_hash, side="right")
+            if right > left:
+                found.append(self._sorted_ids[band, left:right])
+            recent = self._recent[band].get(int(band_hash))
+            if recent:
+                found.append(np.asarray(recent, dtype=np.int64))
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def query(self, signature: np.ndarray, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Indexed documents at least ``threshold`` similar to ``signature``, most similar first"""
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            positions = self._candidates(signature)
+            if not len(positions):
+                return []
+            similarities = np.mean(self._signatures[positions] == signature, axis=1)
+            keys = [self.keys[position] for position in positions.tolist()]
+
+        matches = [(key, round(float(similarity), 4))
+                   for key, similarity in zip(keys, similarities.tolist())
+                   if similarity >= threshold]
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def best_match(self, signature: np.ndarray, threshold: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        matches = self.query(signature, threshold)
+        return matches[0] if matches else None
+
+    def save(self, path: str):
+        """
+        Writes the index to ``path`` (.npz) and its payloads next to it
+        (.json). Only the copy of the signatures holds the lock; the index
+        stays usable while the files are written.
+        """
+        with self._lock:
+            signatures, keys, payloads = self.signatures.copy(), list(self.keys), dict(self.payloads)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        base = path[:-4] if path.endswith(".npz") else path
+        config = {
+            "num_perm": self.hasher.num_perm,
+            "bands": self.bands,
+            "threshold": self.threshold,
+            "shingle_size": self.hasher.shingle_size,
+            "seed": self.hasher.seed,
+        }
+        # Write to temporary files and rename, so a crash never leaves a half-written snapshot.
+        np.savez(base + ".tmp.npz", signatures=signatures, keys=np.array(keys, dtype=str))
+        with open(base + ".tmp.json", "w") as f:
+            json.dump({"config": config, "payloads": payloads}, f)
+        os.replace(base + ".tmp.npz", base + ".npz")
+        os.replace(base + ".tmp.json", base + ".json")
+
+    @classmethod
+    def load(cls, path: str, threshold: Optional[float] = None) -> "NearDuplicateIndex":
+        base = path[:-4] if path.endswith(".npz") else path
+        with open(base + ".json") as f:
+            metadata = json.load(f)
+        config = metadata["config"]
+        if threshold is not None:
+            config["threshold"] = threshold
+        index = cls(**config)
+
+        with np.load(base + ".npz") as data:
+            signatures = data["signatures"]
+            keys = data["keys"].tolist()
+
+        index.add_many(keys, signatures)
+        index.payloads = metadata["payloads"]
+        return index
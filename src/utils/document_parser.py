@@ -1,9 +1,23 @@
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
 import PyPDF2
-import docx
-import re
 import os
 
+from src.utils.docx_stream import docx_to_text
+from src.utils.language_detection import LanguageDetection, detect_language
+from src.utils.text_normalizer import OffsetMap, get_normalizer
+from src.utils.text_stream import iter_text_segments, read_text
+
+
+@dataclass
+class ParsedDocument:
+    """Extracted text together with the language detected while parsing"""
+    text: str
+    language: LanguageDetection
+
+
 class DocumentParser:
     def __init__(self):
         self.supported_formats = ['.pdf', '.docx', '.txt']
@@ -25,6 +39,34 @@ class DocumentParser:
         else:
             raise ValueError(f'Unsupported file format: {file_path}. Supported formats: {self.supported_formats}')
 
+    def iter_segments(self, file_path: str, original_filename: str = None) -> Iterator[str]:
+        """
+        Yields a document's text in pieces. Text files are streamed with
+        bounded memory; other formats are parsed whole and yielded once.
+        """
+        ext = os.path.splitext(original_filename or file_path)[1].lower()
+        if ext == '.txt':
+            yield from iter_text_segments(file_path)
+        else:
+            yield self.read_file(file_path, original_filename=original_filename) or ""
+
+    def read_document(self, file_path: str, original_filename: str = None) -> ParsedDocument:
+        """Reads a document and detects its language once, so later stages can route on it"""
+        text = self.read_file(file_path, original_filename=original_filename) or ""
+        return ParsedDocument(text=text, language=detect_language(text))
+
+    def read_files(self, file_paths: List[str], max_workers: Optional[int] = None) -> List[str]:
+        """
+        Parses several documents in parallel worker processes, preserving input
+        order. Workers are spawned rather than forked from the server process.
+        """
+
+        if len(file_paths) <= 1:
+            return [self.read_file(path) for path in file_paths]
+
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            return list(executor.map(self.read_file, file_paths))
+
     def _parse_pdf(self, file_path:str) -> str:
         """Parses a PDF file"""
 
@@ -38,23 +80,17 @@ class DocumentParser:
             return text
 
     def _parse_docx(self, file_path:str) -> str:
-        """Parses a docx file"""
-        doc = docx.Document(file_path)
-        text = ''
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + '\n'
-
-        return text
+        """Parses a docx file, including tables and page headers, by streaming its XML"""
+        return docx_to_text(file_path)
 
     def _parse_txt(self, file_path:str) -> str:
-        """Parses a txt file"""
-        with open(file_path, 'r', encoding='utf-8') as txt_file:
-            return txt_file.read()
-
-    def clean_text(self, text:str) -> str:
-        """Basic text cleaning"""
-        text = ' '.join(text.split())
+        """Parses a txt file in whatever encoding it was saved with"""
+        return read_text(file_path)
 
-        text = re.sub(r'[^\w\s]', '', text)
+    def clean_text(self, text:str, profile: str = "summarization") -> str:
+        """Normalizes text for a downstream task ("qa", "summarization" or "analytics")"""
+        return get_normalizer(profile).normalize(text)
 
-        return text
+    def clean_text_with_offsets(self, text: str, profile: str = "qa") -> Tuple[str, OffsetMap]:
+        """Normalizes text and returns a map back to positions in the original text"""
+        return get_normalizer(profile).normalize_with_offsets(text)
@@ -0,0 +1,122 @@
+import re
+import zipfile
+from typing import Iterator, List, Tuple
+from xml.etree import ElementTree
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_PARAGRAPH = W_NS + "p"
+_TEXT = W_NS + "t"
+_TAB = W_NS + "tab"
+_BREAKS = (W_NS + "br", W_NS + "cr")
+_TABLE = W_NS + "tbl"
+_ROW = W_NS + "tr"
+_CELL = W_NS + "tc"
+_STYLE = W_NS + "pStyle"
+_STYLE_VAL = W_NS + "val"
+_BODY = W_NS + "body"
+
+_HEADER_PART = re.compile(r"word/header\d*\.xml$")
+_FOOTER_PART = re.compile(r"word/footer\d*\.xml$")
+
+
+def _iter_part(archive: zipfile.ZipFile, part: str, kind: str) -> Iterator[Tuple[str, str]]:
+    """
+    Stream one WordprocessingML part and yield ``(kind, text)`` blocks in
+    document order.
+
+    Paragraphs are yielded as ``kind`` (or ``"heading"`` when they use a
+    Heading style). Each table row is yielded as one ``"table_row"`` block
+    with its cells separated by tabs. Finished top-level elements are cleared
+    from the tree, so memory stays bounded by the largest single block.
+    """
+    paragraph_parts: List[str] = []
+    paragraph_style = ""
+    # One entry per open table cell: the paragraphs collected so far.
+    cell_stack: List[List[str]] = []
+    # One entry per open table row: the finished cell texts.
+    row_stack: List[List[str]] = []
+    container = None
+
+    with archive.open(part) as stream:
+        for event, elem in ElementTree.iterparse(stream, events=("start", "end")):
+            tag = elem.tag
+
+            if event == "start":
+                if container is None and tag in (_BODY, W_NS + "hdr", W_NS + "ftr"):
+                    container = elem
+                elif tag == _PARAGRAPH:
+                    paragraph_parts = []
+                    paragraph_style = ""
+                elif tag == _ROW:
+                    row_stack.append([])
+                elif tag == _CELL:
+                    cell_stack.append([])
+                continue
+
+            if tag == _TEXT:
+                if elem.text:
+                    paragraph_parts.append(elem.text)
+            elif tag == _TAB:
+                paragraph_parts.append("\t")
+            elif tag in _BREAKS:
+                paragraph_parts.append("\n")
+            elif tag == _STYLE:
+                paragraph_style = elem.get(_STYLE_VAL, "")
+            elif tag == _PARAGRAPH:
+                text = "".join(paragraph_parts)
+                paragraph_parts = []
+                if cell_stack:
+                    cell_stack[-1].append(text)
+                elif text:
+                    yield ("heading" if paragraph_style.lower().startswith("heading") else kind), text
+            elif tag == _CELL:
+                cell_text = " ".join(p for p in cell_stack.pop() if p)
+                if row_stack:
+                    row_stack[-1].append(cell_text)
+            elif tag == _ROW:
+                row_text = "\t".join(row_stack.pop())
+                if cell_stack:
+                    # Nested table: fold the row into the enclosing cell.
+                    cell_stack[-1].append(row_text)
+                elif row_text.strip():
+                    yield "table_row", row_text
+
+            if container is not None and not cell_stack and tag in (_PARAGRAPH, _TABLE):
+                container.clear()
+
+
+def iter_docx_blocks(file_path: str, include_headers: bool = True) -> Iterator[Tuple[str, str]]:
+    """
+    Yields ``(kind, text)`` blocks from a .docx file without loading it
+    through python-docx. Page headers come first, then the body, then page
+    footers.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        names = archive.namelist()
+
+        if include_headers:
+            for part in sorted(n for n in names if _HEADER_PART.match(n)):
+                yield from _iter_part(archive, part, "header")
+
+        yield from _iter_part(archive, "word/document.xml", "paragraph")
+
+        if include_headers:
+            for part in sorted(n for n in names if _FOOTER_PART.match(n)):
+                yield from _iter_part(archive, part, "footer")
+
+
+def docx_to_text(file_path: str, include_headers: bool = True) -> str:
+    """Extracts paragraphs, table rows and page headers from a .docx file as plain text"""
+    seen_margins = set()
+    blocks = []
+
+    for kind, text in iter_docx_blocks(file_path, include_headers=include_headers):
+        if kind in ("header", "footer"):
+            # Headers and footers are often repeated across sections.
+            if text in seen_margins:
+                continue
+            seen_margins.add(text)
+        blocks.append(text)
+
+    return "\n".join(blocks)
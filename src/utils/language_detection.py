@@ -0,0 +1,169 @@
+"""
+Offline language detection from character trigram profiles.
+
+Each language profile is built from its most frequent words, which
+dominate the trigram statistics of running text. Detection compares the
+trigram counts of a short sample of the document against every profile.
+It needs no network access or model download and takes about a
+millisecond per document.
+"""
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+UNDETERMINED = "und"
+
+# ISO 639-1 codes to the names NLTK uses for stop word lists.
+LANGUAGE_NAMES = {
+    "en": "english",
+    "de": "german",
+    "fr": "french",
+    "es": "spanish",
+    "it": "italian",
+    "pt": "portuguese",
+    "nl": "dutch",
+    "pl": "polish",
+}
+
+_COMMON_WORDS = {
+    "en": "the of and to in is that for it as was with be by on not he this are or his from at which but have an "
+          "they you were her she there been one all we their has would when if more no out so said what up its "
+          "about into than them can only other new some could time these two may then do first any my now such "
+          "like our over man me even most made after also did many before must through back years where much "
+          "your way well down should because each just those people how too little state good very make world "
+          "still own see men work long get here between both life being under never day same another know while "
+          "last might us great old year off come since against go came right used take three shall agreement "
+          "data system service services model models training request response error server user users file "
+          "files report results test tests value number total amount payment invoice due date client customer "
+          "price tax order account support version update install required requires using based following",
+    "de": "der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an werden aus "
+          "er hat dass sie nach wird bei einer um am sind noch wie einem über einen so zum war haben nur oder aber "
+          "vor zur bis mehr durch man sein wurde sei ihre wenn seine ich diese unter wir schon können jahr jahre "
+          "zwischen gegen ohne sehr hier dieser dieses zwei neue neuen kann waren worden ihr ihren wieder dann "
+          "immer keine weil gibt müssen soll sollen könnte würde bereits beim gewesen seit damit sowie vertrag",
+    "fr": "de la le et les des en un du une que est pour qui dans a par plus pas au sur ne se ce il sont avec ou "
+          "son été aux elle mais nous comme ses leur on sa cette ont fait peut deux entre aussi tout dont même "
+          "leurs était être sans lui ils avait très bien où ces après sous encore avant autres année années "
+          "depuis notre vous je faire nouvelle nouveau trois avoir temps alors toute tous cela donc contre "
+          "pourrait doit selon chez premier première pays fois rapport contrat société",
+    "es": "de la que el en y a los del se las por un para con no una su al es lo como más o pero sus le ha me si "
+          "sin sobre este ya entre cuando todo esta ser son dos también fue había era muy años hasta desde está "
+          "mi porque qué sólo han yo hay vez puede todos así nos ni parte tiene él uno donde bien tiempo mismo ese "
+          "ahora cada e vida otro después te otros aunque esa eso hace otra gobierno tan durante siempre día "
+          "tanto ella tres sí dijo sido gran país según menos año antes estado contrato empresa",
+    "it": "di e il la che in a per un è del non una le si con i da sono al dei della alla lo come più ma nel "
+          "anche delle ha gli o ci se questo su dal nella suo essere era loro tra sua quando degli molto due "
+          "cui ancora dopo fatto ne stato anni sia solo tutti hanno parte tutto però senza fra ogni questa "
+          "sempre stata può essere fare dove quindi mentre proprio tempo prima oggi modo nuovo contratto società",
+    "pt": "de a o que e do da em um para é com não uma os no se na por mais as dos como mas foi ao ele das tem à "
+          "seu sua ou ser quando muito há nos já está eu também só pelo pela até isso ela entre era depois sem "
+          "mesmo aos ter seus quem nas me esse eles estão você tinha foram essa num nem suas meu às minha têm "
+          "numa pelos elas havia seja qual será nós tenho lhe deles essas esses pelas este fosse dele contrato "
+          "empresa são anos ainda ano governo então ação ações informação relação situação período próximo mês "
+          "equipe relatório trabalho desenvolvimento conselho primeiro nossa nosso apenas sobre",
+    "nl": "de van het een en in is dat op te zijn voor met die niet aan er om ook als dan maar bij of uit nog "
+          "worden door naar heeft tot ze wordt over hij hun moet zal kan wel wat al was deze werd meer dit zich "
+          "jaar geen twee veel nu onder tegen hebben waren ons mijn zo na omdat toen haar ik we je wij alle "
+          "zoals tussen sinds zonder jaren nieuwe kunnen moeten zullen waar hier daar overeenkomst bedrijf",
+    "pl": "w i się na nie z do że to jest o jak po co ale od za tak jego przez a już tylko dla są może być ich "
+          "było jej przy lub tym roku czy także oraz który która które bardzo jeszcze gdy ten był była został "
+          "została pod nad tego tej kiedy między będzie więc nawet bez teraz wszystkie wiele też gdzie lat "
+          "dwa jednak sobie mnie można jako ze mają ma jednak zostały polska umowa firmy spółki pracy rok",
+}
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def trigram_counts(text: str) -> Counter:
+    """Counts character trigrams of each lowercased word, padded with spaces"""
+    counts = Counter()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            counts[padded[i:i + 3]] += 1
+    return counts
+
+
+def _profile(counts: Counter, size: int) -> Dict[str, float]:
+    """Unit-length vector of the most frequent trigrams"""
+    top = counts.most_common(size)
+    norm = math.sqrt(sum(count * count for _, count in top)) or 1.0
+    return {trigram: count / norm for trigram, count in top}
+
+
+@dataclass
+class LanguageDetection:
+    """Detected language code with its confidence and the score of every language"""
+    language: str
+    confidence: float
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def language_name(self) -> str:
+        """Language name in the form NLTK expects, English when undetermined"""
+        return LANGUAGE_NAMES.get(self.language, "english")
+
+
+class LanguageDetector:
+    """
+    Character trigram language identification.
+
+    Only the first ``sample_size`` characters are examined. Text with too
+    few letters, that matches no profile well (best score under
+    ``min_score``), or whose best match is not clearly ahead of the
+    runner-up (relative margin under ``min_confidence``) is reported as
+    ``UNDETERMINED``. Short technical text shares few trigrams with any
+    profile, and guessing a language for it does more harm than falling
+    back to the default.
+    """
+
+    def __init__(self, languages: Optional[Iterable[str]] = None, profile_size: int = 400,
+                 sample_size: int = 2000, min_letters: int = 20, min_confidence: float = 0.1,
+                 min_score: float = 0.2):
+        languages = list(languages or _COMMON_WORDS)
+        unknown = [language for language in languages if language not in _COMMON_WORDS]
+        if unknown:
+            raise ValueError(f"No language profile for: {unknown}. Available languages: {list(_COMMON_WORDS)}")
+
+        self.profiles = {language: _profile(trigram_counts(_COMMON_WORDS[language]), profile_size)
+                         for language in languages}
+        self.profile_size = profile_size
+        self.sample_size = sample_size
+        self.min_letters = min_letters
+        self.min_confidence = min_confidence
+        self.min_score = min_score
+
+    def detect(self, text: str) -> LanguageDetection:
+        sample = text[:self.sample_size]
+        counts = trigram_counts(sample)
+        if sum(counts.values()) < self.min_letters:
+            return LanguageDetection(UNDETERMINED, 0.0)
+
+        document = _profile(counts, self.profile_size * 2)
+        scores = {
+            language: sum(weight * document.get(trigram, 0.0) for trigram, weight in profile.items())
+            for language, profile in self.profiles.items()
+        }
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        best, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+
+        # Confidence is the margin over the runner-up, relative to the best score.
+        confidence = (best_score - runner_up) / best_score if best_score else 0.0
+        rounded = {language: round(score, 4) for language, score in ranked}
+        if confidence < self.min_confidence or best_score < self.min_score:
+            return LanguageDetection(UNDETERMINED, round(confidence, 3), rounded)
+        return LanguageDetection(best, round(confidence, 3), rounded)
+
+
+@lru_cache(maxsize=None)
+def get_detector() -> LanguageDetector:
+    return LanguageDetector()
+
+
+def detect_language(text: str) -> LanguageDetection:
+    """Detects the language of a document with the shared detector"""
+    return get_detector().detect(text)
@@ -0,0 +1,47 @@
+import os
+import resource
+import sys
+from typing import Dict, Optional
+
+_SMAPS_FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_clean_mb",
+    "Private_Dirty": "private_dirty_mb",
+}
+
+
+def memory_usage() -> Dict[str, float]:
+    """
+    Memory of the current process in MB.
+
+    On Linux this reads ``/proc/self/smaps_rollup``. Its shared/private split
+    shows how much of the resident set is page cache shared with other
+    workers, such as memory-mapped model weights. Elsewhere only the peak
+    RSS is available.
+    """
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            for line in smaps:
+                key, _, value = line.partition(":")
+                if key in _SMAPS_FIELDS:
+                    usage[_SMAPS_FIELDS[key]] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    usage["peak_rss_mb"] = round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+    return usage
+
+
+
+def open_file_descriptors() -> Optional[int]:
+    """Number of file descriptors the current process has open, or None where it cannot be read"""
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(fd_dir))
+        except OSError:
+            continue
+    return None
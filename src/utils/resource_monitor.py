@@ -0,0 +1,135 @@
+"""
+Resource usage of a long-running process, sampled over time to catch leaks.
+
+A soak run replays many requests and samples the resident set, traced
+Python allocations, open file descriptors, threads, log handlers and the
+files left in a temporary directory. Growth is measured from the first
+sample after a warm-up, so caches filling up and lazily loaded models do
+not count as leaks.
+"""
+import gc
+import logging
+import os
+import threading
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from src.utils.process_stats import memory_usage, open_file_descriptors
+
+
+@dataclass
+class ResourceSample:
+    requests: int
+    rss_mb: float
+    traced_mb: float
+    open_files: Optional[int]
+    threads: int
+    log_handlers: int
+    temp_files: int
+
+
+@dataclass
+class ResourceLimits:
+    """Largest growth from the warm-up sample that still passes"""
+    rss_mb: float = 50.0
+    traced_mb: float = 10.0
+    open_files: int = 5
+    threads: int = 2
+    log_handlers: int = 0
+    temp_files: int = 0
+
+
+class ResourceMonitor:
+    """Samples this process's resources and reports what grew, and which lines allocated the growth"""
+
+    def __init__(self, temp_dir: Optional[str] = None, warmup_requests: int = 0, trace_frames: int = 1):
+        self.temp_dir = temp_dir
+        self.warmup_requests = warmup_requests
+        self.trace_frames = trace_frames
+        self.samples: List[ResourceSample] = []
+        self.baseline: Optional[ResourceSample] = None
+        self._baseline_snapshot = None
+        self._temp_before = set()
+        self._started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._started_tracing = True
+        if self.temp_dir:
+            self._temp_before = set(os.listdir(self.temp_dir))
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def temp_files(self) -> List[str]:
+        """Entries of the temporary directory that appeared since ``start``"""
+        if not self.temp_dir:
+            return []
+        return sorted(set(os.listdir(self.temp_dir)) - self._temp_before)
+
+    def sample(self, requests: int) -> ResourceSample:
+        """Records current usage after ``requests`` requests; the first sample past the warm-up is the baseline"""
+        gc.collect()
+        usage = memory_usage()
+        traced, _ = tracemalloc.get_traced_memory()
+        sample = ResourceSample(
+            requests=requests,
+            rss_mb=usage.get("rss_mb", usage["peak_rss_mb"]),
+            traced_mb=round(traced / 1024 / 1024, 2),
+            open_files=open_file_descriptors(),
+            threads=threading.active_count(),
+            log_handlers=len(logging.getLogger().handlers),
+            temp_files=len(self.temp_files())
+        )
+        self.samples.append(sample)
+        if self.baseline is None and requests >= self.warmup_requests:
+            self.baseline = sample
+            self._baseline_snapshot = self._snapshot()
+        return sample
+
+    def _snapshot(self):
+        # Leave out tracemalloc's own bookkeeping.
+        return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+    def growth(self) -> Dict[str, float]:
+        """Change of each measure from the baseline to the last sample"""
+        if self.baseline is None:
+            return {}
+        last = self.samples[-1]
+        growth = {}
+        for name, value in asdict(last).items():
+            start = getattr(self.baseline, name)
+            if name != "requests" and value is not None and start is not None:
+                growth[name] = round(value - start, 2)
+        return growth
+
+    def top_allocators(self, limit: int = 10) -> List[str]:
+        """Source lines whose live allocations grew most since the baseline"""
+        if self._baseline_snapshot is None or not tracemalloc.is_tracing():
+            return []
+        stats = self._snapshot().compare_to(self._baseline_snapshot, "lineno")
+        grown = sorted((stat for stat in stats if stat.size_diff > 0), key=lambda stat: -stat.size_diff)
+        return [str(stat) for stat in grown[:limit]]
+
+    def check(self, limits: ResourceLimits) -> List[str]:
+        """Descriptions of every measure that grew past its limit"""
+        growth = self.growth()
+        return [
+            f"{name} grew by {growth[name]} (limit {limit})"
+            for name, limit in asdict(limits).items()
+            if name in growth and growth[name] > limit
+        ]
+
+    def report(self, limits: ResourceLimits, top: int = 10) -> Dict:
+        return {
+            "baseline": asdict(self.baseline) if self.baseline else None,
+            "last": asdict(self.samples[-1]) if self.samples else None,
+            "growth": self.growth(),
+            "violations": self.check(limits),
+            "leftover_temp_files": self.temp_files()[:top],
+            "top_allocators": self.top_allocators(top)
+        }
@@ -0,0 +1,99 @@
+"""
+Sentence and word segmentation.
+
+The default ``RegexSegmenter`` is a few precompiled rules: it needs no
+model data, loads instantly and is fast enough for whole corpora. NLTK's
+punkt models handle unusual abbreviations better; choose them with
+``SEGMENTER=nltk``. NLTK is only imported when that segmenter is used and
+its data is never downloaded implicitly.
+"""
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Common abbreviations that end with a period without ending the sentence.
+ABBREVIATIONS = frozenset("""
+mr. mrs. ms. dr. prof. sr. jr. st. mt. vs. etc. e.g. i.e. cf. al. approx. fig. figs. no. nos. vol. p. pp.
+ed. eds. inc. ltd. co. corp. llc. dept. est. jan. feb. mar. apr. jun. jul. aug. sep. sept. oct. nov. dec.
+sec. art. para. ch. ex. min. max. ref. op. cit. gen. gov. sen. rep. rev. hon.
+""".split())
+
+# A candidate boundary: sentence punctuation, optional closing quotes or brackets,
+# whitespace and an uppercase letter, digit or opening quote. Blank lines always end a sentence.
+_BOUNDARY_RE = re.compile(r"""[.!?]+["'”’)\]]*\s+(?=["'“‘(\[]?[A-Z0-9])|\n\s*\n""")
+_INITIALS_RE = re.compile(r"(?:[A-Za-z]\.)+")
+_LAST_WORD_RE = re.compile(r"\S+$")
+_WORD_RE = re.compile(r"\w+(?:[-'’.,]\w+)*|[^\w\s]")
+
+
+class RegexSegmenter:
+    """Rule-based segmentation that treats abbreviations, initials and decimals as part of a sentence"""
+    name = "regex"
+
+    def sentences(self, text: str, language: str = "english") -> List[str]:
+        sentences = []
+        start = 0
+        for match in _BOUNDARY_RE.finditer(text):
+            if match.group()[0] == "." and self._is_abbreviation(text, match.start()):
+                continue
+            sentence = text[start:match.start() + len(match.group().rstrip())].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+
+        last = text[start:].strip()
+        if last:
+            sentences.append(last)
+        return sentences
+
+    @staticmethod
+    def _is_abbreviation(text: str, period: int) -> bool:
+        word = _LAST_WORD_RE.search(text, max(0, period - 40), period + 1).group().lstrip("\"'“‘([").lower()
+        return word in ABBREVIATIONS or bool(_INITIALS_RE.fullmatch(word))
+
+    def words(self, text: str, language: str = "english") -> List[str]:
+        """Words, numbers and punctuation marks as separate tokens"""
+        return _WORD_RE.findall(text)
+
+
+class NltkSegmenter:
+    """NLTK punkt sentence splitting and Treebank word tokenization"""
+    name = "nltk"
+
+    def __init__(self):
+        import nltk
+
+        nltk.data.find("tokenizers/punkt")
+        from nltk.tokenize import sent_tokenize, word_tokenize
+
+        self._sent_tokenize = sent_tokenize
+        self._word_tokenize = word_tokenize
+
+    def sentences(self, text: str, language: str = "english") -> List[str]:
+        try:
+            return self._sent_tokenize(text, language=language)
+        except LookupError:
+            return self._sent_tokenize(text)
+
+    def words(self, text: str, language: str = "english") -> List[str]:
+        return self._word_tokenize(text)
+
+
+@lru_cache(maxsize=None)
+def get_segmenter(name: str = None):
+    """Shared segmenter; ``name`` defaults to the SEGMENTER environment variable, then ``regex``"""
+    name = name or os.environ.get("SEGMENTER", "regex")
+    if name == "regex":
+        return RegexSegmenter()
+    if name == "nltk":
+        try:
+            return NltkSegmenter()
+        except (ImportError, LookupError):
+            logger.warning("NLTK punkt data is not available; falling back to the regex segmenter. "
+                           "Install it with: python -m nltk.downloader punkt")
+            return RegexSegmenter()
+    raise ValueError(f"Unknown segmenter: {name}. Available segmenters: ['regex', 'nltk']")
@@ -0,0 +1,189 @@
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# Deleted characters are first replaced with this sentinel so every
+# character-level step stays length-preserving and offsets can be mapped.
+_DELETED = "\x00"
+# Once all whitespace is a plain space, these are the only places where
+# collapsing changes the text: runs, deletions and leading/trailing spaces.
+_GAP_RE = re.compile(r"[ \x00]{2,}|\x00|\A | \Z")
+_OTHER_SPACE_RE = re.compile(r"[^\S ]")
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+_SYMBOL_RE = re.compile(r"[^\w\s\x00]")
+
+_CONTROL_CHARS = "".join(chr(c) for c in list(range(0x00, 0x09)) + [0x0b, 0x0c] + list(range(0x0e, 0x20)) + [0x7f])
+_INVISIBLE_CHARS = "­​‌‍⁠﻿"
+
+_TYPOGRAPHIC = {
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'",
+    "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "―": "-", "−": "-",
+}
+_BULLETS = "•◦▪‣●⁃·"
+
+
+@dataclass(frozen=True)
+class NormalizationProfile:
+    """Character-level rules applied by a TextNormalizer"""
+    name: str
+    replacements: Dict[str, str] = field(default_factory=dict)
+    spaces: str = ""
+    deletions: str = ""
+    strip_symbols: bool = False
+    lowercase: bool = False
+
+
+NORMALIZATION_PROFILES = {
+    "qa": NormalizationProfile(
+        name="qa",
+        replacements=_TYPOGRAPHIC,
+        spaces=_CONTROL_CHARS,
+        deletions=_INVISIBLE_CHARS
+    ),
+    "summarization": NormalizationProfile(
+        name="summarization",
+        replacements=_TYPOGRAPHIC,
+        spaces=_CONTROL_CHARS + _BULLETS,
+        deletions=_INVISIBLE_CHARS
+    ),
+    "analytics": NormalizationProfile(
+        name="analytics",
+        replacements=_TYPOGRAPHIC,
+        spaces=_CONTROL_CHARS + _BULLETS,
+        deletions=_INVISIBLE_CHARS,
+        strip_symbols=True,
+        lowercase=True
+    )
+}
+
+
+class OffsetMap:
+    """
+    Maps positions in normalized text back to the original text.
+
+    Normalized text is a sequence of runs copied character-for-character
+    from the original, so only the start of each run is stored.
+    """
+
+    def __init__(self, normalized_starts: List[int], original_starts: List[int], lengths: List[int]):
+        self.normalized_starts = normalized_starts
+        self.original_starts = original_starts
+        self.lengths = lengths
+
+    def to_original(self, index: int) -> int:
+        """Original position of the character at ``index`` in the normalized text"""
+        run = max(bisect_right(self.normalized_starts, index) - 1, 0)
+        if not self.lengths:
+            return 0
+        offset = min(index - self.normalized_starts[run], self.lengths[run])
+        return self.original_starts[run] + max(offset, 0)
+
+    def span_to_original(self, start: int, end: int) -> Tuple[int, int]:
+        """Original ``[start, end)`` span of a normalized ``[start, end)`` span"""
+        if end <= start:
+            position = self.to_original(start)
+            return position, position
+        return self.to_original(start), self.to_original(end - 1) + 1
+
+
+class TextNormalizer:
+    """
+    Normalizes extracted document text for a downstream task.
+
+    Every character-level rule is a one-for-one replacement, so the only
+    structural change is collapsing whitespace and offsets into the original
+    text are cheap to keep. The character rules and the whitespace collapse
+    are separate passes. For ASCII input the rules are one precompiled
+    ``str.translate`` table, which CPython runs on a fast path. Translating
+    non-ASCII strings falls back to a per-character dict lookup, so other
+    input instead gets one ``str.replace`` per special character it actually
+    contains, plus regex passes for control characters and stripped symbols.
+    Sentence punctuation is kept unless the profile strips symbols.
+    """
+
+    def __init__(self, profile: str = "summarization"):
+        try:
+            self.profile = NORMALIZATION_PROFILES[profile]
+        except KeyError:
+            raise ValueError(f"Unknown normalization profile: {profile}. "
+                             f"Available profiles: {list(NORMALIZATION_PROFILES)}")
+
+        self.ascii_table = {c: " " for c in range(128) if _CONTROL_RE.match(chr(c))}
+        if self.profile.strip_symbols:
+            self.ascii_table.update({c: " " for c in range(128) if _SYMBOL_RE.match(chr(c))})
+
+        special = dict(self.profile.replacements)
+        special.update(dict.fromkeys(self.profile.spaces, " "))
+        self.special_chars = [(char, replacement) for char, replacement in special.items() if not char.isascii()]
+        self.deletions = [char for char in self.profile.deletions if not char.isascii()]
+
+    def _replace_chars(self, text: str, deleted: str) -> str:
+        """Applies the character rules without changing the text length, except for deletions when ``deleted`` is empty"""
+        if text.isascii():
+            return text.translate(self.ascii_table)
+
+        if _CONTROL_RE.search(text):
+            text = _CONTROL_RE.sub(" ", text)
+
+        for char, replacement in self.special_chars:
+            if char in text:
+                text = text.replace(char, replacement)
+        for char in self.deletions:
+            if char in text:
+                text = text.replace(char, deleted)
+        if self.profile.strip_symbols:
+            text = _SYMBOL_RE.sub(" ", text)
+        return text
+
+    def normalize(self, text: str) -> str:
+        """Applies the character rules, then collapses whitespace with ``split`` and ``join``"""
+        normalized = " ".join(self._replace_chars(text, "").split())
+        return normalized.lower() if self.profile.lowercase else normalized
+
+    def normalize_with_offsets(self, text: str) -> Tuple[str, OffsetMap]:
+        """Normalizes text and returns a map from normalized to original positions"""
+        if self.profile.lowercase:
+            raise ValueError(f"Profile {self.profile.name} lowercases text and does not support offset maps")
+
+        text = _OTHER_SPACE_RE.sub(" ", self._replace_chars(text, _DELETED))
+        text_length = len(text)
+        pieces = []
+        normalized_starts = []
+        original_starts = []
+        lengths = []
+        position = 0
+
+        def copy(start: int, end: int):
+            nonlocal position
+            pieces.append(text[start:end])
+            normalized_starts.append(position)
+            original_starts.append(start)
+            lengths.append(end - start)
+            position += end - start
+
+        previous_end = 0
+        for match in _GAP_RE.finditer(text):
+            start, end = match.span()
+            if start > previous_end:
+                copy(previous_end, start)
+            if position > 0 and end < text_length and " " in match.group():
+                pieces.append(" ")
+                normalized_starts.append(position)
+                original_starts.append(start)
+                lengths.append(1)
+                position += 1
+            previous_end = end
+
+        if previous_end < text_length:
+            copy(previous_end, text_length)
+
+        return "".join(pieces), OffsetMap(normalized_starts, original_starts, lengths)
+
+
+@lru_cache(maxsize=None)
+def get_normalizer(profile: str = "summarization") -> TextNormalizer:
+    """Shared normalizer per profile; building a table is only done once"""
+    return TextNormalizer(profile)
@@ -0,0 +1,117 @@
+"""
+Reads plain-text files of any size as a stream of segments.
+
+The file is memory-mapped and decoded incrementally, so only one segment
+and one block of bytes are in memory at a time. The encoding is detected
+from a sample at the start of the file. Segments end on a line break
+where possible, otherwise on whitespace, so words never straddle two
+segments.
+"""
+import codecs
+import mmap
+import os
+from typing import Iterator, Optional, Tuple
+
+SAMPLE_BYTES = 64 * 1024
+BLOCK_BYTES = 1024 * 1024
+SEGMENT_CHARS = 1024 * 1024
+
+# Longer byte order marks first: the UTF-32 LE mark starts with the UTF-16 LE one.
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Encoding of a text file from a sample of its first bytes: a byte order
+    mark, UTF-16 without one, valid UTF-8, then ``charset_normalizer`` when
+    installed, and finally cp1252 or latin-1, which decode any bytes.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    # ASCII-range UTF-16 text has a zero byte in every other position.
+    if len(sample) >= 4 and sample.count(0) >= len(sample) // 4:
+        if sample[1::2].count(0) > len(sample) // 4:
+            return "utf-16-le"
+        if sample[0::2].count(0) > len(sample) // 4:
+            return "utf-16-be"
+
+    try:
+        # Not final: the sample may end inside a multi-byte character.
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        from_bytes = None
+    if from_bytes is not None:
+        matches = from_bytes(sample)
+        best = matches.best()
+        if best is not None:
+            # Several code pages often decode a sample equally cleanly; prefer the most common one then.
+            if any(match.encoding == "cp1252" and match.chaos <= best.chaos for match in matches):
+                return "cp1252"
+            return best.encoding
+
+    try:
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def _segment_end(text: str, limit: int) -> int:
+    """Where to cut ``text`` to at most ``limit`` characters: after a line break, else after whitespace"""
+    cut = text.rfind("\n", 0, limit) + 1
+    if cut:
+        return cut
+    for position in range(limit - 1, 0, -1):
+        if text[position].isspace():
+            return position + 1
+    return limit
+
+
+def iter_text_progress(file_path: str, encoding: Optional[str] = None, segment_chars: int = SEGMENT_CHARS,
+                       block_bytes: int = BLOCK_BYTES, errors: str = "replace") -> Iterator[Tuple[str, float]]:
+    """Yields segments of at most ``segment_chars`` characters with the share of the file decoded so far"""
+    if os.path.getsize(file_path) == 0:
+        return
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        encoding = encoding or detect_encoding(data[:SAMPLE_BYTES])
+        decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+        pending = ""
+        for start in range(0, len(data), block_bytes):
+            pending += decoder.decode(data[start:start + block_bytes])
+            read = min(1.0, (start + block_bytes) / len(data))
+            while len(pending) >= segment_chars:
+                cut = _segment_end(pending, segment_chars)
+                yield pending[:cut], read
+                pending = pending[cut:]
+        pending += decoder.decode(b"", final=True)
+        while pending:
+            cut = _segment_end(pending, segment_chars) if len(pending) > segment_chars else len(pending)
+            yield pending[:cut], 1.0
+            pending = pending[cut:]
+
+
+def iter_text_segments(file_path: str, encoding: Optional[str] = None, segment_chars: int = SEGMENT_CHARS,
+                       block_bytes: int = BLOCK_BYTES, errors: str = "replace") -> Iterator[str]:
+    """Yields the decoded text of a file in segments of at most ``segment_chars`` characters"""
+    for segment, _ in iter_text_progress(file_path, encoding, segment_chars, block_bytes, errors):
+        yield segment
+
+
+def read_text(file_path: str, encoding: Optional[str] = None) -> str:
+    """The whole text of a file, decoded like ``iter_text_segments``"""
+    return "".join(iter_text_segments(file_path, encoding=encoding))
@@ -0,0 +1,391 @@
+"""
+Passage embeddings in an int8 index on disk, memory-mapped for search.
+
+Each vector is stored as int8 with one float32 scale (symmetric
+per-vector quantization), a quarter of its float32 size: a million
+384-dimensional passages take about 390MB, which stays in the page cache
+and is shared by every worker that maps it. Scores are dot products of
+the dequantized vectors with the query, the cosine similarity for
+normalized embeddings, within about a percent of the float32 score.
+
+With ``nlist`` above zero the vectors are grouped by the nearest of
+``nlist`` k-means centroids (IVF) and stored contiguously per group, so a
+query only scans the ``nprobe`` groups whose centroids are closest to it.
+
+New passages are held in memory and scanned exhaustively until ``flush``
+writes them out, each to the group of its nearest centroid. The centroids
+are only retrained when the largest group grows past
+``max_list_imbalance`` times the average. Passage texts and document ids
+are stored in insertion order; the vectors carry the passage id they
+belong to.
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_BLOCK_ROWS = 16384
+
+
+def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """int8 vectors and the float32 scale of each row"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.round(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means: ``nlist`` unit-length centroids of normalized vectors"""
+    rng = np.random.RandomState(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = nearest_centroids(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=nlist)
+        # Groups that lost every vector restart from a random one.
+        empty = counts == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.concatenate([
+        np.argmax(vectors[start:start + _BLOCK_ROWS].astype(np.float32) @ centroids.T, axis=1)
+        for start in range(0, len(vectors), _BLOCK_ROWS)
+    ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+
+def _top(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k)[:k]
+        ids, scores = ids[keep], scores[keep]
+    return ids, scores
+
+
+class QuantizedVectorIndex:
+    """
+    Passages of many documents with int8 embeddings, searchable by a query
+    embedding. ``path`` is a directory; without one the index lives only in
+    memory.
+    """
+
+    def __init__(self, dim: int, path: Optional[str] = None, nlist: int = 0, nprobe: int = 8,
+                 min_vectors_per_list: int = 39, max_list_imbalance: float = 4.0):
+        self.dim = dim
+        self.path = path
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_vectors_per_list = min_vectors_per_list
+        self.max_list_imbalance = max_list_imbalance
+        self.documents: List[Dict] = []
+        self.positions: Dict[str, int] = {}
+        self._flushed_documents = 0
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._clear_pending()
+        self._open()
+
+    def _clear_pending(self):
+        self._pending_vectors: List[np.ndarray] = []
+        self._pending_scales: List[np.ndarray] = []
+        self._pending_docs: List[int] = []
+        self._pending_texts: List[str] = []
+
+    def _file(self, name: str, generation: Optional[int] = None) -> str:
+        if generation is not None:
+            name = f"{name}.{generation}.npy"
+        return os.path.join(self.path, name)
+
+    def _open(self):
+        """Maps the flushed part of the index, or starts empty"""
+        self.generation = 0
+        self._set_arrays(self._map(None))
+        if not self.path or not os.path.exists(self._file("index.json")):
+            return
+
+        with open(self._file("index.json")) as f:
+            metadata = json.load(f)
+        if metadata["dim"] != self.dim:
+            raise ValueError(f"Index at {self.path} has dimension {metadata['dim']}, not {self.dim}")
+        self.documents = metadata["documents"]
+        self.positions = {document["key"]: i for i, document in enumerate(self.documents)}
+        self._flushed_documents = len(self.documents)
+        self.generation = metadata["generation"]
+        self._set_arrays(self._map(metadata))
+
+    def _map(self, metadata: Optional[Dict]) -> Dict[str, np.ndarray]:
+        """The arrays of the generation ``metadata`` describes, memory-mapped; empty ones without it"""
+        arrays = {
+            "vectors": np.zeros((0, self.dim), dtype=np.int8),
+            "scales": np.zeros(0, dtype=np.float32),
+            "ids": np.zeros(0, dtype=np.int64),
+            "passage_docs": np.zeros(0, dtype=np.int32),
+            "passage_offsets": np.zeros(1, dtype=np.int64),
+            "passage_bytes": np.zeros(0, dtype=np.uint8),
+            "centroids": None,
+            "list_offsets": None,
+        }
+        if not metadata or not metadata["passages"]:
+            return arrays
+        for name in ("vectors", "scales", "ids", "passage_docs", "passage_offsets"):
+            arrays[name] = np.load(self._file(name, metadata["generation"]), mmap_mode="r")
+        if arrays["passage_offsets"][-1]:
+            # An empty file cannot be mapped, and there is nothing to read from it.
+            arrays["passage_bytes"] = np.memmap(self._file("passages.bin"), dtype=np.uint8, mode="r",
+                                                shape=(int(arrays["passage_offsets"][-1]),))
+        if metadata["grouped"]:
+            arrays["centroids"] = np.load(self._file("centroids", metadata["generation"]))
+            arrays["list_offsets"] = np.load(self._file("list_offsets", metadata["generation"]))
+        return arrays
+
+    def _set_arrays(self, arrays: Dict[str, np.ndarray]):
+        self._vectors, self._scales, self._ids = arrays["vectors"], arrays["scales"], arrays["ids"]
+        self._passage_docs, self._passage_offsets = arrays["passage_docs"], arrays["passage_offsets"]
+        self._passage_bytes = arrays["passage_bytes"]
+        self._centroids, self._list_offsets = arrays["centroids"], arrays["list_offsets"]
+
+    def __len__(self) -> int:
+        """Number of passages"""
+        return len(self._vectors) + len(self._pending_texts)
+
+    @property
+    def unflushed_documents(self) -> int:
+        """Documents added since the last flush"""
+        return len(self.documents) - self._flushed_documents
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.positions
+
+    def add(self, key: str, passages: List[str], embeddings: np.ndarray, payload: Optional[dict] = None) -> bool:
+        """Adds a document's passages; returns False when the document is already indexed"""
+        if len(passages) != len(embeddings):
+            raise ValueError(f"Got {len(passages)} passages but {len(embeddings)} embeddings")
+        if len(embeddings) and np.shape(embeddings)[1] != self.dim:
+            raise ValueError(f"Embeddings have dimension {np.shape(embeddings)[1]}, the index {self.dim}")
+        vectors, scales = quantize(np.reshape(embeddings, (-1, self.dim)))
+        with self._lock:
+            if key in self.positions:
+                return False
+            position = len(self.documents)
+            self.documents.append(dict(payload or {}, key=key, num_passages=len(passages)))
+            self.positions[key] = position
+            self._pending_vectors.append(vectors)
+            self._pending_scales.append(scales)
+            self._pending_docs.extend([position] * len(passages))
+            self._pending_texts.extend(passages)
+            return True
+
+    def _scan(self, vectors: np.ndarray, scales: np.ndarray, ids: np.ndarray, query: np.ndarray,
+              k: int) -> Tuple[np.ndarray, np.ndarray]:
+        best_ids, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        for start in range(0, len(vectors), _BLOCK_ROWS):
+            block = slice(start, start + _BLOCK_ROWS)
+            scores = (vectors[block].astype(np.float32) @ query) * scales[block]
+            best_ids, best_scores = _top(np.concatenate([best_ids, ids[block]]),
+                                         np.concatenate([best_scores, scores]), k)
+        return best_ids, best_scores
+
+    def search(self, query: np.ndarray, top_k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Ids and scores of the ``top_k`` passages closest to ``query``, best first"""
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            # Flushing replaces these arrays rather than changing them, so the scan below needs no lock.
+            vectors, scales, ids = self._vectors, self._scales, self._ids
+            centroids, list_offsets = self._centroids, self._list_offsets
+            pending = (list(self._pending_vectors), list(self._pending_scales))
+            flushed = len(vectors)
+
+        if centroids is not None:
+            probes = np.argsort(-(centroids @ query))[:nprobe or self.nprobe]
+            ranges = [(list_offsets[i], list_offsets[i + 1]) for i in probes]
+        else:
+            ranges = [(0, flushed)]
+        found = [self._scan(vectors[start:stop], scales[start:stop], ids[start:stop], query, top_k)
+                 for start, stop in ranges]
+        if pending[0]:
+            pending_vectors = np.concatenate(pending[0])
+            pending_ids = np.arange(flushed, flushed + len(pending_vectors), dtype=np.int64)
+            found.append(self._scan(pending_vectors, np.concatenate(pending[1]), pending_ids, query, top_k))
+
+        ids = np.concatenate([ids for ids, _ in found])
+        scores = np.concatenate([scores for _, scores in found])
+        ids, scores = _top(ids, scores, top_k)
+        order = np.argsort(-scores)
+        return [(int(ids[i]), round(float(scores[i]), 4)) for i in order]
+
+    def passage(self, passage_id: int) -> Tuple[Dict, str]:
+        """The document a passage belongs to, and its text; passage ids never change"""
+        with self._lock:
+            flushed = len(self._passage_docs)
+            if passage_id >= flushed:
+                index = passage_id - flushed
+                return self.documents[self._pending_docs[index]], self._pending_texts[index]
+            start, stop = int(self._passage_offsets[passage_id]), int(self._passage_offsets[passage_id + 1])
+            text = bytes(self._passage_bytes[start:stop]).decode("utf-8")
+            return self.documents[int(self._passage_docs[passage_id])], text
+
+    def search_documents(self, query: np.ndarray, top_k: int = 5, passages_per_document: int = 3,
+                         nprobe: Optional[int] = None) -> List[Dict]:
+        """
+        The ``top_k`` documents with the best matching passages, each with up
+        to ``passages_per_document`` of them; a document scores as its best passage.
+        """
+        hits = self.search(query, top_k=max(100, top_k * passages_per_document * 4), nprobe=nprobe)
+        results: Dict[str, Dict] = {}
+        for passage_id, score in hits:
+            document, text = self.passage(passage_id)
+            result = results.get(document["key"])
+            if result is None:
+                if len(results) == top_k:
+                    continue
+                result = results[document["key"]] = {**document, "score": score, "passages": []}
+            if len(result["passages"]) < passages_per_document:
+                result["passages"].append({"id": passage_id, "text": text, "score": score})
+        return list(results.values())
+
+    def flush(self):
+        """
+        Writes pending passages to disk and maps the new files. Arrays go to
+        files of a new generation and ``index.json`` switches to it last, so a
+        crash leaves the previous generation intact. The files are written
+        without holding the lock, so searches and additions carry on; passages
+        added meanwhile stay pending for the next flush. Concurrent calls run
+        one after the other, and one with nothing left to write returns.
+        """
+        if not self.path:
+            return
+        with self._flush_lock:
+            with self._lock:
+                if not self.unflushed_documents:
+                    return
+                current = {"vectors": self._vectors, "scales": self._scales, "ids": self._ids,
+                           "passage_docs": self._passage_docs, "passage_offsets": self._passage_offsets,
+                           "centroids": self._centroids, "list_offsets": self._list_offsets}
+                pending_vectors, pending_scales = list(self._pending_vectors), list(self._pending_scales)
+                pending_docs, pending_texts = list(self._pending_docs), list(self._pending_texts)
+                documents = list(self.documents)
+                previous = self.generation
+
+            os.makedirs(self.path, exist_ok=True)
+            generation, grouped = previous, current["centroids"] is not None
+            if pending_texts:
+                generation = previous + 1
+                grouped = self._write_arrays(generation, current, np.concatenate(pending_vectors),
+                                             np.concatenate(pending_scales), pending_docs, pending_texts)
+
+            metadata = {"dim": self.dim, "generation": generation, "grouped": grouped,
+                        "passages": len(current["vectors"]) + len(pending_texts), "documents": documents}
+            with open(self._file("index.tmp.json"), "w") as f:
+                json.dump(metadata, f)
+            os.replace(self._file("index.tmp.json"), self._file("index.json"))
+            arrays = self._map(metadata)
+
+            with self._lock:
+                self._set_arrays(arrays)
+                self.generation = generation
+                self._flushed_documents = len(documents)
+                del self._pending_vectors[:len(pending_vectors)], self._pending_scales[:len(pending_scales)]
+                del self._pending_docs[:len(pending_docs)], self._pending_texts[:len(pending_texts)]
+            if generation != previous:
+                # Searches still scanning the old arrays keep their mappings after the unlink.
+                for name in os.listdir(self.path):
+                    if name.endswith(f".{previous}.npy"):
+                        os.unlink(self._file(name))
+
+    def _write_arrays(self, generation: int, current: Dict[str, np.ndarray], vectors: np.ndarray,
+                      scales: np.ndarray, docs: List[int], texts: List[str]) -> bool:
+        """
+        Writes the arrays of ``generation``: the ``current`` ones with the new
+        passages added. Returns whether the vectors are grouped by centroid.
+        """
+        encoded = [text.encode("utf-8") for text in texts]
+        old_offsets = current["passage_offsets"]
+        # Text is only appended; the offsets of a generation decide which bytes belong to it.
+        with open(self._file("passages.bin"), "ab") as f:
+            f.truncate(int(old_offsets[-1]))
+            f.write(b"".join(encoded))
+        lengths = np.array([len(text) for text in encoded], dtype=np.int64)
+        np.save(self._file("passage_offsets", generation),
+                np.concatenate([old_offsets, old_offsets[-1] + np.cumsum(lengths)]))
+        np.save(self._file("passage_docs", generation),
+                np.concatenate([current["passage_docs"], np.array(docs, dtype=np.int32)]))
+
+        old_vectors, old_scales, old_ids = current["vectors"], current["scales"], current["ids"]
+        ids = np.arange(len(old_vectors), len(old_vectors) + len(vectors), dtype=np.int64)
+        total = len(old_vectors) + len(vectors)
+        if not self.nlist or total < self.nlist * self.min_vectors_per_list:
+            # Flat: the new vectors go after the old ones.
+            self._save_rows(generation, [(old_vectors, old_scales, old_ids), (vectors, scales, ids)])
+            return False
+
+        centroids, list_offsets = current["centroids"], current["list_offsets"]
+        if centroids is not None and len(centroids) == self.nlist:
+            assignment = nearest_centroids(vectors, centroids)
+            sizes = np.diff(list_offsets) + np.bincount(assignment, minlength=self.nlist)
+            if sizes.max() <= self.max_list_imbalance * sizes.mean():
+                # Each new vector joins the list of its nearest centroid, after the vectors already there.
+                order = np.argsort(assignment, kind="stable")
+                new_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=self.nlist))])
+                vectors, scales, ids = vectors[order], scales[order], ids[order]
+                parts = []
+                for i in range(self.nlist):
+                    old, new = slice(list_offsets[i], list_offsets[i + 1]), slice(new_offsets[i], new_offsets[i + 1])
+                    parts += [(old_vectors[old], old_scales[old], old_ids[old]), (vectors[new], scales[new], ids[new])]
+                self._save_rows(generation, parts)
+                np.save(self._file("centroids", generation), centroids)
+                np.save(self._file("list_offsets", generation), list_offsets + new_offsets)
+                return True
+
+        # First grouping, a new ``nlist`` or unbalanced lists: train the centroids and regroup everything.
+        vectors = np.concatenate([old_vectors, vectors])
+        scales = np.concatenate([old_scales, scales])
+        ids = np.concatenate([old_ids, ids])
+        rng = np.random.RandomState(0)
+        # Scales only change lengths, and centroids are trained on directions.
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), self.nlist * 256), replace=False)]
+        sample = sample.astype(np.float32)
+        sample /= np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+        centroids = train_centroids(sample, self.nlist)
+        assignment = nearest_centroids(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        self._save_rows(generation, [(vectors[order], scales[order], ids[order])])
+        np.save(self._file("centroids", generation), centroids)
+        np.save(self._file("list_offsets", generation),
+                np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=self.nlist))]))
+        return True
+
+    def _save_rows(self, generation: int, parts: List[Tuple[np.ndarray, np.ndarray, np.ndarray]]):
+        """Writes the vectors, scales and ids of ``parts`` one after another, without gathering them in memory"""
+        total = sum(len(part[0]) for part in parts)
+        outputs = [
+            np.lib.format.open_memmap(self._file("vectors", generation), mode="w+", dtype=np.int8,
+                                      shape=(total, self.dim)),
+            np.lib.format.open_memmap(self._file("scales", generation), mode="w+", dtype=np.float32, shape=(total,)),
+            np.lib.format.open_memmap(self._file("ids", generation), mode="w+", dtype=np.int64, shape=(total,)),
+        ]
+        position = 0
+        for part in parts:
+            for output, rows in zip(outputs, part):
+                output[position:position + len(rows)] = rows
+            position += len(part[0])
+        for output in outputs:
+            output.flush()
+        del outputs
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "documents": len(self.documents),
+                "passages": len(self),
+                "unflushed_documents": self.unflushed_documents,
+                "unflushed_passages": len(self._pending_texts),
+                "lists": len(self._centroids) if self._centroids is not None else 0,
+                "index_mb": round((self._vectors.nbytes + self._scales.nbytes) / 1024 / 1024, 1),
+            }
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from api.admission import BULK, IDLE, INTERACTIVE, AdmissionController, Overloaded, PriorityExecutor
+
+
+class TestAdmissionController(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_bulk_requests_leave_headroom_for_interactive(self):
+        async def scenario():
+            controller = AdmissionController(max_tokens_in_flight=1000, bulk_share=0.5, max_queue_size=4)
+            await controller.acquire(500, BULK)
+            await controller.acquire(400, INTERACTIVE)
+            self.assertEqual(controller.tokens_in_flight, 900)
+
+            waiting_bulk = asyncio.ensure_future(controller.acquire(100, BULK))
+            await asyncio.sleep(0)
+            self.assertFalse(waiting_bulk.done())
+
+            controller.release(500)
+            self.assertEqual(await waiting_bulk, 100)
+
+        self.run_async(scenario())
+
+    def test_queue_limit_rejects_with_retry_after(self):
+        async def scenario():
+            controller = AdmissionController(max_tokens_in_flight=100, max_queue_size=1)
+            await controller.acquire(75, BULK)
+            queued = asyncio.ensure_future(controller.acquire(50, BULK))
+            await asyncio.sleep(0)
+
+            with self.assertRaises(Overloaded) as context:
+                await controller.acquire(50, BULK)
+            self.assertGreaterEqual(context.exception.retry_after, 1)
+            self.assertEqual(controller.stats()["rejected"]["bulk"], 1)
+
+            controller.release(75)
+            await queued
+
+        self.run_async(scenario())
+
+    def test_interactive_waiters_are_woken_first(self):
+        async def scenario():
+            controller = AdmissionController(max_tokens_in_flight=100, bulk_share=1.0)
+            await controller.acquire(100, BULK)
+            order = []
+
+            async def request(priority, name):
+                async with controller.admit(100, priority):
+                    order.append(name)
+                    await asyncio.sleep(0)
+
+            bulk = asyncio.ensure_future(request(BULK, "bulk"))
+            await asyncio.sleep(0)
+            interactive = asyncio.ensure_future(request(INTERACTIVE, "interactive"))
+            await asyncio.sleep(0)
+
+            controller.release(100)
+            await asyncio.gather(bulk, interactive)
+            self.assertEqual(order, ["interactive", "bulk"])
+
+        self.run_async(scenario())
+
+    def test_wait_timeout(self):
+        async def scenario():
+            controller = AdmissionController(max_tokens_in_flight=10, max_wait_seconds=0.01)
+            await controller.acquire(10, INTERACTIVE)
+            with self.assertRaises(Overloaded):
+                await controller.acquire(10, INTERACTIVE)
+            self.assertEqual(controller.stats()["queued"]["interactive"], 0)
+
+        self.run_async(scenario())
+
+    def test_cancelled_waiters_hold_no_tokens(self):
+        async def scenario():
+            controller = AdmissionController(max_tokens_in_flight=100, idle_share=0.5)
+            await controller.acquire(50, BULK)
+
+            # Cancelled while queued.
+            queued = asyncio.ensure_future(controller.acquire(40, IDLE))
+            await asyncio.sleep(0)
+            queued.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await queued
+            self.assertEqual(controller.stats()["queued"]["idle"], 0)
+
+            # Cancelled after the grant, before it could resume: depending on the
+            # Python version the caller either keeps the grant or gives it back.
+            granted = asyncio.ensure_future(controller.acquire(40, IDLE))
+            await asyncio.sleep(0)
+            controller.release(50)
+            granted.cancel()
+            try:
+                kept = await granted
+            except asyncio.CancelledError:
+                kept = 0
+            self.assertEqual(controller.tokens_in_flight, kept)
+
+        self.run_async(scenario())
+
+    def test_held_futures_keep_the_grant(self):
+        async def scenario():
+            controller = AdmissionController(max_tokens_in_flight=100)
+            straggler = asyncio.get_running_loop().create_future()
+            async with controller.admit(60, BULK) as grant:
+                self.assertEqual(grant.tokens, 60)
+                grant.hold([straggler])
+            await asyncio.sleep(0)
+            self.assertEqual(controller.tokens_in_flight, 60)
+            self.assertTrue(controller.busy())
+
+            straggler.cancel()
+            await asyncio.sleep(0.01)
+            self.assertEqual(controller.tokens_in_flight, 0)
+            self.assertFalse(controller.busy())
+
+        self.run_async(scenario())
+
+
+class TestPriorityExecutor(unittest.TestCase):
+    def test_runs_higher_priority_work_first(self):
+        executor = PriorityExecutor(max_workers=1)
+        gate = threading.Event()
+        order = []
+
+        blocker = executor.submit(gate.wait)
+        time.sleep(0.05)
+        futures = [executor.submit(order.append, "bulk", priority=BULK) for _ in range(3)]
+        futures.append(executor.submit(order.append, "interactive", priority=INTERACTIVE))
+        gate.set()
+
+        for future in [blocker] + futures:
+            future.result(timeout=5)
+        executor.shutdown()
+        self.assertEqual(order, ["interactive", "bulk", "bulk", "bulk"])
+
+    def test_exceptions_are_propagated(self):
+        executor = PriorityExecutor(max_workers=2)
+
+        async def scenario():
+            with self.assertRaises(ZeroDivisionError):
+                await executor.run(lambda: 1 / 0)
+            self.assertEqual(await executor.run(sum, [1, 2]), 3)
+
+        asyncio.run(scenario())
+        executor.shutdown()
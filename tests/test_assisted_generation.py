@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+import torch
+
+from src.models.device import ExecutionDevice
+from src.models.generation_profiles import GenerationProfile
+from src.models.summarizer import DocumentSummarizer
+from src.training.model_benchmark import ModelBenchmark
+from tests.tiny_models import save_tiny_seq2seq
+
+TEXTS = [
+    "The consultant shall invoice the client monthly.",
+    "The battery storage system test results are in the report. " * 3,
+]
+GREEDY = {"num_beams": 1, "do_sample": False, "max_length": 24, "min_length": 8}
+
+
+class TestAssistedGeneration(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        model = save_tiny_seq2seq(os.path.join(cls.temp_dir.name, "model"), decoder_layers=4)
+        draft = save_tiny_seq2seq(os.path.join(cls.temp_dir.name, "draft"), decoder_layers=1, seed=1)
+        profiles = {
+            "greedy": GenerationProfile("greedy", GREEDY),
+            "assisted": GenerationProfile("assisted", GREEDY, assistant_model_name=draft),
+            "assisted_fixed": GenerationProfile("assisted_fixed", GREEDY, assistant_model_name=draft,
+                                                num_assistant_tokens=3),
+        }
+        cls.summarizer = DocumentSummarizer(model, profiles=profiles,
+                                            execution=ExecutionDevice(torch.device("cpu")))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def test_greedy_output_is_unchanged(self):
+        inputs = self.summarizer.collate(self.summarizer.encode(TEXTS))
+        expected = self.summarizer.generate_ids(inputs, profile="greedy")
+
+        for profile in ("assisted", "assisted_fixed"):
+            summary_ids = self.summarizer.generate_ids(inputs, profile=profile)
+            self.assertEqual(self.summarizer.decode(summary_ids), self.summarizer.decode(expected))
+
+    def test_beam_search_is_rejected(self):
+        with self.assertRaises(ValueError):
+            GenerationProfile("beams", {"num_beams": 4}, assistant_model_name="draft")
+
+    def test_benchmark_reports_acceptance(self):
+        with tempfile.TemporaryDirectory() as save_dir:
+            results = ModelBenchmark(save_dir=save_dir).benchmark_assisted_generation(
+                self.summarizer, TEXTS, profiles=("assisted",), num_runs=1)
+
+        assisted = results["assisted_results"]["assisted"]
+        self.assertTrue(assisted["identical_output"])
+        self.assertGreater(assisted["assisted"]["tokens_per_second"], 0)
+        self.assertGreaterEqual(assisted["assisted"]["acceptance_rate"], 0.0)
+        self.assertLessEqual(assisted["assisted"]["acceptance_rate"], 1.0)
+        self.assertIn("greedy", self.summarizer.profiles)
+        self.assertNotIn("assisted_unassisted", self.summarizer.profiles)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import torch
+
+from src.models.backends import get_backend
+from src.models.export import export_model
+from src.models.qa_model import QuestionAnswerer
+from src.models.summarizer import DocumentSummarizer
+from tests.tiny_models import save_tiny_qa, save_tiny_seq2seq
+
+HAS_ONNX = importlib.util.find_spec("optimum") is not None and importlib.util.find_spec("onnxruntime") is not None
+
+
+class TestInferenceBackends(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.qa_path = save_tiny_qa(os.path.join(cls.temp_dir.name, "qa"))
+        cls.seq2seq_path = save_tiny_seq2seq(os.path.join(cls.temp_dir.name, "seq2seq"))
+        cls.device = torch.device("cpu")
+        torch.manual_seed(0)
+        cls.input_ids = torch.randint(4, 40, (2, 23))
+        cls.attention_mask = torch.ones_like(cls.input_ids)
+        cls.attention_mask[1, 15:] = 0
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def assert_qa_parity(self, backend, model_name=None):
+        eager = get_backend("eager").load_model("qa", self.qa_path, self.device)
+        other = get_backend(backend).load_model("qa", model_name or self.qa_path, self.device)
+
+        with torch.no_grad():
+            expected = eager(input_ids=self.input_ids, attention_mask=self.attention_mask)
+            actual = other(input_ids=self.input_ids, attention_mask=self.attention_mask)
+
+        torch.testing.assert_close(actual.start_logits, expected.start_logits, atol=1e-4, rtol=1e-4)
+        torch.testing.assert_close(actual.end_logits, expected.end_logits, atol=1e-4, rtol=1e-4)
+
+    def assert_generate_parity(self, backend, model_name=None):
+        eager = get_backend("eager").load_model("seq2seq", self.seq2seq_path, self.device)
+        other = get_backend(backend).load_model("seq2seq", model_name or self.seq2seq_path, self.device)
+        kwargs = {"max_length": 12, "num_beams": 1, "do_sample": False}
+
+        with torch.no_grad():
+            expected = eager.generate(input_ids=self.input_ids, attention_mask=self.attention_mask, **kwargs)
+            actual = other.generate(input_ids=self.input_ids, attention_mask=self.attention_mask, **kwargs)
+
+        self.assertEqual(actual.tolist(), expected.tolist())
+
+    def test_torchscript_qa_parity(self):
+        self.assert_qa_parity("torchscript")
+
+    def test_torchscript_encoder_generate_parity(self):
+        self.assert_generate_parity("torchscript")
+
+    def test_torchscript_export_round_trip(self):
+        output_dir = os.path.join(self.temp_dir.name, "qa-ts")
+        export_model("qa", self.qa_path, "torchscript", output_dir)
+        self.assert_qa_parity("torchscript", output_dir)
+
+        answerer = QuestionAnswerer(output_dir, backend="torchscript")
+        self.assertIsInstance(answerer.answer_question("what rate", "the rate is 150 per hour"), str)
+
+    @unittest.skipUnless(HAS_ONNX, "optimum[onnxruntime] is not installed")
+    def test_onnx_qa_parity(self):
+        output_dir = os.path.join(self.temp_dir.name, "qa-onnx")
+        export_model("qa", self.qa_path, "onnx", output_dir)
+        self.assert_qa_parity("onnx", output_dir)
+
+    @unittest.skipUnless(HAS_ONNX, "optimum[onnxruntime] is not installed")
+    def test_onnx_seq2seq_parity(self):
+        output_dir = os.path.join(self.temp_dir.name, "seq2seq-onnx")
+        export_model("seq2seq", self.seq2seq_path, "onnx", output_dir)
+        self.assert_generate_parity("onnx", output_dir)
+
+        summarizer = DocumentSummarizer(output_dir, backend="onnx")
+        self.assertIsInstance(summarizer.summarize("the report of the contract", profile="fast"), str)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_backend("tensorrt")
@@ -0,0 +1,66 @@
+import unittest
+
+from src.models.batching import ChunkRequest, LengthBucketer, generation_key, padding_stats
+
+
+class TestLengthBucketer(unittest.TestCase):
+    def setUp(self):
+        self.bucketer = LengthBucketer(max_batch_size=4, max_batch_tokens=4096, batch_overhead_tokens=64)
+
+    def make_requests(self, lengths, key=()):
+        return [ChunkRequest(index=i, text=f"chunk {i}", num_tokens=n, generation_key=key)
+                for i, n in enumerate(lengths)]
+
+    def test_every_chunk_is_planned_once(self):
+        requests = self.make_requests([50, 1000, 980, 60, 1010, 40, 700])
+        batches = self.bucketer.plan(requests)
+
+        indices = sorted(r.index for batch in batches for r in batch.requests)
+        self.assertEqual(indices, list(range(len(requests))))
+        self.assertTrue(all(len(batch.requests) <= 4 for batch in batches))
+
+    def test_short_tail_chunks_are_not_padded_to_long_ones(self):
+        requests = self.make_requests([1000, 1000, 1000, 50, 50])
+        batches = self.bucketer.plan(requests)
+
+        for batch in batches:
+            lengths = {r.num_tokens for r in batch.requests}
+            self.assertFalse(50 in lengths and 1000 in lengths)
+        self.assertEqual(padding_stats(batches)["padding_efficiency"], 1.0)
+
+    def test_generation_parameters_never_share_a_batch(self):
+        short = generation_key(max_length=60, min_length=10)
+        long = generation_key(max_length=130, min_length=30)
+        requests = self.make_requests([100, 100], short) + self.make_requests([100, 100], long)
+        batches = self.bucketer.plan(requests)
+
+        self.assertEqual(len(batches), 2)
+        for batch in batches:
+            self.assertTrue(all(r.generation_key == batch.generation_key for r in batch.requests))
+        self.assertIn(batch.generation_kwargs["max_length"], (60, 130))
+
+    def test_batch_token_limit(self):
+        bucketer = LengthBucketer(max_batch_size=8, max_batch_tokens=2000, batch_overhead_tokens=10000)
+        batches = bucketer.plan(self.make_requests([1000] * 4))
+
+        self.assertTrue(all(batch.padded_tokens <= 2000 for batch in batches))
+
+    def test_padding_stats(self):
+        batches = self.bucketer.plan(self.make_requests([90, 100]))
+        stats = padding_stats(batches)
+
+        self.assertEqual(stats["chunks"], 2)
+        self.assertEqual(stats["real_tokens"], 190)
+        self.assertLessEqual(stats["padding_efficiency"], 1.0)
+
+    def test_batches_are_costed_at_the_padded_length(self):
+        bucketer = LengthBucketer(max_batch_size=4, max_batch_tokens=4096, batch_overhead_tokens=16,
+                                  pad_to_multiple_of=64, max_length=120)
+        batches = bucketer.plan(self.make_requests([66, 100, 110, 115]))
+
+        # All four round up to the same length, so splitting them saves no padding.
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0].padded_length, 120)
+        stats = padding_stats(batches)
+        self.assertEqual(stats["padded_tokens"], 480)
+        self.assertEqual(stats["padding_efficiency"], round(391 / 480, 3))
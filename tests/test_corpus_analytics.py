@@ -0,0 +1,104 @@
+import unittest
+from collections import Counter
+
+from src.utils.corpus_analytics import (
+    CorpusAggregate, CorpusAnalytics, DocumentStats, Histogram, READABILITY_EDGES
+)
+
+
+def make_stats(doc_id, words, readability=8.0, sentences=2):
+    return DocumentStats(
+        doc_id=doc_id,
+        language="english",
+        term_counts=Counter(words),
+        word_count=len(words),
+        sentence_count=sentences,
+        readability=readability
+    )
+
+
+class TestHistogram(unittest.TestCase):
+    def test_merge_matches_adding_everything_to_one(self):
+        values = [1.0, 3.5, 7.2, 7.9, 12.0, 25.0, -1.0]
+        whole = Histogram(READABILITY_EDGES)
+        left, right = Histogram(READABILITY_EDGES), Histogram(READABILITY_EDGES)
+        for i, value in enumerate(values):
+            whole.add(value)
+            (left if i % 2 else right).add(value)
+        left.merge(right)
+
+        self.assertEqual(left.to_dict(), whole.to_dict())
+        self.assertEqual(sum(whole.counts), len(values))
+
+    def test_rejects_different_bins(self):
+        with self.assertRaises(ValueError):
+            Histogram((0, 1)).merge(Histogram((0, 2)))
+
+
+class TestCorpusAggregate(unittest.TestCase):
+    def test_merge_is_exact(self):
+        documents = [
+            make_stats("a", ["contract", "payment", "payment"]),
+            make_stats("b", ["battery", "energy", "payment"], readability=12.0),
+            make_stats("c", ["energy", "energy", "storage"], readability=4.0),
+        ]
+        whole = CorpusAggregate()
+        for stats in documents:
+            whole.add(stats)
+
+        first, second = CorpusAggregate(), CorpusAggregate()
+        first.add(documents[0])
+        second.add(documents[1])
+        second.add(documents[2])
+        first.merge(second)
+
+        self.assertEqual(first.term_counts, whole.term_counts)
+        self.assertEqual(first.document_frequency, whole.document_frequency)
+        self.assertEqual(first.document_frequency["payment"], 2)
+        self.assertEqual(first.num_documents, 3)
+        self.assertEqual(first.readability.to_dict(), whole.readability.to_dict())
+
+
+class TestCorpusAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.corpus = CorpusAnalytics()
+        self.corpus.add_stats([
+            make_stats("contract", ["payment", "consultant", "payment", "services"]),
+            make_stats("news", ["energy", "battery", "services", "energy"]),
+        ])
+
+    def test_top_keywords(self):
+        keywords = dict(self.corpus.top_keywords(3))
+        self.assertEqual(keywords["payment"], 2)
+        self.assertEqual(keywords["energy"], 2)
+
+    def test_distinctive_terms_prefer_document_specific_words(self):
+        terms = [term for term, _ in self.corpus.distinctive_terms("contract", top_n=2)]
+        self.assertEqual(terms[0], "payment")
+        self.assertNotIn("services", terms)
+
+        with self.assertRaises(ValueError):
+            self.corpus.distinctive_terms("missing")
+
+    def test_adding_is_incremental_and_idempotent(self):
+        self.corpus.add_stats([make_stats("news", ["energy"]), make_stats("paper", ["transformer", "services"])])
+        summary = self.corpus.summary()
+
+        self.assertEqual(summary["documents"], 3)
+        self.assertEqual(self.corpus.aggregate.document_frequency["services"], 3)
+        self.assertEqual(summary["readability"]["count"], 3)
+
+    def test_add_documents_analyzes_only_new_documents(self):
+        corpus = CorpusAnalytics(min_parallel_documents=2)
+        texts = {
+            "a": "The consultant shall invoice the client monthly. Payment is due in thirty days.",
+            "b": "Scientists developed a new battery. The battery stores renewable energy cheaply.",
+        }
+        self.assertEqual(sorted(corpus.add_documents(texts)), ["a", "b"])
+        self.assertEqual(corpus.add_documents(texts), [])
+        self.assertEqual(corpus.aggregate.num_documents, 2)
+        self.assertEqual(corpus.top_keywords(1)[0][0], "battery")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.data.dataloader import LABEL_PAD_ID, LengthGroupedSampler, TokenDataset, build_dataloader
+from src.data.preprocessing import preprocess
+from tests.tiny_models import build_tokenizer
+
+DOCUMENTS = [
+    "The consultant shall invoice the client monthly.",
+    "Payment is due in 30 days.",
+    "The battery storage system test results are in the report.",
+    "The agreement is for services.",
+    "What is the rate? The rate is $ 150 per hour for the services of the consultant.",
+]
+
+
+class TestTokenDataset(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.tokenizer = build_tokenizer()
+        cls.tokenizer_path = os.path.join(cls.temp_dir.name, "tokenizer")
+        cls.tokenizer.save_pretrained(cls.tokenizer_path)
+
+        text_dir = os.path.join(cls.temp_dir.name, "docs")
+        os.makedirs(text_dir)
+        for i, document in enumerate(DOCUMENTS):
+            with open(os.path.join(text_dir, f"{i}.txt"), "w") as f:
+                f.write(document)
+        with open(os.path.join(text_dir, "empty.txt"), "w") as f:
+            f.write("   ")
+
+        cls.output = os.path.join(cls.temp_dir.name, "dataset")
+        cls.manifest = preprocess([text_dir], cls.output, cls.tokenizer_path, shard_size=2, workers=2, batch_size=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def test_round_trip_across_shards(self):
+        dataset = TokenDataset(self.output)
+
+        self.assertEqual(len(dataset), len(DOCUMENTS))
+        self.assertEqual(len(self.manifest["shards"]), 3)
+        self.assertEqual(self.manifest["dtype"], "uint16")
+        for i, document in enumerate(DOCUMENTS):
+            expected = self.tokenizer("summarize: " + document, truncation=True, max_length=1024)["input_ids"]
+            self.assertEqual(dataset[i]["input_ids"].tolist(), expected)
+        np.testing.assert_array_equal(dataset.lengths(), [len(dataset[i]["input_ids"]) for i in range(len(dataset))])
+
+    def test_targets_from_a_jsonl_manifest(self):
+        manifest_path = os.path.join(self.temp_dir.name, "pairs.jsonl")
+        with open(manifest_path, "w") as f:
+            f.write(json.dumps({"text": DOCUMENTS[0], "summary": "the client pays monthly"}) + "\n")
+            f.write(json.dumps({"text": DOCUMENTS[1]}) + "\n")
+        output = os.path.join(self.temp_dir.name, "pairs")
+        preprocess([manifest_path], output, self.tokenizer_path, workers=1)
+
+        loader = build_dataloader(output, batch_size=2, pad_token_id=self.tokenizer.pad_token_id, shuffle=False)
+        batch = next(iter(loader))
+        self.assertEqual(set(batch), {"input_ids", "attention_mask", "labels"})
+        # The document without a summary has only padding as labels.
+        self.assertEqual(sum(bool((row == LABEL_PAD_ID).all()) for row in batch["labels"]), 1)
+
+    def test_dataloader_with_workers_pads_batches(self):
+        loader = build_dataloader(self.output, batch_size=2, pad_token_id=self.tokenizer.pad_token_id, num_workers=2)
+
+        seen = 0
+        for batch in loader:
+            lengths = batch["attention_mask"].sum(dim=1)
+            self.assertEqual(batch["input_ids"].shape[1], int(lengths.max()))
+            seen += len(batch["input_ids"])
+        self.assertEqual(seen, len(DOCUMENTS))
+
+
+class TestLengthGroupedSampler(unittest.TestCase):
+    def test_every_index_once_with_similar_lengths_per_batch(self):
+        rng = np.random.default_rng(0)
+        lengths = rng.integers(10, 1000, size=1000)
+        sampler = LengthGroupedSampler(lengths, batch_size=8, pool_batches=25, seed=1)
+
+        batches = list(sampler)
+        self.assertEqual(sorted(i for batch in batches for i in batch), list(range(1000)))
+        self.assertEqual(len(batches), len(sampler))
+        spread = np.mean([lengths[batch].max() - lengths[batch].min() for batch in batches])
+        self.assertLess(spread, 50)
+
+    def test_epochs_reshuffle(self):
+        sampler = LengthGroupedSampler(np.arange(100), batch_size=4)
+        first = list(sampler)
+        sampler.set_epoch(1)
+        self.assertNotEqual(first, list(sampler))
+
+
+if __name__ == "__main__":
+    unittest.main()
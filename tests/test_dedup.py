@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.utils.dedup import MinHasher, NearDuplicateIndex, band_hashes, signature_similarity
+
+BODY = " ".join(
+    f"The consultant shall send invoice number {i} to the client at the end of the month, "
+    f"and the client shall pay it within thirty days of receipt." for i in range(200)
+)
+OTHER = " ".join(
+    f"Scientists measured battery sample {i} and found that the new cells store renewable energy "
+    f"at a fraction of the usual cost." for i in range(200)
+)
+
+
+class TestMinHasher(unittest.TestCase):
+    def test_signatures_are_deterministic(self):
+        first, second = MinHasher(), MinHasher()
+        np.testing.assert_array_equal(first.signature(BODY), second.signature(BODY))
+        self.assertEqual(first.signature(BODY).dtype, np.uint32)
+
+    def test_similarity_tracks_shared_content(self):
+        hasher = MinHasher()
+        original = hasher.signature("Cover page for Acme Corporation. " + BODY)
+        recovered = hasher.signature("Draft prepared for Globex on the ninth of June. " + BODY)
+        unrelated = hasher.signature(OTHER)
+
+        self.assertGreater(signature_similarity(original, recovered), 0.9)
+        self.assertLess(signature_similarity(original, unrelated), 0.1)
+
+    def test_short_and_empty_text(self):
+        hasher = MinHasher()
+        self.assertEqual(len(hasher.shingles("")), 0)
+        self.assertEqual(len(hasher.shingles("two words")), 1)
+
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = NearDuplicateIndex(threshold=0.8, merge_threshold=2)
+        self.index.add("contract", self.index.signature("Cover page for Acme Corporation. " + BODY), {"fast": "summary"})
+        self.index.add("paper", self.index.signature(OTHER))
+
+    def test_finds_near_duplicate(self):
+        match = self.index.best_match(self.index.signature("Prepared for Globex, June. " + BODY))
+        self.assertEqual(match[0], "contract")
+        self.assertGreater(match[1], 0.8)
+        self.assertIsNone(self.index.best_match(self.index.signature("An entirely different short note " * 3)))
+
+    def test_recent_and_merged_documents_are_both_found(self):
+        # merge_threshold=2 moved the first two documents into the sorted arrays.
+        self.assertEqual(self.index._sorted_ids.shape[1], 2)
+        signature = self.index.signature("A third document about quarterly revenue and staffing " * 20)
+        self.index.add("report", signature)
+        self.assertEqual(self.index.best_match(signature)[0], "report")
+
+    def test_add_many_skips_known_keys(self):
+        signatures = np.stack([self.index.signature(OTHER), self.index.signature(BODY + " appendix")])
+        self.index.add_many(["paper", "contract-copy"], signatures)
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.best_match(signatures[1])[0], "contract-copy")
+
+    def test_merges_keep_the_bands_sorted(self):
+        index = NearDuplicateIndex(merge_threshold=7)
+        rng = np.random.RandomState(0)
+        signatures = rng.randint(0, 50, size=(60, 128)).astype(np.uint32)
+        for i, signature in enumerate(signatures):
+            index.add(str(i), signature)
+        index.add_many(["copy"], signatures[:1])
+
+        hashes = band_hashes(index.signatures, index.bands).T
+        self.assertEqual(index._sorted_ids.shape, (index.bands, 61))
+        for band in range(index.bands):
+            sorted_hashes = index._sorted_hashes[band]
+            self.assertTrue(np.all(sorted_hashes[1:] >= sorted_hashes[:-1]))
+            np.testing.assert_array_equal(hashes[band, index._sorted_ids[band]], sorted_hashes)
+            self.assertEqual(sorted(index._sorted_ids[band].tolist()), list(range(61)))
+        self.assertEqual({key for key, _ in index.query(signatures[0])}, {"0", "copy"})
+
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "dedup")
+            self.index.save(path)
+            loaded = NearDuplicateIndex.load(path, threshold=0.5)
+
+        self.assertEqual(loaded.keys, self.index.keys)
+        self.assertEqual(loaded.payloads, {"contract": {"fast": "summary"}})
+        self.assertEqual(loaded.threshold, 0.5)
+        np.testing.assert_array_equal(loaded.signatures, self.index.signatures)
+        self.assertEqual(loaded.best_match(self.index.signature(BODY))[0], "contract")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+import torch
+
+from src.models.batching import ChunkRequest, LengthBucketer
+from src.models.device import (BatchSizeLimits, ExecutionDevice, MemoryProbe, padded_length, probe_batch_limits,
+                               probe_max_batch_size, select_device)
+
+
+class FakeMemoryProbe(MemoryProbe):
+    """Memory grows linearly with batch size and sequence length"""
+
+    def __init__(self, available, fixed=1000, per_token=10, measurable=True):
+        self.available = available
+        self.fixed = fixed
+        self.per_token = per_token
+        self.measurable = measurable
+        self.peak = 0
+
+    def reset(self):
+        self.peak = 0
+
+    def peak_bytes(self):
+        return self.peak if self.measurable else None
+
+    def available_bytes(self):
+        return self.available
+
+    def run(self, batch_size, sequence_length):
+        self.peak = self.fixed + batch_size * sequence_length * self.per_token
+
+
+class TestSelectDevice(unittest.TestCase):
+    def test_explicit_cpu_and_dtype(self):
+        execution = select_device("cpu", "bfloat16")
+
+        self.assertEqual(execution.device, torch.device("cpu"))
+        self.assertEqual(execution.dtype, torch.bfloat16)
+        self.assertTrue(execution.reduced_precision)
+        self.assertEqual(execution.to_dict(), {"device": "cpu", "dtype": "bfloat16"})
+
+    def test_auto_never_picks_reduced_precision_on_cpu_without_support(self):
+        execution = select_device("cpu", "auto")
+        if not execution.reduced_precision:
+            self.assertEqual(execution.dtype, torch.float32)
+
+    def test_unknown_dtype_is_rejected(self):
+        with self.assertRaises(ValueError):
+            select_device("cpu", "float8")
+
+    def test_padded_length_bounds_the_number_of_shapes(self):
+        self.assertEqual({padded_length(n, 64) for n in range(1, 1025)}, set(range(64, 1025, 64)))
+        self.assertEqual(padded_length(500, 64, limit=510), 510)
+        self.assertEqual(padded_length(515, 64, limit=510), 515)
+        self.assertEqual(padded_length(37), 37)
+
+
+class TestBatchSizeProbe(unittest.TestCase):
+    def test_extrapolates_to_the_memory_budget(self):
+        probe = FakeMemoryProbe(available=1_000_000)
+        batch_size = probe_max_batch_size(probe.run, 512, probe, memory_fraction=0.8, max_batch_size=1000)
+
+        # 800k budget, 1000 fixed, 5120 per item.
+        self.assertEqual(batch_size, (800_000 - 1000) // 5120)
+
+    def test_limits_shrink_with_sequence_length(self):
+        probe = FakeMemoryProbe(available=2_000_000)
+        limits = probe_batch_limits(probe.run, [256, 1024], ExecutionDevice(torch.device("cpu")),
+                                    probe=probe, max_batch_size=1000)
+
+        self.assertGreater(limits(256), limits(1024))
+        self.assertEqual(limits(300), limits(1024))
+        # Longer than anything probed: the most conservative limit.
+        self.assertEqual(limits(4096), limits(1024))
+
+    def test_unmeasurable_memory_keeps_the_default(self):
+        probe = FakeMemoryProbe(available=2_000_000, measurable=False)
+        limits = probe_batch_limits(probe.run, [256], ExecutionDevice(torch.device("cpu")), default=6, probe=probe)
+
+        self.assertEqual(limits.to_dict(), {})
+        self.assertEqual(limits(256), 6)
+
+
+class TestBucketerBatchLimit(unittest.TestCase):
+    def test_long_chunks_get_smaller_batches(self):
+        limits = BatchSizeLimits({128: 8, 1024: 2}, default=8)
+        bucketer = LengthBucketer(max_batch_size=8, max_batch_tokens=65536, batch_overhead_tokens=4096,
+                                  batch_limit=limits)
+        requests = [ChunkRequest(index=i, text=f"chunk {i}", num_tokens=n, generation_key=())
+                    for i, n in enumerate([100] * 8 + [900] * 8)]
+        batches = bucketer.plan(requests)
+
+        for batch in batches:
+            longest = max(r.num_tokens for r in batch.requests)
+            self.assertLessEqual(len(batch.requests), limits(longest))
+        self.assertIn(8, [len(batch.requests) for batch in batches])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+import docx
+
+from src.utils.docx_stream import docx_to_text, iter_docx_blocks
+from src.utils.document_parser import DocumentParser
+
+
+class TestDocxStream(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "sample.docx")
+
+        document = docx.Document()
+        document.sections[0].header.paragraphs[0].text = "ACME Confidential"
+        document.add_heading("Consulting Agreement", level=1)
+        document.add_paragraph("This Agreement is entered into by ABC Corporation.")
+        table = document.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "Rate"
+        table.cell(0, 1).text = "$150 per hour"
+        table.cell(1, 0).text = "Cap"
+        table.cell(1, 1).text = "$10,000 per month"
+        document.add_paragraph("Invoices are due within 30 days.")
+        document.save(self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_blocks_are_yielded_in_document_order(self):
+        blocks = list(iter_docx_blocks(self.path))
+
+        self.assertEqual(blocks, [
+            ("header", "ACME Confidential"),
+            ("heading", "Consulting Agreement"),
+            ("paragraph", "This Agreement is entered into by ABC Corporation."),
+            ("table_row", "Rate\t$150 per hour"),
+            ("table_row", "Cap\t$10,000 per month"),
+            ("paragraph", "Invoices are due within 30 days."),
+        ])
+
+    def test_headers_can_be_skipped(self):
+        kinds = {kind for kind, _ in iter_docx_blocks(self.path, include_headers=False)}
+        self.assertNotIn("header", kinds)
+
+    def test_parser_keeps_tables(self):
+        text = DocumentParser().read_file(self.path)
+
+        self.assertEqual(text, docx_to_text(self.path))
+        self.assertIn("$10,000 per month", text)
+        self.assertTrue(text.startswith("ACME Confidential\nConsulting Agreement"))
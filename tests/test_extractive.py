@@ -0,0 +1,44 @@
+import unittest
+
+from src.models.extractive import ExtractiveFilter
+
+
+SENTENCES = [
+    "The battery stores renewable energy at low cost.",
+    "Copyright notice: all rights reserved.",
+    "The new battery uses aluminum and sulfur to store energy.",
+    "Page 3 of 12.",
+    "Energy storage costs fall as the battery scales.",
+]
+
+
+class TestExtractiveFilter(unittest.TestCase):
+    def test_scores_topical_sentences_higher(self):
+        for method in ("textrank", "tfidf"):
+            scores = ExtractiveFilter(method=method).score(SENTENCES)
+            self.assertEqual(len(scores), len(SENTENCES))
+            self.assertGreater(scores[2], scores[3])
+            self.assertGreater(scores[0], scores[1])
+
+    def test_select_respects_budget_and_order(self):
+        result = ExtractiveFilter().select(SENTENCES, budget=100)
+
+        self.assertLessEqual(result.selected_length, 100)
+        self.assertEqual(result.indices, sorted(result.indices))
+        self.assertNotIn(3, result.indices)
+        self.assertLess(result.compression_ratio, 1.0)
+
+    def test_short_document_is_kept_whole(self):
+        result = ExtractiveFilter().select(SENTENCES, budget=10_000)
+
+        self.assertEqual(result.indices, list(range(len(SENTENCES))))
+        self.assertEqual(result.compression_ratio, 1.0)
+
+    def test_centroid_fallback_for_large_documents(self):
+        extractive_filter = ExtractiveFilter(max_dense_cells=1)
+        scores = extractive_filter.score(SENTENCES)
+        self.assertGreater(scores[2], scores[3])
+
+    def test_empty_input(self):
+        self.assertEqual(len(ExtractiveFilter().score([])), 0)
+        self.assertEqual(ExtractiveFilter().score(["!!!", "..."]).tolist(), [0.0, 0.0])
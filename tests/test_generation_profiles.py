@@ -0,0 +1,25 @@
+import unittest
+
+from src.models.generation_profiles import DEFAULT_PROFILE, get_profile
+
+
+class TestGenerationProfiles(unittest.TestCase):
+    def test_quality_profile_keeps_original_beam_search(self):
+        kwargs = get_profile(DEFAULT_PROFILE).build_kwargs()
+        self.assertEqual(kwargs["num_beams"], 4)
+        self.assertEqual(kwargs["length_penalty"], 2.0)
+        self.assertEqual(kwargs["max_length"], 130)
+
+    def test_fast_profile_is_greedy_with_cache(self):
+        kwargs = get_profile("fast").build_kwargs()
+        self.assertEqual(kwargs["num_beams"], 1)
+        self.assertTrue(kwargs["use_cache"])
+
+    def test_length_overrides(self):
+        kwargs = get_profile("balanced").build_kwargs(max_length=60, min_length=None)
+        self.assertEqual(kwargs["max_length"], 60)
+        self.assertEqual(kwargs["min_length"], 30)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            get_profile("turbo")
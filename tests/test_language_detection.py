@@ -0,0 +1,67 @@
+import unittest
+
+from src.utils.language_detection import UNDETERMINED, LanguageDetector, detect_language
+
+SAMPLES = {
+    "en": "The system performance testing was conducted over a thirty day period. Overall performance met "
+          "expectations in most test cases, and the team will publish the results next month.",
+    "de": "Die Leistung des Systems wurde über einen Zeitraum von dreißig Tagen getestet. Die Ergebnisse waren "
+          "insgesamt gut, und das Team wird den Bericht im nächsten Monat veröffentlichen.",
+    "fr": "Les performances du système ont été testées pendant une période de trente jours. Les résultats "
+          "étaient globalement bons et l'équipe publiera le rapport le mois prochain.",
+    "es": "El rendimiento del sistema se probó durante un período de treinta días. Los resultados fueron buenos "
+          "en general y el equipo publicará el informe el próximo mes.",
+    "it": "Le prestazioni del sistema sono state testate per un periodo di trenta giorni. I risultati sono stati "
+          "complessivamente buoni e il gruppo pubblicherà la relazione il mese prossimo.",
+    "pt": "O desempenho do sistema foi testado durante um período de trinta dias. Os resultados foram bons em "
+          "geral e a equipe publicará o relatório no próximo mês.",
+    "nl": "De prestaties van het systeem werden gedurende een periode van dertig dagen getest. De resultaten "
+          "waren over het algemeen goed en het team zal het rapport volgende maand publiceren.",
+    "pl": "Wydajność systemu była testowana przez okres trzydziestu dni. Wyniki były ogólnie dobre, a zespół "
+          "opublikuje raport w przyszłym miesiącu.",
+}
+
+# English without much running prose, which shares few trigrams with any profile.
+TERSE_ENGLISH = [
+    "Machine learning models require training data, validation data and evaluation metrics.",
+    "Invoice number 2024-118. Client: Acme Corporation. Payment terms: net 30 days. Total amount due: 4,500 USD.",
+    "ERROR 2024-05-01 12:00:03 worker-2 connection timeout after 30s, retrying request to database server",
+    "Returns a JSON object with status, message and data fields. Authentication tokens expire after one hour.",
+]
+
+
+class TestLanguageDetection(unittest.TestCase):
+    def test_detects_supported_languages(self):
+        for language, text in SAMPLES.items():
+            with self.subTest(language=language):
+                detection = detect_language(text)
+                self.assertEqual(detection.language, language)
+                self.assertGreater(detection.confidence, 0)
+
+    def test_terse_english_is_not_another_language(self):
+        for text in TERSE_ENGLISH:
+            with self.subTest(text=text):
+                self.assertIn(detect_language(text).language, ("en", UNDETERMINED))
+
+    def test_weak_matches_are_undetermined(self):
+        detector = LanguageDetector(languages=["it", "fr"])
+        self.assertEqual(detector.detect(TERSE_ENGLISH[0]).language, UNDETERMINED)
+
+    def test_short_text_is_undetermined(self):
+        detection = detect_language("Q3 2024: 42%")
+        self.assertEqual(detection.language, UNDETERMINED)
+        self.assertEqual(detection.language_name, "english")
+
+    def test_language_name_maps_to_nltk(self):
+        self.assertEqual(detect_language(SAMPLES["de"]).language_name, "german")
+
+    def test_restricted_languages(self):
+        detector = LanguageDetector(languages=["en", "de"])
+        self.assertEqual(set(detector.detect(SAMPLES["en"]).scores), {"en", "de"})
+
+        with self.assertRaises(ValueError):
+            LanguageDetector(languages=["xx"])
+
+
+if __name__ == '__main__':
+    unittest.main()
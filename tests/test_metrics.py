@@ -0,0 +1,24 @@
+import unittest
+
+from src.training.metrics import rouge_l, rouge_n, rouge_scores
+
+
+class TestRouge(unittest.TestCase):
+    def test_identical_summaries(self):
+        text = "The system processed 1,200 transactions per second."
+        self.assertAlmostEqual(rouge_n(text, text, 1), 1.0)
+        self.assertAlmostEqual(rouge_n(text, text, 2), 1.0)
+        self.assertAlmostEqual(rouge_l(text, text), 1.0)
+
+    def test_disjoint_summaries(self):
+        self.assertEqual(rouge_n("alpha beta", "gamma delta"), 0.0)
+        self.assertEqual(rouge_l("alpha beta", "gamma delta"), 0.0)
+
+    def test_partial_overlap(self):
+        score = rouge_l("the cat sat on the mat", "the cat lay on the mat")
+        self.assertAlmostEqual(score, 5 / 6)
+
+    def test_rouge_scores_requires_aligned_inputs(self):
+        with self.assertRaises(ValueError):
+            rouge_scores(["a"], [])
+        self.assertEqual(rouge_scores(["a b"], ["a b"])["rouge1"], 1.0)
@@ -0,0 +1,138 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+
+import torch
+
+from api.admission import PriorityExecutor
+from api.pipeline import StagedPipeline, StageStats
+from tests.tiny_models import save_tiny_seq2seq
+
+
+class TestStageStats(unittest.TestCase):
+    def test_measures_overlap_of_text_and_model_work(self):
+        stats = StageStats()
+        model_started = stats.enter("model")
+        time.sleep(0.05)
+        text_started = stats.enter("tokenize")
+        time.sleep(0.05)
+        stats.exit("model", model_started)
+        time.sleep(0.05)
+        stats.exit("tokenize", text_started)
+
+        result = stats.to_dict()
+        self.assertAlmostEqual(result["overlap_seconds"], 0.05, delta=0.02)
+        self.assertAlmostEqual(result["text_seconds"], 0.1, delta=0.02)
+        self.assertAlmostEqual(result["busy_seconds"], 0.15, delta=0.03)
+        self.assertAlmostEqual(result["text_overlap_ratio"], 0.5, delta=0.15)
+        self.assertEqual(result["items"]["model"], 1)
+
+
+class TestStagedPipeline(unittest.TestCase):
+    def setUp(self):
+        self.model_executor = PriorityExecutor(max_workers=2)
+        self.text_executor = PriorityExecutor(max_workers=1, name="text-worker")
+
+    def tearDown(self):
+        self.model_executor.shutdown()
+        self.text_executor.shutdown()
+
+    def test_stages_run_on_their_own_pools(self):
+        pipeline = StagedPipeline(self.text_executor, self.model_executor)
+        threads = {}
+
+        def stage(name, value):
+            threads[name] = threading.current_thread().name
+            return value
+
+        result = asyncio.run(pipeline.run(
+            encode=lambda: stage("encode", 1),
+            infer=lambda inputs: stage("infer", inputs + 1),
+            decode=lambda outputs: stage("decode", outputs * 10)
+        ))
+
+        self.assertEqual(result, 20)
+        self.assertTrue(threads["encode"].startswith("text-worker"))
+        self.assertTrue(threads["decode"].startswith("text-worker"))
+        self.assertTrue(threads["infer"].startswith("model-worker"))
+        self.assertEqual(pipeline.stats.items, {"tokenize": 1, "decode": 1, "model": 1})
+
+    def test_cancelled_model_work_is_waited_for_once_started(self):
+        pipeline = StagedPipeline(self.text_executor, self.model_executor)
+        executor = PriorityExecutor(max_workers=1)
+        pipeline.model_executor = executor
+        started, release = threading.Event(), threading.Event()
+        ran = []
+
+        def generate(name):
+            started.set()
+            release.wait(5)
+            ran.append(name)
+
+        async def scenario():
+            running = asyncio.ensure_future(pipeline.run_model(generate, "running"))
+            queued = asyncio.ensure_future(pipeline.run_model(ran.append, "queued"))
+            await asyncio.to_thread(started.wait, 5)
+            running.cancel()
+            queued.cancel()
+            await asyncio.sleep(0.05)
+            self.assertFalse(running.done())
+            self.assertTrue(queued.done())
+
+            release.set()
+            with self.assertRaises(asyncio.CancelledError):
+                await running
+            self.assertEqual(ran, ["running"])
+
+        asyncio.run(scenario())
+        executor.shutdown()
+
+    def test_bounds_encoded_batches(self):
+        pipeline = StagedPipeline(self.text_executor, self.model_executor, max_encoded=1)
+        lock = threading.Lock()
+        encoded = {"current": 0, "peak": 0}
+
+        def encode():
+            with lock:
+                encoded["current"] += 1
+                encoded["peak"] = max(encoded["peak"], encoded["current"])
+
+        def infer(_):
+            time.sleep(0.01)
+            with lock:
+                encoded["current"] -= 1
+
+        async def scenario():
+            await asyncio.gather(*[pipeline.run(encode, infer, lambda outputs: outputs) for _ in range(4)])
+
+        asyncio.run(scenario())
+        self.assertEqual(encoded["peak"], 1)
+
+
+class TestSummarizerStages(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from src.models.summarizer import DocumentSummarizer
+        cls.summarizer = DocumentSummarizer(save_tiny_seq2seq(tempfile.mkdtemp()))
+
+    def test_collate_matches_padded_tokenizer_call(self):
+        texts = ["the report of the contract is the document . " * n for n in (1, 4, 9)]
+        expected = self.summarizer.tokenizer(["summarize: " + text for text in texts], return_tensors="pt",
+                                             padding=True, truncation=True, max_length=1024)
+        inputs = self.summarizer.collate(self.summarizer.encode(texts))
+
+        self.assertTrue(torch.equal(inputs["input_ids"], expected["input_ids"]))
+        self.assertTrue(torch.equal(inputs["attention_mask"], expected["attention_mask"]))
+
+    def test_staged_calls_match_summarize_batch(self):
+        texts = ["the client will pay the invoice . " * 3, "the battery stores energy . " * 6]
+        inputs = self.summarizer.collate(self.summarizer.encode(texts))
+        staged = self.summarizer.decode(self.summarizer.generate_ids(inputs, max_length=20, profile="fast"))
+
+        self.assertEqual(staged, self.summarizer.summarize_batch(texts, max_length=20, profile="fast"))
+
+
+if __name__ == '__main__':
+    unittest.main()
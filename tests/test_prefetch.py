@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+
+from api.admission import IDLE, INTERACTIVE, AdmissionController
+from api.prefetch import Prefetcher
+
+
+class TestPrefetcher(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_jobs_wait_while_interactive_work_runs(self):
+        async def scenario():
+            admission = AdmissionController(max_tokens_in_flight=100)
+            prefetcher = Prefetcher(lambda: admission.busy(IDLE), poll_seconds=0.01)
+            steps = []
+
+            async def job():
+                await prefetcher.idle()
+                steps.append("prefetched")
+
+            async with admission.admit(10, INTERACTIVE):
+                prefetcher.schedule("doc", job)
+                await asyncio.sleep(0.05)
+                self.assertEqual(steps, [])
+                steps.append("interactive")
+            await asyncio.sleep(0.05)
+
+            self.assertEqual(steps, ["interactive", "prefetched"])
+            stats = prefetcher.stats()
+            self.assertEqual(stats["preemptions"], 1)
+            self.assertEqual(stats["completed"], 1)
+
+        self.run_async(scenario())
+
+    def test_idle_work_does_not_count_as_busy(self):
+        async def scenario():
+            admission = AdmissionController(max_tokens_in_flight=100)
+            async with admission.admit(10, IDLE):
+                self.assertFalse(admission.busy(IDLE))
+                # An interactive request waiting for the idle work's tokens is more urgent work.
+                waiting = asyncio.ensure_future(admission.acquire(95, INTERACTIVE))
+                await asyncio.sleep(0)
+                self.assertTrue(admission.busy(IDLE))
+            await waiting
+
+        self.run_async(scenario())
+
+    def test_cancel_and_duplicate_schedule(self):
+        async def scenario():
+            prefetcher = Prefetcher(lambda: True, poll_seconds=0.01)
+
+            async def job():
+                await prefetcher.idle()
+
+            self.assertTrue(prefetcher.schedule("doc", job))
+            self.assertTrue(prefetcher.schedule("doc", job))
+            self.assertEqual(prefetcher.stats()["scheduled"], 1)
+            prefetcher.cancel("doc")
+            await asyncio.sleep(0.02)
+            self.assertEqual(prefetcher.stats()["cancelled"], 1)
+            self.assertEqual(prefetcher.stats()["running"], 0)
+
+        self.run_async(scenario())
+
+    def test_usage_is_counted_once_per_result(self):
+        prefetcher = Prefetcher(lambda: False, max_documents=1)
+        prefetcher.remember("a", "parsed a")
+        prefetcher.produced("summary", "key-a")
+
+        self.assertEqual(prefetcher.lookup("a"), "parsed a")
+        self.assertTrue(prefetcher.used("summary", "key-a"))
+        self.assertTrue(prefetcher.used("summary", "key-a"))
+        self.assertFalse(prefetcher.used("summary", "key-b"))
+        prefetcher.remember("b", "parsed b")
+        self.assertIsNone(prefetcher.lookup("a"))
+
+        stats = prefetcher.stats()
+        self.assertEqual(stats["hits"]["summary"], 2)
+        self.assertEqual(stats["usage_rate"]["summary"], 1.0)
+        self.assertEqual(stats["usage_rate"]["document"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
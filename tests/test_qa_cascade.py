@@ -0,0 +1,100 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import torch
+
+from src.models.device import ExecutionDevice
+from src.models.qa_cascade import LARGE, SMALL, QACascade, calibrate_threshold, normalize_answer
+from src.models.qa_model import QuestionAnswerer
+from tests.tiny_models import save_tiny_qa
+
+DOCUMENT = "The rate is $ 150 per hour for the services of the consultant. Payment is due in 30 days."
+
+
+class TestCalibration(unittest.TestCase):
+    def test_lowest_threshold_that_meets_the_target(self):
+        confidences = [0.95, 0.9, 0.8, 0.6, 0.4, 0.2]
+        correct = [True, True, True, False, True, False]
+
+        self.assertEqual(calibrate_threshold(confidences, correct, target_accuracy=1.0), 0.8)
+        self.assertEqual(calibrate_threshold(confidences, correct, target_accuracy=0.8), 0.4)
+        self.assertEqual(calibrate_threshold([0.9, 0.5], [False, False], target_accuracy=0.5), 1.0)
+
+    def test_ties_are_kept_together(self):
+        self.assertEqual(calibrate_threshold([0.9, 0.7, 0.7], [True, True, False], target_accuracy=1.0), 0.9)
+
+    def test_normalize_answer(self):
+        self.assertEqual(normalize_answer("The $150, per hour."), "$150 per hour")
+
+
+class TestQACascade(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        execution = ExecutionDevice(torch.device("cpu"))
+        cls.small = QuestionAnswerer(save_tiny_qa(os.path.join(cls.temp_dir.name, "small"), seed=1),
+                                     execution=execution)
+        cls.large = QuestionAnswerer(save_tiny_qa(os.path.join(cls.temp_dir.name, "large")), execution=execution)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def test_confidence_is_a_span_probability(self):
+        context = self.large.prepare_context(DOCUMENT)
+        answer = self.large.decode_answer(self.large.predict(self.large.encode("what is the rate", context)))
+
+        self.assertIsNotNone(answer)
+        self.assertGreater(answer.confidence, 0.0)
+        self.assertLessEqual(answer.confidence, 1.0)
+
+    def test_confident_answers_stay_on_the_small_model(self):
+        cascade = QACascade(self.small, self.large, threshold=0.0)
+        answer, tier = cascade.answer("what is the rate", DOCUMENT)
+
+        self.assertEqual(tier, SMALL)
+        self.assertIsNotNone(answer)
+        self.assertEqual(cascade.stats.to_dict()["escalation_rate"], 0.0)
+
+    def test_uncertain_answers_escalate(self):
+        cascade = QACascade(self.small, self.large, threshold=1.01)
+        cascade.answer("what is the rate", DOCUMENT)
+        _, tier = cascade.answer("when is payment due", DOCUMENT)
+
+        self.assertEqual(tier, LARGE)
+        stats = cascade.stats.to_dict()
+        self.assertEqual(stats["answered"], {SMALL: 0, LARGE: 2})
+        self.assertEqual(stats["escalation_rate"], 1.0)
+        self.assertIsNotNone(stats["avg_large_seconds"])
+
+    def test_async_answers_run_each_tier_through_the_callers_ask(self):
+        cascade = QACascade(self.small, self.large, threshold=1.01)
+        asked = []
+
+        async def ask(model, question, document):
+            asked.append(model)
+            context = model.prepare_context(document)
+            return context, model.decode_answer(model.predict(model.encode(question, context))), 0.01
+
+        context, answer, tier = asyncio.run(cascade.answer_async("what is the rate", DOCUMENT, ask))
+
+        self.assertEqual(asked, [self.small, self.large])
+        self.assertEqual(tier, LARGE)
+        self.assertIs(context, self.large.prepare_context(DOCUMENT))
+        self.assertEqual(cascade.stats.to_dict()["answered"], {SMALL: 0, LARGE: 1})
+
+    def test_calibrate_against_the_large_model(self):
+        cascade = QACascade(self.large, self.large)
+        report = cascade.calibrate([{"question": "what is the rate", "context": DOCUMENT},
+                                    {"question": "when is payment due", "context": DOCUMENT}])
+
+        # A model always agrees with itself, so nothing needs to escalate.
+        self.assertEqual(report["small_accuracy"], 1.0)
+        self.assertEqual(report["escalation_rate"], 0.0)
+        self.assertLessEqual(cascade.threshold, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
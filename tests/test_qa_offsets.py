@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import torch
+
+from src.models.device import ExecutionDevice
+from src.models.qa_model import QuestionAnswerer, passage_bounds
+from src.utils.text_normalizer import get_normalizer
+from tests.tiny_models import save_tiny_qa
+
+DOCUMENT = ("The  consultant shall invoice the client monthly.\n\n"
+            "The rate is “150” per hour for\tall services.   Payment is due in 30 days.")
+
+
+def fixed_logits(null_logit, span=None):
+    """Stands in for a QA model: every window scores ``null_logit`` for no answer and ``span`` as (row, start, end)"""
+    def model(input_ids, attention_mask):
+        start_logits = torch.zeros(input_ids.shape)
+        end_logits = torch.zeros(input_ids.shape)
+        start_logits[:, 0] = end_logits[:, 0] = null_logit
+        if span:
+            row, start, end = span
+            start_logits[row, start] = end_logits[row, end] = 5.0
+        return SimpleNamespace(start_logits=start_logits, end_logits=end_logits)
+    return model
+
+
+class TestAnswerOffsets(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        path = save_tiny_qa(os.path.join(cls.temp_dir.name, "qa"))
+        cls.answerer = QuestionAnswerer(path, execution=ExecutionDevice(torch.device("cpu")),
+                                        max_length=48, stride=8, max_windows=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def predict_with(self, model, inputs):
+        trained = self.answerer.model
+        self.answerer.model = model
+        try:
+            return self.answerer.decode_answer(self.answerer.predict(inputs))
+        finally:
+            self.answerer.model = trained
+
+    def ask(self, question, document):
+        inputs = self.answerer.encode(question, self.answerer.prepare_context(document))
+        return self.answerer.decode_answer(self.answerer.predict(inputs))
+
+    def test_offsets_point_into_the_original_document(self):
+        answer = self.ask("what is the rate", DOCUMENT)
+
+        self.assertIsNotNone(answer)
+        self.assertEqual(get_normalizer("qa").normalize(DOCUMENT[answer.start:answer.end]), answer.text)
+        self.assertEqual(DOCUMENT[answer.passage_start:answer.passage_end], answer.passage)
+        self.assertLessEqual(answer.passage_start, answer.start)
+        self.assertGreaterEqual(answer.passage_end, answer.end)
+
+    def test_context_is_prepared_once_per_document(self):
+        first = self.answerer.prepare_context(DOCUMENT)
+        second = self.answerer.prepare_context(DOCUMENT)
+
+        self.assertIs(first, second)
+        self.assertEqual(len(first.token_ids), len(first.token_offsets))
+
+    def test_long_documents_are_split_into_overlapping_windows(self):
+        document = " ".join(["the client pays the invoice in 30 days ."] * 20)
+        inputs = self.answerer.encode("when", document)
+
+        windows = inputs["windows"]
+        self.assertEqual(len(windows), 3)
+        self.assertLessEqual(inputs["input_ids"].shape[1], 48)
+        for (start, length), (next_start, _) in zip(windows, windows[1:]):
+            self.assertEqual(start + length - next_start, 8)
+
+        offset = inputs["context_start"]
+        answer = self.predict_with(fixed_logits(0.0, (1, offset + 2, offset + 4)), inputs)
+        self.assertIsNotNone(answer)
+        self.assertEqual(get_normalizer("qa").normalize(document[answer.start:answer.end]), answer.text)
+        # Positions in the second window are shifted by where that window starts.
+        self.assertGreater(answer.start, 0)
+
+    def test_unanswerable_questions_get_no_span(self):
+        inputs = self.answerer.encode("who signed", DOCUMENT)
+        offset = inputs["context_start"]
+
+        self.assertIsNone(self.predict_with(fixed_logits(20.0, (0, offset, offset + 1)), inputs))
+        self.assertIsNotNone(self.predict_with(fixed_logits(0.0, (0, offset, offset + 1)), inputs))
+
+
+class TestPassageBounds(unittest.TestCase):
+    def test_passage_is_the_enclosing_sentence(self):
+        text = "First sentence here. The rate is 150 per hour. Last one."
+        start = text.index("150")
+
+        passage_start, passage_end = passage_bounds(text, start, start + 3)
+        self.assertEqual(text[passage_start:passage_end], "The rate is 150 per hour.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from src.utils.process_stats import open_file_descriptors
+from src.utils.resource_monitor import ResourceLimits, ResourceMonitor
+
+
+class TestResourceMonitor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.monitor = ResourceMonitor(temp_dir=self.temp_dir.name, warmup_requests=10)
+        self.monitor.start()
+
+    def tearDown(self):
+        self.monitor.stop()
+        self.temp_dir.cleanup()
+
+    def test_growth_is_measured_after_the_warmup(self):
+        # Files left during the warm-up are part of the baseline.
+        open(os.path.join(self.temp_dir.name, "warmup"), "w").close()
+        self.monitor.sample(0)
+        self.assertIsNone(self.monitor.baseline)
+        self.monitor.sample(10)
+        self.monitor.sample(20)
+
+        self.assertEqual(self.monitor.baseline.requests, 10)
+        self.assertEqual(self.monitor.growth()["temp_files"], 0)
+        self.assertEqual(self.monitor.check(ResourceLimits(rss_mb=1000, traced_mb=1000)), [])
+
+    def test_leaks_are_reported(self):
+        self.monitor.sample(10)
+        kept = [bytearray(1024 * 1024) for _ in range(4)]
+        files = [open(os.path.join(self.temp_dir.name, f"leak-{i}"), "w") for i in range(3)]
+        handler = logging.NullHandler()
+        logging.getLogger().addHandler(handler)
+        try:
+            self.monitor.sample(20)
+            growth = self.monitor.growth()
+            violations = self.monitor.check(ResourceLimits(rss_mb=1000, traced_mb=1, open_files=0))
+            report = self.monitor.report(ResourceLimits(), top=3)
+        finally:
+            logging.getLogger().removeHandler(handler)
+            for f in files:
+                f.close()
+
+        self.assertEqual(growth["temp_files"], 3)
+        self.assertEqual(growth["log_handlers"], 1)
+        self.assertGreaterEqual(growth["traced_mb"], 4)
+        if open_file_descriptors() is not None:
+            self.assertGreaterEqual(growth["open_files"], 3)
+        self.assertTrue(any(v.startswith("traced_mb") for v in violations))
+        self.assertTrue(any(v.startswith("temp_files") for v in violations))
+        self.assertEqual(report["leftover_temp_files"], ["leak-0", "leak-1", "leak-2"])
+        self.assertIn("test_resource_monitor.py", report["top_allocators"][0])
+        self.assertEqual(len(kept), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from src.models.router import ModelRouter, UnsupportedLanguage, parse_model_map
+
+
+class TestModelRouter(unittest.TestCase):
+    def setUp(self):
+        self.loaded = []
+
+        def loader(model_name):
+            self.loaded.append(model_name)
+            return f"model:{model_name}"
+
+        self.router = ModelRouter(loader, {"en": "english-model", "de": "multilingual", "fr": "multilingual"})
+
+    def test_loads_lazily_and_shares_checkpoints(self):
+        self.assertEqual(self.loaded, [])
+        self.assertEqual(self.router.get("de"), "model:multilingual")
+        self.assertEqual(self.router.get("fr"), "model:multilingual")
+        self.assertEqual(self.loaded, ["multilingual"])
+        self.assertEqual(self.router.loaded(), {"en": False, "de": True, "fr": True})
+
+    def test_undetermined_uses_default_language(self):
+        self.assertEqual(self.router.get("und"), "model:english-model")
+        self.assertEqual(self.router.get(None), "model:english-model")
+
+    def test_unsupported_language(self):
+        with self.assertRaises(UnsupportedLanguage) as context:
+            self.router.get("pl")
+        self.assertEqual(context.exception.language, "pl")
+        self.assertEqual(self.loaded, [])
+
+    def test_fallback_language_is_opt_in(self):
+        router = ModelRouter(self.router.loader, self.router.models, fallback_language="en")
+        self.assertEqual(router.resolve("pl"), "en")
+        self.assertEqual(router.get("pl"), "model:english-model")
+        with self.assertRaises(ValueError):
+            ModelRouter(self.router.loader, self.router.models, fallback_language="pl")
+
+    def test_default_language_must_be_configured(self):
+        with self.assertRaises(ValueError):
+            ModelRouter(lambda name: name, {"de": "german-model"})
+
+
+class TestParseModelMap(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_model_map("de=a/b, fr=c"), {"de": "a/b", "fr": "c"})
+        self.assertEqual(parse_model_map(None), {})
+
+    def test_invalid_entry(self):
+        with self.assertRaises(ValueError):
+            parse_model_map("de")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import time
+import unittest
+
+from src.models.batching import ChunkBatch, ChunkRequest
+from src.models.scheduler import DeadlineScheduler, LatencyEstimator, chunk_priorities
+
+
+def make_batch(index, num_tokens=100):
+    request = ChunkRequest(index=index, text=f"chunk {index}", num_tokens=num_tokens, generation_key=())
+    return ChunkBatch(generation_key=(), requests=[request])
+
+
+def sleeping_execute(seconds, started=None):
+    async def execute(batch):
+        if started is not None:
+            started.append(batch.requests[0].index)
+        await asyncio.sleep(seconds)
+        return [f"summary {request.index}" for request in batch.requests]
+    return execute
+
+
+class TestChunkPriorities(unittest.TestCase):
+    def test_position_favours_opening_and_closing_chunks(self):
+        priorities = chunk_priorities(6)
+        self.assertEqual(priorities[0], max(priorities))
+        self.assertGreater(priorities[-1], priorities[-2])
+
+    def test_importance_is_blended_in(self):
+        priorities = chunk_priorities(4, importance=[0.0, 0.0, 10.0, 0.0])
+        self.assertGreater(priorities[2], priorities[1])
+        self.assertGreater(priorities[2], priorities[3])
+
+    def test_empty(self):
+        self.assertEqual(chunk_priorities(0), [])
+
+
+class TestLatencyEstimator(unittest.TestCase):
+    def test_update_moves_towards_observed_cost(self):
+        estimator = LatencyEstimator(initial_seconds_per_token=0.01, smoothing=0.5)
+        batch = make_batch(0, num_tokens=100)
+        estimator.update(batch, 0.0)
+        self.assertLess(estimator.estimate(batch), 1.0)
+        self.assertGreater(estimator.estimate(batch), 0.0)
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+    def test_without_deadline_everything_completes(self):
+        scheduler = DeadlineScheduler(LatencyEstimator(), max_in_flight=2)
+        batches = [make_batch(i) for i in range(5)]
+        result = asyncio.run(scheduler.run(batches, sleeping_execute(0.001)))
+
+        self.assertTrue(result.complete)
+        self.assertEqual(result.coverage, 1.0)
+        self.assertEqual(sorted(result.results), list(range(5)))
+        self.assertEqual(result.skipped_batches, 0)
+
+    def test_stops_scheduling_before_the_deadline(self):
+        # Each batch takes 0.1s and is estimated accurately, so only a few fit in 0.25s.
+        estimator = LatencyEstimator(initial_seconds_per_token=0.001)
+        scheduler = DeadlineScheduler(estimator, max_in_flight=1, safety_margin_seconds=0.0)
+        batches = [make_batch(i) for i in range(10)]
+
+        started = time.time()
+        result = asyncio.run(scheduler.run(batches, sleeping_execute(0.1), deadline=time.time() + 0.25))
+        elapsed = time.time() - started
+
+        self.assertFalse(result.complete)
+        self.assertLess(elapsed, 0.35)
+        self.assertGreaterEqual(result.completed_batches, 1)
+        self.assertEqual(result.completed_batches + result.skipped_batches, 10)
+        self.assertAlmostEqual(result.coverage, result.completed_batches / 10, places=3)
+
+    def test_runs_highest_priority_batches_first(self):
+        estimator = LatencyEstimator(initial_seconds_per_token=0.001)
+        scheduler = DeadlineScheduler(estimator, max_in_flight=1, safety_margin_seconds=0.0)
+        batches = [make_batch(i) for i in range(4)]
+        started = []
+
+        result = asyncio.run(scheduler.run(batches, sleeping_execute(0.1, started),
+                                           deadline=time.time() + 0.15, priorities=[0.1, 0.2, 0.9, 0.3]))
+
+        self.assertEqual(started[0], 2)
+        self.assertIn(2, result.results)
+
+    def test_always_runs_one_batch_even_if_the_deadline_has_passed(self):
+        scheduler = DeadlineScheduler(LatencyEstimator(), max_in_flight=2)
+        batches = [make_batch(i) for i in range(3)]
+        result = asyncio.run(scheduler.run(batches, sleeping_execute(0.0), deadline=time.time() - 1))
+
+        self.assertEqual(result.completed_batches, 1)
+        self.assertEqual(result.skipped_batches, 2)
+        self.assertIn(0, result.results)
+        self.assertFalse(result.complete)
+
+    def test_abandons_stragglers_at_the_deadline(self):
+        # The estimate is far too optimistic, so the running batch overruns the deadline.
+        scheduler = DeadlineScheduler(LatencyEstimator(initial_seconds_per_token=1e-6), max_in_flight=2,
+                                      safety_margin_seconds=0.0)
+        batches = [make_batch(i) for i in range(2)]
+
+        async def execute(batch):
+            await asyncio.sleep(0.01 if batch.requests[0].index == 0 else 1.0)
+            return ["summary"]
+
+        started = time.time()
+        result = asyncio.run(scheduler.run(batches, execute, deadline=time.time() + 0.1))
+
+        self.assertLess(time.time() - started, 0.5)
+        self.assertEqual(list(result.results), [0])
+        self.assertEqual(result.skipped_batches, 1)
+        self.assertEqual(len(result.abandoned), 1)
+        self.assertTrue(result.abandoned[0].cancelled())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+import unittest
+
+from src.utils.document_analyzer import DocumentAnalyzer
+from src.utils.segmentation import RegexSegmenter, get_segmenter
+from src.utils.stopwords import stop_words
+
+
+class TestRegexSegmenter(unittest.TestCase):
+    def setUp(self):
+        self.segmenter = RegexSegmenter()
+
+    def test_abbreviations_initials_and_decimals_do_not_end_sentences(self):
+        text = ("Dr. Smith signed the agreement with ABC Corp. on behalf of J. R. Jones. "
+                "The fee is 2.5 times the base rate, e.g. $150 per hour! Is that final? Yes.")
+
+        self.assertEqual(self.segmenter.sentences(text), [
+            "Dr. Smith signed the agreement with ABC Corp. on behalf of J. R. Jones.",
+            "The fee is 2.5 times the base rate, e.g. $150 per hour!",
+            "Is that final?",
+            "Yes.",
+        ])
+
+    def test_blank_lines_and_quotes_end_sentences(self):
+        text = 'CONSULTING SERVICES AGREEMENT\n\nThe client said "pay monthly." Payment is due in 30 days'
+
+        self.assertEqual(self.segmenter.sentences(text), [
+            "CONSULTING SERVICES AGREEMENT",
+            'The client said "pay monthly."',
+            "Payment is due in 30 days",
+        ])
+
+    def test_words_keep_numbers_and_split_punctuation(self):
+        self.assertEqual(self.segmenter.words("Up to 1,200 transactions, with well-known limits."),
+                         ["Up", "to", "1,200", "transactions", ",", "with", "well-known", "limits", "."])
+
+    def test_unknown_segmenter_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_segmenter("spacy")
+
+
+class TestDocumentAnalyzer(unittest.TestCase):
+    def test_stats_without_nltk_data(self):
+        analyzer = DocumentAnalyzer("The battery stores energy. The battery is cheap.", segmenter=RegexSegmenter())
+
+        self.assertEqual(len(analyzer.sentences), 2)
+        self.assertEqual(analyzer.get_keyword_distribution(1), [("battery", 2)])
+        self.assertIn("the", stop_words("english"))
+
+    def test_import_does_not_load_rendering_or_nltk(self):
+        code = ("import sys, src.utils.document_analyzer; "
+                "print(sorted(m for m in ('streamlit', 'matplotlib', 'seaborn', 'pandas', 'wordcloud', 'nltk') "
+                "if m in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import torch
+from transformers import AutoModelForQuestionAnswering, AutoModelForSeq2SeqLM
+
+from src.models.backends import get_backend
+from src.models.snapshot import create_snapshot, load_mmap_state_dict, resolve_model_path
+from tests.tiny_models import save_tiny_qa, save_tiny_seq2seq
+
+
+class TestModelSnapshot(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.qa_source = save_tiny_qa(os.path.join(cls.temp_dir.name, "source-qa"))
+        cls.seq2seq_source = save_tiny_seq2seq(os.path.join(cls.temp_dir.name, "source-seq2seq"))
+        cls.snapshot_dir = os.path.join(cls.temp_dir.name, "snapshot")
+        create_snapshot({cls.qa_source: "qa", cls.seq2seq_source: "seq2seq"}, cls.snapshot_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def test_resolve_model_path(self):
+        path = resolve_model_path(self.qa_source, self.snapshot_dir)
+        self.assertTrue(path.startswith(self.snapshot_dir))
+        self.assertEqual(resolve_model_path("unknown/model", self.snapshot_dir), "unknown/model")
+        self.assertEqual(resolve_model_path(self.qa_source, None), self.qa_source)
+
+    def test_mmap_state_dict_matches_checkpoint(self):
+        path = resolve_model_path(self.qa_source, self.snapshot_dir)
+        expected = AutoModelForQuestionAnswering.from_pretrained(self.qa_source).state_dict()
+        state_dict = load_mmap_state_dict(path)
+
+        for name, tensor in state_dict.items():
+            torch.testing.assert_close(tensor, expected[name])
+
+    def test_mmap_models_match_eager_outputs(self):
+        input_ids = torch.randint(4, 40, (2, 12))
+        attention_mask = torch.ones_like(input_ids)
+        device = torch.device("cpu")
+
+        qa = get_backend("eager").load_model("qa", resolve_model_path(self.qa_source, self.snapshot_dir), device)
+        expected_qa = AutoModelForQuestionAnswering.from_pretrained(self.qa_source).eval()
+        with torch.no_grad():
+            torch.testing.assert_close(qa(input_ids=input_ids, attention_mask=attention_mask).start_logits,
+                                       expected_qa(input_ids=input_ids, attention_mask=attention_mask).start_logits)
+
+        path = resolve_model_path(self.seq2seq_source, self.snapshot_dir)
+        seq2seq = get_backend("eager").load_model("seq2seq", path, device)
+        expected_seq2seq = AutoModelForSeq2SeqLM.from_pretrained(self.seq2seq_source).eval()
+        kwargs = {"max_length": 10, "num_beams": 1, "do_sample": False}
+        self.assertEqual(seq2seq.generate(input_ids=input_ids, **kwargs).tolist(),
+                         expected_seq2seq.generate(input_ids=input_ids, **kwargs).tolist())
+        self.assertFalse(any(param.is_meta for param in seq2seq.parameters()))
+
+    def test_loading_leaves_modules_built_by_other_threads_alone(self):
+        path = resolve_model_path(self.qa_source, self.snapshot_dir)
+        models = []
+        loader = threading.Thread(target=lambda: models.extend(
+            get_backend("eager").load_model("qa", path, torch.device("cpu")) for _ in range(5)))
+        loader.start()
+        built = []
+        while loader.is_alive():
+            built.append(torch.nn.Linear(4, 4))
+        loader.join()
+
+        self.assertFalse(any(param.is_meta for layer in built for param in layer.parameters()))
+        self.assertFalse(any(tensor.is_meta for model in models for tensor in model.state_dict().values()))
+        self.assertEqual(len(models), 5)
@@ -0,0 +1,44 @@
+import unittest
+
+from src.utils.document_parser import DocumentParser
+from src.utils.text_normalizer import TextNormalizer
+
+
+class TestTextNormalizer(unittest.TestCase):
+    def test_keeps_sentence_punctuation(self):
+        text = "  The rate is $150 per hour.\n\nInvoices are due in 30 days!  "
+        self.assertEqual(TextNormalizer("qa").normalize(text),
+                         "The rate is $150 per hour. Invoices are due in 30 days!")
+
+    def test_typographic_characters(self):
+        text = "“Client” shall pay—within 30 days—the con­sultant’s fee"
+        self.assertEqual(TextNormalizer("summarization").normalize(text),
+                         "\"Client\" shall pay-within 30 days-the consultant's fee")
+
+    def test_analytics_profile_strips_symbols_and_lowercases(self):
+        self.assertEqual(TextNormalizer("analytics").normalize("Hello, World! (Test)"), "hello world test")
+
+    def test_offsets_map_back_to_original(self):
+        original = "Header\n\n   The   con­sultant  is  “XYZ Consulting”.\x07End"
+        normalized, offsets = TextNormalizer("qa").normalize_with_offsets(original)
+
+        self.assertEqual(normalized, TextNormalizer("qa").normalize(original))
+        for phrase in ("The", "XYZ Consulting", "Header", "End"):
+            start = normalized.index(phrase)
+            orig_start, orig_end = offsets.span_to_original(start, start + len(phrase))
+            self.assertEqual(original[orig_start:orig_end], phrase)
+
+        start = normalized.index("consultant")
+        orig_start, orig_end = offsets.span_to_original(start, start + len("consultant"))
+        self.assertEqual(original[orig_start:orig_end], "con­sultant")
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            TextNormalizer("legal")
+        with self.assertRaises(ValueError):
+            TextNormalizer("analytics").normalize_with_offsets("text")
+
+    def test_parser_clean_text_uses_profiles(self):
+        parser = DocumentParser()
+        self.assertEqual(parser.clean_text("Done.  Next?"), "Done. Next?")
+        self.assertEqual(parser.clean_text("Done.  Next?", profile="analytics"), "done next")
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from src.models.summarizer import DocumentSummarizer
+from src.utils.corpus_analytics import analyze_document, analyze_segments
+from src.utils.dedup import MinHasher
+from src.utils.text_stream import detect_encoding, iter_text_progress, iter_text_segments, read_text
+
+TEXT = "\n".join(
+    f"Line {i}: the café invoice for Zürich was paid on time — naïve résumé check {i % 7}."
+    for i in range(400)
+)
+
+
+class TestTextStream(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, data: bytes) -> str:
+        path = os.path.join(self.temp_dir.name, "document.txt")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_detects_common_encodings(self):
+        for encoding, data in [
+            ("utf-8", TEXT.encode("utf-8")),
+            ("utf-8-sig", TEXT.encode("utf-8-sig")),
+            ("utf-16", TEXT.encode("utf-16")),
+            ("utf-16-le", TEXT.encode("utf-16-le")),
+            ("cp1252", TEXT.encode("cp1252")),
+        ]:
+            with self.subTest(encoding=encoding):
+                self.assertEqual(read_text(self.write(data)), TEXT)
+
+        self.assertEqual(detect_encoding(TEXT.encode("utf-8")[:1001]), "utf-8")
+
+    def test_segments_are_bounded_and_cut_at_line_breaks(self):
+        path = self.write(TEXT.encode("utf-8"))
+        # Small blocks put multi-byte characters across block boundaries.
+        segments = list(iter_text_segments(path, segment_chars=500, block_bytes=97))
+
+        self.assertEqual("".join(segments), TEXT)
+        self.assertGreater(len(segments), 10)
+        for segment in segments[:-1]:
+            self.assertLessEqual(len(segment), 500)
+            self.assertTrue(segment.endswith("\n"))
+
+    def test_long_lines_are_cut_at_whitespace(self):
+        text = " ".join(f"word{i}" for i in range(2000))
+        segments = list(iter_text_segments(self.write(text.encode("utf-8")), segment_chars=300, block_bytes=64))
+
+        self.assertEqual("".join(segments), text)
+        for segment in segments[:-1]:
+            self.assertLessEqual(len(segment), 300)
+            self.assertTrue(segment.endswith(" "))
+
+    def test_progress_and_empty_files(self):
+        progress = [read for _, read in iter_text_progress(self.write(TEXT.encode("utf-8")), segment_chars=500)]
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(progress[-1], 1.0)
+        self.assertEqual(list(iter_text_segments(self.write(b""))), [])
+
+    def test_streamed_chunks_signatures_and_stats_match_whole_text(self):
+        path = self.write(TEXT.encode("utf-8"))
+        segments = list(iter_text_segments(path, segment_chars=700, block_bytes=128))
+
+        summarizer = DocumentSummarizer.__new__(DocumentSummarizer)
+        self.assertEqual(list(summarizer.iter_chunks(segments, chunk_size=200)),
+                         summarizer.chunk_text(TEXT, chunk_size=200))
+
+        hasher = MinHasher()
+        self.assertTrue((hasher.signature_segments(segments) == hasher.signature(TEXT)).all())
+        self.assertTrue((hasher.signature_segments(["two ", "words"]) == hasher.signature("two words")).all())
+
+        streamed = analyze_segments("doc", segments)
+        whole = analyze_document("doc", TEXT)
+        self.assertEqual(streamed.word_count, whole.word_count)
+        self.assertEqual(streamed.term_counts, whole.term_counts)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import torch
+from transformers import AutoModelForSeq2SeqLM
+
+from src.data.dataloader import TokenDataset
+from src.data.preprocessing import preprocess
+from src.training.trainer import DistillationConfig, DistillationTrainer, create_student, select_layers
+from tests.tiny_models import save_tiny_seq2seq
+
+DOCUMENTS = [
+    "The consultant shall invoice the client monthly.",
+    "Payment is due in 30 days.",
+    "The battery storage system test results are in the report.",
+    "The agreement is for services.",
+    "The rate is $ 150 per hour for the services of the consultant.",
+    "The energy storage system performance test results are in the document.",
+]
+
+
+class TestDistillation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.teacher = save_tiny_seq2seq(os.path.join(cls.temp_dir.name, "teacher"), decoder_layers=4)
+        text_dir = os.path.join(cls.temp_dir.name, "docs")
+        os.makedirs(text_dir)
+        for i, document in enumerate(DOCUMENTS):
+            with open(os.path.join(text_dir, f"{i}.txt"), "w") as f:
+                f.write(document)
+        cls.data = os.path.join(cls.temp_dir.name, "data")
+        preprocess([text_dir], cls.data, cls.teacher, workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def config(self, name, **kwargs):
+        defaults = dict(decoder_layers=2, batch_size=2, max_steps=2, save_every=2, warmup_steps=1,
+                        eval_examples=2, label_batch_size=4, max_target_length=12)
+        return DistillationConfig(teacher=self.teacher, data=self.data,
+                                  output_dir=os.path.join(self.temp_dir.name, name), **dict(defaults, **kwargs))
+
+    def test_select_layers(self):
+        self.assertEqual(select_layers(12, 3), [0, 6, 11])
+        self.assertEqual(select_layers(4, 2), [0, 3])
+        self.assertEqual(select_layers(4, 1), [0])
+        with self.assertRaises(ValueError):
+            select_layers(4, 5)
+
+    def test_student_copies_selected_teacher_layers(self):
+        teacher = AutoModelForSeq2SeqLM.from_pretrained(self.teacher)
+        student = create_student(teacher, decoder_layers=2)
+
+        self.assertEqual(student.config.decoder_layers, 2)
+        self.assertEqual(student.config.encoder_layers, teacher.config.encoder_layers)
+        for student_layer, teacher_layer in ((0, 0), (1, 3)):
+            torch.testing.assert_close(student.model.decoder.layers[student_layer].fc1.weight,
+                                       teacher.model.decoder.layers[teacher_layer].fc1.weight)
+        torch.testing.assert_close(student.model.shared.weight, teacher.model.shared.weight)
+
+    def test_pseudo_labels_train_and_report(self):
+        trainer = DistillationTrainer(self.config("run"))
+        report = trainer.run()
+
+        labels = TokenDataset(trainer.labels_dir)
+        self.assertEqual(len(labels), len(DOCUMENTS))
+        self.assertEqual(labels.fields, ["input_ids", "labels"])
+        self.assertTrue(all(len(labels[i]["labels"]) > 0 for i in range(len(labels))))
+
+        student = AutoModelForSeq2SeqLM.from_pretrained(trainer.student_dir)
+        self.assertEqual(student.config.decoder_layers, 2)
+        self.assertEqual(set(report["profiles"]["profile_results"]), {"teacher", "student"})
+        self.assertIn("rouge", report["profiles"]["profile_results"]["student"])
+        self.assertIn("speedup", report)
+        self.assertTrue(os.path.exists(os.path.join(trainer.config.output_dir, "distillation_report.json")))
+
+    def test_resumes_from_checkpoint(self):
+        trainer = DistillationTrainer(self.config("resume", max_steps=2))
+        trainer.generate_pseudo_labels()
+        trainer.train()
+        saved = torch.load(os.path.join(trainer.checkpoint_dir, "trainer_state.pt"), weights_only=False)
+        self.assertEqual(saved["state"]["step"], 2)
+
+        # A longer run in the same directory continues from the checkpoint.
+        shutil.rmtree(trainer.student_dir)
+        trainer = DistillationTrainer(self.config("resume", max_steps=4))
+        with self.assertLogs("src.training.trainer", level="INFO") as logs:
+            trainer.train()
+        self.assertTrue(any("Resuming from step 2" in line for line in logs.output))
+        with open(os.path.join(trainer.student_dir, "distillation.json")) as f:
+            self.assertEqual(json.load(f)["steps"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
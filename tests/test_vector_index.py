@@ -0,0 +1,174 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+
+from src.models.device import ExecutionDevice
+from src.models.embedder import PassageEmbedder
+from src.utils.vector_index import QuantizedVectorIndex, quantize
+from tests.tiny_models import save_tiny_encoder
+
+DIM = 32
+
+
+def unit_vectors(count, seed=0):
+    vectors = np.random.RandomState(seed).randn(count, DIM).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestQuantizedVectorIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.vectors = unit_vectors(2000)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def build(self, **kwargs):
+        index = QuantizedVectorIndex(DIM, path=self.temp_dir.name, **kwargs)
+        for doc in range(20):
+            rows = slice(doc * 100, (doc + 1) * 100)
+            index.add(f"doc{doc}", [f"passage {i} of document {doc}" for i in range(100)], self.vectors[rows],
+                      {"filename": f"{doc}.txt"})
+        return index
+
+    def test_quantized_scores_are_close_to_float_scores(self):
+        quantized, scales = quantize(self.vectors)
+        self.assertEqual(quantized.dtype, np.int8)
+        approximate = (quantized.astype(np.float32) * scales[:, None]) @ self.vectors[0]
+        np.testing.assert_allclose(approximate, self.vectors @ self.vectors[0], atol=0.02)
+
+    def test_search_before_and_after_flush_and_reopen(self):
+        index = self.build()
+        expected = index.search(self.vectors[123], top_k=5)
+        self.assertEqual(expected[0][0], 123)
+        self.assertFalse(index.add("doc0", ["again"], self.vectors[:1]))
+
+        index.flush()
+        self.assertEqual(index.search(self.vectors[123], top_k=5), expected)
+        index.add("late", ["a late passage"], -self.vectors[:1])
+        self.assertEqual(index.search(-self.vectors[0], top_k=1)[0][0], 2000)
+        index.flush()
+
+        reopened = QuantizedVectorIndex(DIM, path=self.temp_dir.name)
+        self.assertEqual(len(reopened), 2001)
+        self.assertEqual(reopened.search(self.vectors[123], top_k=5), expected)
+        self.assertEqual(reopened.passage(2000)[1], "a late passage")
+        self.assertEqual(reopened.passage(123)[0]["filename"], "1.txt")
+        # Only the current generation of the arrays is kept.
+        self.assertEqual(sorted(name for name in os.listdir(self.temp_dir.name) if name.startswith("vectors")),
+                         ["vectors.2.npy"])
+
+    def test_unflushed_documents_count_additions_during_a_flush(self):
+        index = self.build()
+        self.assertEqual(index.unflushed_documents, 20)
+
+        # A document added while the arrays are being written stays unflushed.
+        write_arrays = index._write_arrays
+        def write_and_add(*args):
+            index.add("late", ["a late passage"], self.vectors[:1])
+            return write_arrays(*args)
+        index._write_arrays = write_and_add
+        index.flush()
+        self.assertEqual(index.unflushed_documents, 1)
+        self.assertEqual(index.stats()["unflushed_passages"], 1)
+
+        index._write_arrays = write_arrays
+        index.flush()
+        generation = index.generation
+        index.flush()
+        self.assertEqual(index.unflushed_documents, 0)
+        self.assertEqual(index.generation, generation)
+        self.assertEqual(QuantizedVectorIndex(DIM, path=self.temp_dir.name).unflushed_documents, 0)
+
+    def test_empty_passages_can_be_flushed(self):
+        index = QuantizedVectorIndex(DIM, path=self.temp_dir.name)
+        index.add("doc", ["", ""], self.vectors[:2])
+        index.flush()
+
+        reopened = QuantizedVectorIndex(DIM, path=self.temp_dir.name)
+        self.assertEqual(reopened.passage(1)[1], "")
+
+    def test_ivf_search_finds_the_nearest_passages(self):
+        index = self.build(nlist=8, nprobe=4)
+        index.flush()
+        self.assertEqual(index.stats()["lists"], 8)
+
+        recall = 0
+        for target in range(0, 2000, 100):
+            exact = set(np.argsort(-(self.vectors @ self.vectors[target]))[:10].tolist())
+            found = {passage_id for passage_id, _ in index.search(self.vectors[target], top_k=10)}
+            recall += len(exact & found) / 10
+            self.assertIn(target, found)
+        self.assertGreater(recall / 20, 0.7)
+
+    def test_flushes_add_to_the_trained_lists_until_they_are_unbalanced(self):
+        index = self.build(nlist=8, nprobe=8)
+        index.flush()
+        centroids = np.array(index._centroids)
+
+        more = unit_vectors(100, seed=1)
+        index.add("more", ["more"] * 100, more)
+        index.flush()
+        np.testing.assert_array_equal(index._centroids, centroids)
+        self.assertEqual(index._list_offsets[-1], 2100)
+        for row in (0, 50, 99):
+            self.assertEqual(index.search(more[row], top_k=1)[0][0], 2000 + row)
+
+        # Thousands of near-copies all join one list, which calls for new centroids.
+        index.add("copies", ["copy"] * 3000, np.repeat(more[:1], 3000, axis=0))
+        index.flush()
+        self.assertFalse(np.array_equal(index._centroids, centroids))
+        self.assertEqual(index.search(self.vectors[123], top_k=1)[0][0], 123)
+
+    def test_documents_are_grouped_by_their_best_passage(self):
+        index = self.build()
+        results = index.search_documents(self.vectors[250], top_k=3, passages_per_document=2)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]["key"], "doc2")
+        self.assertEqual(results[0]["passages"][0]["text"], "passage 50 of document 2")
+        self.assertTrue(all(len(result["passages"]) <= 2 for result in results))
+        self.assertEqual([r["score"] for r in results], sorted((r["score"] for r in results), reverse=True))
+
+    def test_mismatched_embeddings_are_rejected(self):
+        index = QuantizedVectorIndex(DIM)
+        with self.assertRaises(ValueError):
+            index.add("doc", ["one", "two"], self.vectors[:1])
+        with self.assertRaises(ValueError):
+            index.add("doc", ["one"], np.zeros((1, DIM + 1)))
+
+
+class TestPassageEmbedder(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.embedder = PassageEmbedder(save_tiny_encoder(os.path.join(cls.temp_dir.name, "encoder")),
+                                       execution=ExecutionDevice(torch.device("cpu")), pad_to_multiple_of=8)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def test_embeddings_are_normalized_and_independent_of_batching(self):
+        texts = ["the client pays the invoice", "the battery storage system test results are in the report",
+                 "summary"]
+        together = self.embedder.embed(texts)
+        alone = np.concatenate([self.embedder.embed([text]) for text in texts])
+
+        np.testing.assert_allclose(np.linalg.norm(together, axis=1), 1.0, atol=1e-5)
+        np.testing.assert_allclose(together, alone, atol=1e-4)
+
+    def test_passages_overlap(self):
+        text = " ".join(f"w{i}" for i in range(250))
+        passages = self.embedder.split_passages(text, passage_words=100, overlap_words=20)
+
+        self.assertEqual([p.split()[0] for p in passages], ["w0", "w80", "w160"])
+        self.assertEqual(passages[-1].split()[-1], "w249")
+        self.assertEqual(self.embedder.split_passages(""), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Tiny randomly initialized models saved to disk, so model code can be tested offline on CPU"""
+import os
+
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import (BartConfig, BartForConditionalGeneration, PreTrainedTokenizerFast,
+                          RobertaConfig, RobertaForQuestionAnswering, RobertaModel)
+
+WORDS = ("the a of to and in is was for on that with by at as be this are it from an or "
+         "document report summary contract page client consultant rate hour month invoice days "
+         "agreement services payment energy battery storage system performance test results "
+         "summarize : . , ? what when who how much $ 150 30 10,000").split()
+
+
+def build_tokenizer() -> PreTrainedTokenizerFast:
+    vocab = {token: i for i, token in enumerate(["<s>", "<pad>", "</s>", "<unk>"] + WORDS)}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, bos_token="<s>", eos_token="</s>",
+                                   pad_token="<pad>", unk_token="<unk>", sep_token="</s>", cls_token="<s>",
+                                   model_input_names=["input_ids", "attention_mask"])
+
+
+def save_tiny_seq2seq(path: str, decoder_layers: int = 2, seed: int = 0) -> str:
+    torch.manual_seed(seed)
+    tokenizer = build_tokenizer()
+    config = BartConfig(
+        vocab_size=len(tokenizer), d_model=16, encoder_layers=1, decoder_layers=decoder_layers,
+        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32,
+        max_position_embeddings=1100, pad_token_id=1, bos_token_id=0, eos_token_id=2,
+        decoder_start_token_id=2, forced_bos_token_id=None, forced_eos_token_id=None
+    )
+    BartForConditionalGeneration(config).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
+
+
+def _tiny_roberta_config(tokenizer) -> RobertaConfig:
+    return RobertaConfig(
+        vocab_size=len(tokenizer), hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+        intermediate_size=32, max_position_embeddings=600, pad_token_id=1, bos_token_id=0, eos_token_id=2
+    )
+
+
+def save_tiny_qa(path: str, seed: int = 0) -> str:
+    torch.manual_seed(seed)
+    tokenizer = build_tokenizer()
+    RobertaForQuestionAnswering(_tiny_roberta_config(tokenizer)).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
+
+
+def save_tiny_encoder(path: str, seed: int = 0) -> str:
+    """An encoder without a task head, for passage embeddings"""
+    torch.manual_seed(seed)
+    tokenizer = build_tokenizer()
+    RobertaModel(_tiny_roberta_config(tokenizer)).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
+
+
+def save_tiny_models(root: str) -> dict:
+    """Saves a tiny summarizer and QA model under ``root`` and returns their paths"""
+    return {
+        "seq2seq": save_tiny_seq2seq(os.path.join(root, "tiny-seq2seq")),
+        "qa": save_tiny_qa(os.path.join(root, "tiny-qa")),
+    }